@@ -0,0 +1,262 @@
+﻿# cli.py
+"""
+Командная строка менеджера финансов без графического интерфейса
+
+Модули Qt не импортируются, поэтому команда выполняется за время
+загрузки журнала. Результат печатается в stdout одним JSON объектом;
+сообщения журнала идут в stderr. Код возврата: 0 - успех, 1 - ошибка
+операции, 2 - неверные аргументы.
+
+Примеры:
+    python cli.py balance
+    python cli.py add --amount -350 --category Продукты --description Хлеб
+    python cli.py import выписка.csv --mode merge
+    python cli.py export архив.jsonl.gz
+    python cli.py search кафе --date-from 2024-01-01
+    python cli.py report --date-from 2024-01-01 --date-to 2024-12-31
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import date
+
+logger = logging.getLogger("cli")
+
+STORAGE_MODES = ("json", "records", "partitioned")
+
+
+class CommandError(Exception):
+    """Ошибка выполнения команды; сообщение попадает в JSON ответа"""
+
+
+def open_manager(args):
+    """Создает менеджер над файлом данных; модули логики загружаются только здесь"""
+    from storage.data_storage import DataStorage
+    from logic.transaction_manager import TransactionManager
+
+    snapshot_mode = DataStorage.SNAPSHOT_ALONGSIDE if args.snapshot else None
+    storage = DataStorage(args.data, snapshot_mode=snapshot_mode, storage_mode=args.storage_mode)
+    return TransactionManager(storage)
+
+
+def positive_int(text):
+    """Тип argparse: целое больше нуля"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается целое число: {text!r}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"должно быть больше нуля: {value}")
+    return value
+
+
+# ----- команды -----
+
+def command_balance(manager, args):
+    with manager.lock.read():
+        return {
+            "balance": manager.calculate_balance(),
+            "count": manager.data_storage.get_transactions_count(),
+        }
+
+
+def command_categories(manager, args):
+    return {"categories": manager.get_categories()}
+
+
+def command_add(manager, args):
+    from validators.data_validator import DataValidator
+
+    transaction_date = args.date or date.today().isoformat()
+    is_valid, message = DataValidator.validate_transaction_data(
+        args.amount, args.category, transaction_date, args.description)
+    if not is_valid:
+        raise CommandError(message)
+    indices = manager.add_transactions([{
+        'amount': float(args.amount),
+        'category': args.category.strip(),
+        'date': transaction_date,
+        'description': args.description.strip(),
+    }])
+    return {"added": 1, "index": indices[0]}
+
+
+def command_import(manager, args):
+    from storage.interchange import interchange_format
+
+    file_format = args.format or interchange_format(args.file) or "json"
+    if file_format == "csv":
+        column_mapping = json.loads(args.columns) if args.columns else None
+        success, message = manager.import_from_csv(args.file, column_mapping, args.delimiter, args.mode)
+    elif file_format == "jsonl":
+        success, message = manager.import_from_jsonl(args.file, args.mode)
+    else:
+        success, message = manager.import_from_json(args.file, mode=args.mode)
+    if not success:
+        raise CommandError(message)
+    return {"imported": True, "format": file_format, "report": message,
+            "count": manager.data_storage.get_transactions_count()}
+
+
+def command_export(manager, args):
+    from storage.interchange import interchange_format
+
+    file_format = args.format or interchange_format(args.file) or "json"
+    if file_format == "csv":
+        success = manager.export_to_csv(args.file, delimiter=args.delimiter or ',')
+    elif file_format == "jsonl":
+        success = manager.export_to_jsonl(args.file)
+    else:
+        success = manager.export_to_json(args.file)
+    if not success:
+        raise CommandError(f"Не удалось экспортировать в {args.file}")
+    return {"exported": True, "format": file_format, "file": args.file,
+            "count": manager.data_storage.get_transactions_count()}
+
+
+def command_backup(manager, args):
+    if args.path:
+        if not manager.create_backup(args.path):
+            raise CommandError(f"Не удалось создать копию {args.path}")
+        return {"backup": args.path}
+    backup_path = manager.create_incremental_backup()
+    if backup_path is None:
+        raise CommandError("Не удалось создать инкрементальную копию")
+    return {"backup": backup_path}
+
+
+def command_search(manager, args):
+    page = manager.query_transactions(
+        offset=args.offset, limit=args.limit, sort_by=args.sort_by, descending=args.descending,
+        category=args.category, search_text=args.text, date_from=args.date_from, date_to=args.date_to)
+    return {
+        "items": page.items,
+        "indices": page.indices,
+        "next_offset": args.offset + len(page.items) if page.has_more else None,
+    }
+
+
+def command_report(manager, args):
+    """Доходы, расходы и суммы по категориям за период"""
+    income = expense = 0
+    count = 0
+    categories = {}
+    with manager.lock.read():
+        for transaction in manager.iter_transactions(
+                manager.EXPORT_PAGE_SIZE, date_from=args.date_from, date_to=args.date_to):
+            amount = transaction.get('amount', 0)
+            if not isinstance(amount, (int, float)):
+                continue
+            count += 1
+            if amount >= 0:
+                income += amount
+            else:
+                expense += amount
+            totals = categories.setdefault(str(transaction.get('category', '')), {"total": 0, "count": 0})
+            totals["total"] += amount
+            totals["count"] += 1
+    return {
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+        "count": count,
+        "income": income,
+        "expense": expense,
+        "balance": income + expense,
+        "categories": dict(sorted(categories.items(), key=lambda item: item[1]["total"])),
+    }
+
+
+# ----- разбор аргументов -----
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Менеджер финансов: командная строка")
+    parser.add_argument("--data", default="transactions.json", help="Файл данных")
+    parser.add_argument("--storage-mode", choices=STORAGE_MODES, default="json",
+                        help="Режим хранения данных")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Бинарный снимок рядом с JSON: быстрее запуск, дороже каждое изменение")
+    parser.add_argument("--indent", type=int, default=None, help="Отступ JSON вывода")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Сообщения журнала в stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("balance", help="Баланс и число транзакций").set_defaults(run=command_balance)
+    commands.add_parser("categories", help="Список категорий").set_defaults(run=command_categories)
+
+    add = commands.add_parser("add", help="Добавить транзакцию")
+    add.add_argument("--amount", required=True, help="Сумма; расход - со знаком минус")
+    add.add_argument("--category", required=True)
+    add.add_argument("--date", help="Дата YYYY-MM-DD; по умолчанию сегодня")
+    add.add_argument("--description", default="")
+    add.set_defaults(run=command_add)
+
+    bulk = commands.add_parser("import", help="Импорт из JSON, CSV или JSON Lines")
+    bulk.add_argument("file")
+    bulk.add_argument("--mode", choices=("replace", "merge"), default="merge",
+                      help="replace - заменить журнал, merge - добавить отсутствующие")
+    bulk.add_argument("--format", choices=("json", "csv", "jsonl"), help="По умолчанию по расширению")
+    bulk.add_argument("--columns", help='Соответствие столбцов CSV, JSON: {"amount": "Сумма"}')
+    bulk.add_argument("--delimiter", help="Разделитель CSV; по умолчанию по заголовку")
+    bulk.set_defaults(run=command_import)
+
+    export = commands.add_parser("export", help="Экспорт в JSON, CSV или JSON Lines (.gz/.xz - сжатие)")
+    export.add_argument("file")
+    export.add_argument("--format", choices=("json", "csv", "jsonl"), help="По умолчанию по расширению")
+    export.add_argument("--delimiter", help="Разделитель CSV")
+    export.set_defaults(run=command_export)
+
+    backup = commands.add_parser("backup", help="Резервная копия (инкрементальная, если путь не задан)")
+    backup.add_argument("--path", help="Путь полной JSON копии")
+    backup.set_defaults(run=command_backup)
+
+    search = commands.add_parser("search", help="Поиск транзакций")
+    search.add_argument("text", nargs="?", help="Подстрока в категории или описании")
+    search.add_argument("--category")
+    search.add_argument("--date-from")
+    search.add_argument("--date-to")
+    search.add_argument("--sort-by", choices=("date", "date_amount", "amount", "category"))
+    search.add_argument("--descending", action="store_true")
+    search.add_argument("--offset", type=int, default=0)
+    search.add_argument("--limit", type=positive_int, default=100)
+    search.set_defaults(run=command_search)
+
+    report = commands.add_parser("report", help="Доходы, расходы и категории за период")
+    report.add_argument("--date-from")
+    report.add_argument("--date-to")
+    report.set_defaults(run=command_report)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.snapshot and args.storage_mode != "json":
+        parser.error("--snapshot доступен только в режиме хранения json")
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    manager = None
+    try:
+        manager = open_manager(args)
+        result = {"ok": True, "command": args.command}
+        result.update(args.run(manager, args))
+        code = 0
+    except CommandError as e:
+        result = {"ok": False, "command": args.command, "error": str(e)}
+        code = 1
+    except Exception as e:
+        logger.error(f"Ошибка выполнения команды {args.command}: {str(e)}")
+        result = {"ok": False, "command": args.command, "error": str(e)}
+        code = 1
+    finally:
+        if manager is not None:
+            manager.data_storage.close()
+
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=args.indent, default=str)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+﻿# gui/budget_dialog.py
+from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit,
+                               QComboBox, QListWidget, QListWidgetItem, QPushButton)
+from PySide6.QtCore import Qt
+from gui.base_dialog import BaseDialog
+from gui.category_model import create_category_completer
+from logic.budget_manager import current_month
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetDialog(BaseDialog):
+    """
+    Месячные бюджеты категорий и расходы по ним за текущий месяц
+
+    Расходы берутся из сумм, которые BudgetManager поддерживает по
+    событиям, поэтому открытие диалога не просматривает журнал.
+    """
+
+    def __init__(self, budget_manager, category_model, parent=None):
+        super().__init__(parent)
+        self.budget_manager = budget_manager
+        self.category_model = category_model
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("💰 Бюджеты")
+        self.setModal(True)
+        self.resize(480, 420)
+        self.apply_styles()
+
+        layout = QVBoxLayout()
+        layout.setSpacing(12)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        self.month_label = QLabel()
+        layout.addWidget(self.month_label)
+
+        self.status_list = QListWidget()
+        self.status_list.currentItemChanged.connect(self.select_budget)
+        layout.addWidget(self.status_list)
+
+        form = QFormLayout()
+        self.category_edit = QComboBox()
+        self.category_edit.setEditable(True)
+        self.category_edit.setInsertPolicy(QComboBox.NoInsert)
+        self.category_edit.setModel(self.category_model)
+        self.category_edit.setCompleter(create_category_completer(self.category_model, self.category_edit))
+        form.addRow(QLabel("Категория:"), self.category_edit)
+
+        self.limit_edit = QLineEdit()
+        self.limit_edit.setPlaceholderText("Лимит расходов за месяц, руб.")
+        form.addRow(QLabel("Лимит:"), self.limit_edit)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        save_btn = QPushButton("💾 Сохранить")
+        save_btn.clicked.connect(self.save_budget)
+        remove_btn = QPushButton("🗑️ Удалить")
+        remove_btn.clicked.connect(self.remove_budget)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.close)
+        btn_layout.addWidget(save_btn)
+        btn_layout.addWidget(remove_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.refresh_status()
+        super().showEvent(event)
+
+    def refresh_status(self):
+        """Заполняет список бюджетов расходами за текущий месяц"""
+        month = current_month()
+        self.month_label.setText(f"Расходы за {month}:")
+        self.status_list.clear()
+        for status in self.budget_manager.status(month):
+            item = QListWidgetItem(
+                f"{status['category']}: {status['spent']:.2f} из {status['limit']:.2f} руб. "
+                f"({status['ratio']:.0%})")
+            item.setData(Qt.UserRole, status['category'])
+            if status['ratio'] > 1:
+                item.setForeground(Qt.darkRed)
+            elif status['ratio'] >= self.budget_manager.DEFAULT_THRESHOLDS[0]:
+                item.setForeground(Qt.darkYellow)
+            self.status_list.addItem(item)
+        if self.status_list.count() == 0:
+            item = QListWidgetItem("Бюджеты не заданы")
+            item.setForeground(Qt.gray)
+            self.status_list.addItem(item)
+
+    def select_budget(self, item, previous=None):
+        """Подставляет в поля выбранный бюджет"""
+        category = item.data(Qt.UserRole) if item is not None else None
+        if category is None:
+            return
+        self.category_edit.setCurrentText(category)
+        self.limit_edit.setText(f"{self.budget_manager.budgets()[category]['limit']:.2f}")
+
+    def save_budget(self):
+        category = self.category_edit.currentText().strip()
+        try:
+            limit = float(self.limit_edit.text().strip().replace(',', '.'))
+        except ValueError:
+            self.show_warning_message("Ошибка ввода", "Лимит должен быть числом")
+            return
+        try:
+            self.budget_manager.set_budget(category, limit)
+        except ValueError as e:
+            self.show_warning_message("Ошибка ввода", str(e))
+            return
+        except OSError as e:
+            logger.error(f"Ошибка сохранения бюджета: {str(e)}")
+            self.show_error_message("Ошибка", "❌ Не удалось сохранить бюджеты")
+            return
+        self.refresh_status()
+
+    def remove_budget(self):
+        category = self.category_edit.currentText().strip()
+        try:
+            if not self.budget_manager.remove_budget(category):
+                self.show_warning_message("Предупреждение", f"Для категории «{category}» бюджет не задан")
+                return
+        except OSError as e:
+            logger.error(f"Ошибка сохранения бюджетов: {str(e)}")
+            self.show_error_message("Ошибка", "❌ Не удалось сохранить бюджеты")
+            return
+        self.refresh_status()
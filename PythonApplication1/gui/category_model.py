@@ -0,0 +1,79 @@
+﻿# gui/category_model.py
+import logging
+from bisect import bisect_left
+from PySide6.QtCore import QStringListModel, Qt
+from PySide6.QtWidgets import QCompleter
+
+logger = logging.getLogger(__name__)
+
+
+def _sort_key(category):
+    # Порядок без учета регистра - тот, в котором ищет QCompleter
+    return (category.lower(), category)
+
+
+def _categories_of(batch):
+    """Категории, которые могли появиться или исчезнуть в пакете"""
+    categories = set()
+    for event in batch:
+        for transaction in (event.transaction, event.previous):
+            if isinstance(transaction, dict) and isinstance(transaction.get('category'), str):
+                categories.add(transaction['category'])
+    return categories
+
+
+class CategoryListModel(QStringListModel):
+    """
+    Общая модель категорий для полей ввода, фильтра и списка категорий
+
+    Строки упорядочены без учета регистра, поэтому QCompleter ищет
+    категорию по началу двоичным поиском даже среди тысяч категорий.
+    После первой загрузки модель меняется по пакетам событий менеджера:
+    новая категория вставляется одной строкой, исчезнувшая удаляется,
+    остальные строки и выбор в связанных полях не трогаются.
+    """
+
+    def __init__(self, transaction_manager, parent=None):
+        super().__init__(parent)
+        self.transaction_manager = transaction_manager
+        self._keys = []
+
+    def flags(self, index):
+        # Категории меняются только вместе с записями журнала
+        return super().flags(index) & ~Qt.ItemIsEditable
+
+    def reload(self):
+        """Заполняет модель категориями менеджера заново"""
+        categories = sorted(self.transaction_manager.get_category_counts(), key=_sort_key)
+        self._keys = [_sort_key(category) for category in categories]
+        self.setStringList(categories)
+        logger.debug(f"Загружено {len(categories)} категорий")
+
+    def apply_batch(self, batch):
+        """Вставляет и удаляет строки категорий, затронутых пакетом событий"""
+        if batch.is_reset:
+            self.reload()
+            return
+
+        counts = self.transaction_manager.get_category_counts()
+        for category in _categories_of(batch):
+            key = _sort_key(category)
+            row = bisect_left(self._keys, key)
+            present = row < len(self._keys) and self._keys[row] == key
+            if counts.get(category) and not present:
+                self._keys.insert(row, key)
+                self.insertRows(row, 1)
+                self.setData(self.index(row), category)
+            elif present and not counts.get(category):
+                del self._keys[row]
+                self.removeRows(row, 1)
+
+
+def create_category_completer(model, parent=None):
+    """Поиск категории по началу без учета регистра по общей модели"""
+    completer = QCompleter(model, parent)
+    completer.setCaseSensitivity(Qt.CaseInsensitive)
+    completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+    completer.setCompletionMode(QCompleter.PopupCompletion)
+    completer.setMaxVisibleItems(10)
+    return completer
@@ -0,0 +1,83 @@
+﻿from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QFormLayout, QLabel,
+                               QPushButton, QComboBox)
+from gui.base_dialog import BaseDialog
+from storage.interchange import FIELDS, REQUIRED_FIELDS
+
+
+class ColumnMappingDialog(BaseDialog):
+    """Сопоставление столбцов CSV выписки с полями транзакции"""
+
+    FIELD_TITLES = {
+        'date': "Дата",
+        'amount': "Сумма",
+        'category': "Категория",
+        'description': "Описание",
+    }
+    NOT_USED = "— не использовать —"
+
+    # Типичные заголовки банковских выписок для предварительного выбора
+    HINTS = {
+        'date': ("дата", "date"),
+        'amount': ("сумма", "amount"),
+        'category': ("категория", "category"),
+        'description': ("описание", "комментарий", "назначение", "description"),
+    }
+
+    def __init__(self, columns, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.combos = {}
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("🧩 Столбцы CSV")
+        self.setModal(True)
+        self.apply_styles()
+
+        layout = QVBoxLayout()
+        layout.setSpacing(12)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        hint = QLabel("Укажите, в каких столбцах файла находятся поля транзакции")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        form = QFormLayout()
+        for field in FIELDS:
+            combo = QComboBox()
+            if field not in REQUIRED_FIELDS:
+                combo.addItem(self.NOT_USED)
+            combo.addItems(self.columns)
+            guessed = self.guess_column(field)
+            if guessed is not None:
+                combo.setCurrentText(guessed)
+            self.combos[field] = combo
+            form.addRow(f"{self.FIELD_TITLES[field]}:", combo)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        ok_btn = QPushButton("Импортировать")
+        ok_btn.clicked.connect(self.accept)
+        cancel_btn = QPushButton("Отмена")
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(ok_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    def guess_column(self, field):
+        for column in self.columns:
+            lowered = column.lower()
+            if any(lowered.startswith(hint) for hint in self.HINTS[field]):
+                return column
+        return None
+
+    def get_mapping(self):
+        """Возвращает соответствие поле -> заголовок столбца"""
+        mapping = {}
+        for field, combo in self.combos.items():
+            column = combo.currentText()
+            mapping[field] = None if column == self.NOT_USED else column
+        return mapping
@@ -0,0 +1,53 @@
+﻿# gui/deferred_changes.py
+import logging
+from logic.events import ChangeBatch, ChangeType, TransactionEvent
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredChanges:
+    """
+    Откладывает пакеты событий, пока окно скрыто
+
+    Окна, которые создаются один раз и потом только показываются,
+    подписываются на менеджер через этот объект: видимое окно получает
+    пакет сразу, скрытое - накопленные пакеты при следующем показе.
+    Если накоплено больше max_events событий или среди них был сброс,
+    окну передается один пакет сброса вместо длинной очереди.
+    """
+
+    MAX_EVENTS = 5000
+
+    def __init__(self, widget, apply_batch, max_events=MAX_EVENTS):
+        self.widget = widget
+        self.apply_batch = apply_batch
+        self.max_events = max_events
+        self._batches = []
+        self._event_count = 0
+        self._reset = False
+
+    def __call__(self, batch):
+        if self.widget.isVisible():
+            self.apply_batch(batch)
+            return
+        if self._reset:
+            return
+        self._event_count += len(batch)
+        if batch.is_reset or self._event_count > self.max_events:
+            self._batches = []
+            self._reset = True
+        else:
+            self._batches.append(batch)
+
+    def flush(self):
+        """Передает окну накопленные пакеты; вызывается при показе окна"""
+        batches, reset = self._batches, self._reset
+        self._batches = []
+        self._event_count = 0
+        self._reset = False
+        if reset:
+            batches = [ChangeBatch("reset", [TransactionEvent(ChangeType.RESET)])]
+        if batches:
+            logger.debug(f"Применение отложенных изменений: {len(batches)} пакетов")
+        for batch in batches:
+            self.apply_batch(batch)
@@ -2,16 +2,18 @@
                                QComboBox, QDateEdit, QDialogButtonBox)
 from PySide6.QtCore import QDate
 from gui.base_dialog import BaseDialog
+from gui.category_model import create_category_completer
 from validators.data_validator import DataValidator
 import logging
 
 logger = logging.getLogger(__name__)
 
 class EditTransactionDialog(BaseDialog):
-    def __init__(self, transaction_data, categories, parent=None):
+    def __init__(self, transaction_data, category_model, parent=None):
         super().__init__(parent)
         self.transaction_data = transaction_data
-        self.categories = categories
+        # Общая модель категорий главного окна: журнал при открытии не просматривается
+        self.category_model = category_model
         self.init_ui()
         self.load_transaction_data()
 
@@ -36,8 +38,11 @@ class EditTransactionDialog(BaseDialog):
 
         self.category_edit = QComboBox()
         self.category_edit.setEditable(True)
-        if self.categories:
-            self.category_edit.addItems(self.categories)
+        if self.category_model is not None:
+            self.category_edit.setInsertPolicy(QComboBox.NoInsert)
+            self.category_edit.setModel(self.category_model)
+            self.category_edit.setCompleter(
+                create_category_completer(self.category_model, self.category_edit))
         layout.addRow(QLabel("Категория*:"), self.category_edit)
 
         self.date_edit = QDateEdit()
@@ -2,16 +2,33 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                                  QLineEdit, QListWidget, QPushButton, QListWidgetItem)
 from PySide6.QtCore import Qt
+from logic.events import ChangeType
+from gui.deferred_changes import DeferredChanges
+from gui.row_presentation import LAYOUT_COLUMNS, shared_row_presentations
 
 
 class HistoryWidget(QDialog):
-    """Компонент окна истории транзакций: поиск, список и кнопки."""
+    """
+    Компонент окна истории транзакций: поиск, список и кнопки.
+
+    Окно создается один раз и при закрытии только скрывается: изменения,
+    сделанные пока оно скрыто, применяются к списку при следующем показе.
+    """
+
+    PAGE_SIZE = 200
 
     def __init__(self, transaction_manager, parent=None):
         super().__init__(parent)
         self.transaction_manager = transaction_manager
+        self.row_presentations = shared_row_presentations()
+        self._rows_match_storage = False
+        self._search_text = None
+        self._cursor = None
+        self._has_more = False
         self._init_ui()
         self.load_transactions()
+        self.deferred_changes = DeferredChanges(self, self.on_transactions_changed)
+        self.transaction_manager.subscribe(self.deferred_changes)
 
     def _init_ui(self):
         self.setWindowTitle("📊 История транзакций")
@@ -48,64 +65,98 @@ class HistoryWidget(QDialog):
         self.setLayout(layout)
 
         self.refresh_btn.clicked.connect(self.load_transactions)
+        self.transactions_list.verticalScrollBar().valueChanged.connect(self._on_scroll)
         self.close_btn.clicked.connect(self.close)
 
-    def is_valid_transaction(self, transaction):
-        if not isinstance(transaction, dict):
-            return False
-        if 'amount' not in transaction or 'category' not in transaction or 'date' not in transaction:
-            return False
-        if not isinstance(transaction['amount'], (int, float)):
-            return False
-        return True
+    def showEvent(self, event):
+        self.deferred_changes.flush()
+        super().showEvent(event)
+
+    def _create_item(self, t):
+        it = QListWidgetItem()
+        self._apply_to_item(it, t)
+        return it
+
+    def _apply_to_item(self, it, t):
+        self.row_presentations.apply_to_item(it, t, LAYOUT_COLUMNS)
 
     def load_transactions(self):
+        self._start_query(None)
+
+    def search_transactions(self):
+        text = self.search_input.text().lower().strip()
+        self._start_query(text or None)
+
+    def _start_query(self, search_text):
+        """Сбрасывает список и загружает первую страницу результатов"""
         self.transactions_list.clear()
-        transactions = self.transaction_manager.get_all_transactions()
-        if not transactions:
+        self._search_text = search_text
+        self._cursor = None
+        self._has_more = True
+        # Без поиска строки списка - префикс хранилища в порядке индексов
+        self._rows_match_storage = search_text is None
+        self._load_next_page()
+
+        if self.transactions_list.count() == 0 and search_text is None:
             it = QListWidgetItem(self.tr("Нет транзакций для отображения"))
             it.setForeground(Qt.gray)
             self.transactions_list.addItem(it)
-            return
+            self._rows_match_storage = False
 
-        for t in transactions:
-            if not self.is_valid_transaction(t):
-                continue
-            amount = t['amount']
-            cat = t['category']
-            date = t['date']
-            desc = t.get('description', '')
-            amount_str = f"+{amount:.2f}" if amount >= 0 else f"{amount:.2f}"
-            text = f"{date} | {cat:<15} | {amount_str:>10} руб."
-            if desc:
-                text += f" | {desc}"
-            it = QListWidgetItem(text)
-            if amount > 0:
-                it.setForeground(Qt.darkGreen)
-            elif amount < 0:
-                it.setForeground(Qt.darkRed)
-            self.transactions_list.addItem(it)
-
-    def search_transactions(self):
-        text = self.search_input.text().lower().strip()
-        if not text:
-            self.load_transactions()
+    def _load_next_page(self):
+        if not self._has_more:
             return
-        self.transactions_list.clear()
-        for t in self.transaction_manager.search_transactions(text):
-            if not self.is_valid_transaction(t):
+        page = self.transaction_manager.query_after(self._cursor, self.PAGE_SIZE,
+                                                    search_text=self._search_text)
+        invalid_indices = self.transaction_manager.get_invalid_indices()
+        for index, t in zip(page.indices, page.items):
+            if index in invalid_indices:
+                self._rows_match_storage = False
                 continue
-            amount = t['amount']
-            cat = t['category']
-            date = t['date']
-            desc = t.get('description', '')
-            amount_str = f"+{amount:.2f}" if amount >= 0 else f"{amount:.2f}"
-            text = f"{date} | {cat:<15} | {amount_str:>10} руб."
-            if desc:
-                text += f" | {desc}"
-            it = QListWidgetItem(text)
-            if amount > 0:
-                it.setForeground(Qt.darkGreen)
-            elif amount < 0:
-                it.setForeground(Qt.darkRed)
-            self.transactions_list.addItem(it)
+            self.transactions_list.addItem(self._create_item(t))
+        self._cursor = page.next_cursor
+        self._has_more = page.has_more
+
+    def _on_scroll(self, value):
+        """Подгружает следующую страницу при прокрутке к концу списка"""
+        if self._has_more and value >= self.transactions_list.verticalScrollBar().maximum() - 2:
+            self._load_next_page()
+
+    def on_transactions_changed(self, batch):
+        """Обновляет список по событиям менеджера без повторной загрузки"""
+        if batch.is_reset or not self._rows_match_storage:
+            self.search_transactions()
+            return
+        for event in batch:
+            if not self._apply_event(event):
+                self.search_transactions()
+                return
+
+    def _apply_event(self, event):
+        loaded = self.transactions_list.count()
+        invalid_indices = self.transaction_manager.get_invalid_indices()
+        if event.change_type is ChangeType.ADDED:
+            if event.index in invalid_indices:
+                return False
+            if event.index > loaded or (event.index == loaded and self._has_more):
+                # Строка еще не загружена - появится со следующей страницей
+                return True
+            self.transactions_list.insertItem(event.index, self._create_item(event.transaction))
+            if self._has_more:
+                self._cursor += 1
+            return True
+        if event.change_type is ChangeType.UPDATED:
+            if event.index >= loaded:
+                return True
+            if event.index in invalid_indices:
+                return False
+            self._apply_to_item(self.transactions_list.item(event.index), event.transaction)
+            return True
+        if event.change_type is ChangeType.DELETED:
+            if event.index >= loaded:
+                return True
+            self.transactions_list.takeItem(event.index)
+            if self._has_more:
+                self._cursor -= 1
+            return self.transactions_list.count() > 0 or self._has_more
+        return False
@@ -1,21 +1,47 @@
 ﻿from PySide6.QtWidgets import (QDialog, QVBoxLayout, QGroupBox, QLabel,
                                  QPushButton, QFileDialog, QMessageBox, QWidget)
 from datetime import datetime
+from gui.column_mapping_dialog import ColumnMappingDialog
+from gui.deferred_changes import DeferredChanges
+from gui.restore_backup_dialog import RestoreBackupDialog
+from storage.interchange import DEFAULT_COLUMNS, REQUIRED_FIELDS, interchange_format
+from logic.events import ChangeType
 import os
 
 
+def _count_transaction(stats, transaction, delta):
+    """Учитывает запись в счетчиках [всего, доходы, расходы] с весом delta"""
+    amount = transaction.get('amount', 0) if isinstance(transaction, dict) else 0
+    stats[0] += delta
+    if isinstance(amount, (int, float)):
+        if amount > 0:
+            stats[1] += delta
+        elif amount < 0:
+            stats[2] += delta
+
+
 class ImportExportWidget(QDialog):
-    """Компонент диалога импорта/экспорта, отделённый от основного файла."""
+    """
+    Компонент диалога импорта/экспорта, отделённый от основного файла.
+
+    Статистика журнала считается полным просмотром один раз, дальше
+    счетчики меняются по событиям; пока диалог скрыт, события копятся
+    и применяются при следующем показе.
+    """
 
     def __init__(self, transaction_manager, parent=None):
         super().__init__(parent)
         self.transaction_manager = transaction_manager
+        # [всего, доходы, расходы]; None - еще не подсчитаны
+        self._stats = None
         self._init_ui()
+        self.deferred_changes = DeferredChanges(self, self.on_transactions_changed)
+        self.transaction_manager.subscribe(self.deferred_changes)
 
     def _init_ui(self):
         self.setWindowTitle("📁 Импорт / Экспорт данных")
         self.setModal(True)
-        self.setFixedSize(500, 380)
+        self.setFixedSize(500, 460)
 
         layout = QVBoxLayout()
         layout.setSpacing(12)
@@ -23,15 +49,18 @@ class ImportExportWidget(QDialog):
 
         export_group = QGroupBox("📤 Экспорт данных")
         export_layout = QVBoxLayout()
-        info_label = QLabel(self.get_export_info())
-        info_label.setWordWrap(True)
-        export_layout.addWidget(info_label)
+        self.info_label = QLabel(self.get_export_info())
+        self.info_label.setWordWrap(True)
+        export_layout.addWidget(self.info_label)
 
         btn_export_json = QPushButton("Экспорт в JSON файл")
         btn_export_json.clicked.connect(self.export_to_json)
         btn_export_backup = QPushButton("Создать резервную копию")
         btn_export_backup.clicked.connect(self.create_backup)
+        btn_export_table = QPushButton("Экспорт в CSV / JSON Lines")
+        btn_export_table.clicked.connect(self.export_to_table)
         export_layout.addWidget(btn_export_json)
+        export_layout.addWidget(btn_export_table)
         export_layout.addWidget(btn_export_backup)
         export_group.setLayout(export_layout)
         layout.addWidget(export_group)
@@ -43,7 +72,7 @@ class ImportExportWidget(QDialog):
 
         import_group = QGroupBox("📥 Импорт данных")
         import_layout = QVBoxLayout()
-        warning_label = QLabel("⚠️ Внимание: Импорт данных перезапишет текущие транзакции!")
+        warning_label = QLabel("⚠️ Внимание: Импорт с заменой перезапишет текущие транзакции!")
         warning_label.setWordWrap(True)
         import_layout.addWidget(warning_label)
 
@@ -51,7 +80,10 @@ class ImportExportWidget(QDialog):
         btn_import_json.clicked.connect(self.import_from_json)
         btn_import_backup = QPushButton("Восстановить из резервной копии")
         btn_import_backup.clicked.connect(self.restore_from_backup)
+        btn_import_table = QPushButton("Импорт из CSV / JSON Lines")
+        btn_import_table.clicked.connect(self.import_from_table)
         import_layout.addWidget(btn_import_json)
+        import_layout.addWidget(btn_import_table)
         import_layout.addWidget(btn_import_backup)
         import_group.setLayout(import_layout)
         layout.addWidget(import_group)
@@ -62,19 +94,40 @@ class ImportExportWidget(QDialog):
 
         self.setLayout(layout)
 
+    def showEvent(self, event):
+        self.deferred_changes.flush()
+        super().showEvent(event)
+
     def get_export_info(self):
         try:
-            transactions = self.transaction_manager.get_all_transactions()
-            total_count = len(transactions)
+            if self._stats is None:
+                stats = [0, 0, 0]
+                for t in self.transaction_manager.get_all_transactions():
+                    _count_transaction(stats, t, 1)
+                self._stats = stats
+            total_count, income_count, expense_count = self._stats
             if total_count == 0:
                 return "📊 Нет данных для экспорта"
-            income_count = sum(1 for t in transactions if t.get('amount', 0) > 0)
-            expense_count = sum(1 for t in transactions if t.get('amount', 0) < 0)
-            categories = len(set(t.get('category', '') for t in transactions))
+            categories = len(self.transaction_manager.get_category_counts())
             return f"""📊 Статистика данных:\n• Всего транзакций: {total_count}\n• Доходы: {income_count}\n• Расходы: {expense_count}\n• Уникальных категорий: {categories}"""
         except Exception:
             return "❌ Ошибка получения информации о данных"
 
+    def on_transactions_changed(self, batch):
+        """Обновляет статистику при изменении данных в других окнах"""
+        if batch.is_reset:
+            self._stats = None
+        elif self._stats is not None:
+            for event in batch:
+                if event.change_type is ChangeType.ADDED:
+                    _count_transaction(self._stats, event.transaction, 1)
+                elif event.change_type is ChangeType.DELETED:
+                    _count_transaction(self._stats, event.previous, -1)
+                elif event.change_type is ChangeType.UPDATED:
+                    _count_transaction(self._stats, event.previous, -1)
+                    _count_transaction(self._stats, event.transaction, 1)
+        self.info_label.setText(self.get_export_info())
+
     def export_to_json(self):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
@@ -91,29 +144,92 @@ class ImportExportWidget(QDialog):
             QMessageBox.information(self, "Успех", f"✅ Данные успешно экспортированы в файл:\n{file_path}")
 
     def create_backup(self):
-        backup_dir = "backups"
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(backup_dir, f"backup_{timestamp}.json")
-        success = self.transaction_manager.create_backup(backup_path)
-        if success:
+        backup_path = self.transaction_manager.create_incremental_backup()
+        if backup_path:
             QMessageBox.information(self, "Успех", f"✅ Резервная копия создана:\n{backup_path}")
+        else:
+            QMessageBox.critical(self, "Ошибка", "❌ Не удалось создать резервную копию")
 
-    def import_from_json(self):
-        reply = QMessageBox.question(
+    def export_to_table(self):
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
-            "Подтверждение импорта",
-            "⚠️ Вы уверены, что хотите импортировать данные?\n\nВсе текущие транзакции будут заменены данными из файла.",
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.No
+            "Экспорт данных в CSV / JSON Lines",
+            f"financial_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "CSV Files (*.csv);;JSON Lines (*.jsonl);;All Files (*)"
         )
-        if reply != QMessageBox.Yes:
+        if not file_path:
+            return
+        file_format = interchange_format(file_path)
+        if file_format is None:
+            file_format = "jsonl" if "jsonl" in selected_filter else "csv"
+            file_path += f".{file_format}"
+        if file_format == "jsonl":
+            success = self.transaction_manager.export_to_jsonl(file_path)
+        else:
+            success = self.transaction_manager.export_to_csv(file_path)
+        if success:
+            QMessageBox.information(self, "Успех", f"✅ Данные успешно экспортированы в файл:\n{file_path}")
+        else:
+            QMessageBox.critical(self, "Ошибка", "❌ Не удалось экспортировать данные")
+
+    def ask_import_mode(self):
+        """Спрашивает режим импорта; None - импорт отменен"""
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Question)
+        box.setWindowTitle("Подтверждение импорта")
+        box.setText("Как импортировать данные?\n\n"
+                    "• Объединить - добавить только транзакции, которых еще нет\n"
+                    "• Заменить - ⚠️ все текущие транзакции будут заменены данными из файла")
+        merge_btn = box.addButton("Объединить", QMessageBox.AcceptRole)
+        replace_btn = box.addButton("Заменить", QMessageBox.DestructiveRole)
+        box.addButton("Отмена", QMessageBox.RejectRole)
+        box.setDefaultButton(merge_btn)
+        box.exec()
+        if box.clickedButton() is merge_btn:
+            return self.transaction_manager.IMPORT_MERGE
+        if box.clickedButton() is replace_btn:
+            return self.transaction_manager.IMPORT_REPLACE
+        return None
+
+    def import_from_json(self):
+        mode = self.ask_import_mode()
+        if mode is None:
             return
-        file_path, _ = QFileDialog.getOpenFileName(self, "Импорт данных из JSON", "", "JSON Files (*.json);;All Files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Импорт данных из JSON", "", "JSON Files (*.json *.json.gz *.json.xz);;All Files (*)")
         if not file_path:
             return
-        success, message = self.transaction_manager.import_from_json(file_path)
+        success, message = self.transaction_manager.import_from_json(file_path, mode=mode)
+        self.show_import_result(success, message)
+
+    def import_from_table(self):
+        mode = self.ask_import_mode()
+        if mode is None:
+            return
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт данных из CSV / JSON Lines", "",
+            "CSV / JSON Lines (*.csv *.jsonl *.csv.gz *.jsonl.gz *.csv.xz *.jsonl.xz);;All Files (*)")
+        if not file_path:
+            return
+
+        if interchange_format(file_path) == "jsonl":
+            success, message = self.transaction_manager.import_from_jsonl(file_path, mode=mode)
+        else:
+            try:
+                columns = self.transaction_manager.get_csv_columns(file_path)
+            except (OSError, ValueError) as e:
+                QMessageBox.critical(self, "Ошибка", f"❌ Не удалось прочитать файл:\n{str(e)}")
+                return
+            mapping = None
+            if not all(DEFAULT_COLUMNS[field] in columns for field in REQUIRED_FIELDS):
+                # Заголовки выписки отличаются от стандартных - спросим соответствие
+                dialog = ColumnMappingDialog(columns, self)
+                if dialog.exec() != QDialog.Accepted:
+                    return
+                mapping = dialog.get_mapping()
+            success, message = self.transaction_manager.import_from_csv(file_path, mapping, mode=mode)
+        self.show_import_result(success, message)
+
+    def show_import_result(self, success, message):
         if success:
             QMessageBox.information(self, "Успех", f"✅ Данные успешно импортированы!\n\n{message}")
             self.accept()
@@ -121,13 +237,10 @@ class ImportExportWidget(QDialog):
             QMessageBox.critical(self, "Ошибка", f"❌ Не удалось импортировать данные:\n{message}")
 
     def restore_from_backup(self):
-        backup_dir = "backups"
-        if not os.path.exists(backup_dir):
-            QMessageBox.information(self, "Информация", "Папка с резервными копиями не найдена.")
-            return
-        file_path, _ = QFileDialog.getOpenFileName(self, "Выберите резервную копию для восстановления", backup_dir, "JSON Files (*.json);;All Files (*)")
-        if not file_path:
+        dialog = RestoreBackupDialog(self.transaction_manager, self)
+        if dialog.exec() != QDialog.Accepted or not dialog.selected_path:
             return
+        file_path = dialog.selected_path
         reply = QMessageBox.question(self, "Подтверждение восстановления", f"⚠️ Вы уверены, что хотите восстановить данные из:\n{os.path.basename(file_path)}?\n\nВсе текущие транзакции будут заменены данными из резервной копии.", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply != QMessageBox.Yes:
             return
@@ -1,13 +1,21 @@
 ﻿# ui/main_window.py
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QGroupBox, QLabel, QLineEdit, QComboBox, QDateEdit,
-                               QListWidget, QPushButton, QMessageBox, QFormLayout,
-                               QListWidgetItem, QDialog)
-from PySide6.QtCore import QDate, Qt
+                               QListView, QPushButton, QMessageBox,
+                               QFormLayout, QDialog)
+from PySide6.QtCore import QConcatenateTablesProxyModel, QDate, QStringListModel, QTimer
+from PySide6.QtGui import QAction, QKeySequence
 from logic.transaction_manager import TransactionManager
+from logic.budget_manager import BudgetManager
+from storage.data_storage import StorageConflictError
+from gui.budget_dialog import BudgetDialog
+from gui.category_model import CategoryListModel, create_category_completer
 from gui.edit_transaction_dialog import EditTransactionDialog
 from gui.history_widget import HistoryWidget
 from gui.import_export_widget import ImportExportWidget
+from gui.row_presentation import shared_row_presentations
+from gui.transaction_delegate import TransactionDelegate
+from gui.transaction_list_model import TransactionListModel
 from styles.style_manager import StyleManager
 from validators.data_validator import DataValidator
 import logging
@@ -18,16 +26,38 @@ logger = logging.getLogger(__name__)
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
 
+    # Период проверки изменений файла данных другими процессами, мс
+    EXTERNAL_CHANGE_CHECK_MS = 2000
+    # Число строк списка транзакций, раскладываемых за одну порцию
+    LIST_LAYOUT_BATCH = 2000
+    # Порядки списка транзакций: название и поле сортировки менеджера
+    SORT_ORDERS = (
+        ("📅 По дате", "date"),
+        ("📅 По дате, затем по сумме", "date_amount"),
+        ("📄 В порядке добавления", None),
+    )
+
     def __init__(self):
         try:
             super().__init__()
             self.transaction_manager = TransactionManager()
+            # Суммы бюджетов считаются один раз, дальше - по событиям
+            self.budget_manager = BudgetManager(self.transaction_manager)
             self.style_manager = StyleManager()
             self.validator = DataValidator()
+            self.row_presentations = shared_row_presentations()
+            self.category_model = CategoryListModel(self.transaction_manager, self)
+            # Окна истории и импорта/экспорта создаются при первом открытии
+            self.history_window = None
+            self.import_export_dialog = None
+            self.budget_dialog = None
             self.current_filter = None
             
             self.init_ui()
+            self.transaction_manager.subscribe(self.on_transactions_changed)
+            self.budget_manager.subscribe(self.on_budget_alerts)
             self.safe_initial_load()
+            self.start_external_change_watch()
             logger.info("Главное окно приложения успешно инициализировано")
             
         except Exception as e:
@@ -45,6 +75,19 @@ class MainWindow(QMainWindow):
             self.show_warning_message("Предупреждение", 
                                     "Не удалось загрузить начальные данные. Проверьте файл данных.")
 
+    def start_external_change_watch(self):
+        """Периодически подхватывает изменения, сделанные другими процессами"""
+        self.external_change_timer = QTimer(self)
+        self.external_change_timer.timeout.connect(self.check_external_changes)
+        self.external_change_timer.start(self.EXTERNAL_CHANGE_CHECK_MS)
+
+    def check_external_changes(self):
+        """Обновляет представления, если файл данных изменен извне"""
+        try:
+            self.transaction_manager.sync_external_changes()
+        except Exception as e:
+            logger.error(f"Ошибка проверки внешних изменений: {str(e)}")
+
     def init_ui(self):
         """Инициализация пользовательского интерфейса"""
         try:
@@ -62,6 +105,7 @@ class MainWindow(QMainWindow):
 
             self.create_left_panel(main_layout)
             self.create_right_panel(main_layout)
+            self.create_undo_actions()
 
             logger.debug("Интерфейс главного окна создан успешно")
 
@@ -70,6 +114,23 @@ class MainWindow(QMainWindow):
             self.show_error_message("Ошибка", "Не удалось создать интерфейс приложения")
             raise
 
+    def create_undo_actions(self):
+        """Отмена и повтор изменений по Ctrl+Z и Ctrl+Y"""
+        try:
+            self.undo_action = QAction("Отменить", self)
+            self.undo_action.setShortcuts([QKeySequence(QKeySequence.Undo)])
+            self.undo_action.triggered.connect(self.undo_change)
+            self.addAction(self.undo_action)
+
+            self.redo_action = QAction("Повторить", self)
+            self.redo_action.setShortcuts([QKeySequence("Ctrl+Y"), QKeySequence(QKeySequence.Redo)])
+            self.redo_action.triggered.connect(self.redo_change)
+            self.addAction(self.redo_action)
+
+        except Exception as e:
+            logger.error(f"Ошибка создания действий отмены: {str(e)}")
+            raise
+
     def apply_main_styles(self):
         """Применение основных стилей приложения"""
         try:
@@ -110,7 +171,11 @@ class MainWindow(QMainWindow):
 
             self.category_input = QComboBox()
             self.category_input.setEditable(True)
-            self.category_input.setInsertPolicy(QComboBox.InsertAtTop)
+            # Список категорий общий и меняется только по записям журнала
+            self.category_input.setInsertPolicy(QComboBox.NoInsert)
+            self.category_input.setModel(self.category_model)
+            self.category_input.setCompleter(
+                create_category_completer(self.category_model, self.category_input))
             self.category_input.lineEdit().setPlaceholderText("Выберите или введите категорию...")
             self.category_input.currentTextChanged.connect(self.validate_transaction_form)
             transaction_layout.addRow(QLabel("Категория*:"), self.category_input)
@@ -167,10 +232,21 @@ class MainWindow(QMainWindow):
             filter_layout.setContentsMargins(15, 20, 15, 15)
 
             filter_layout.addWidget(QLabel("Категория:"))
+            # Строка "Все категории" и за ней общая модель категорий
+            self.filter_categories = QConcatenateTablesProxyModel(self)
+            self.filter_categories.addSourceModel(QStringListModel(["Все категории"], self))
+            self.filter_categories.addSourceModel(self.category_model)
             self.filter_category = QComboBox()
-            self.filter_category.addItem("Все категории")
+            self.filter_category.setModel(self.filter_categories)
             filter_layout.addWidget(self.filter_category)
 
+            filter_layout.addWidget(QLabel("Порядок:"))
+            self.sort_order = QComboBox()
+            for title, sort_by in self.SORT_ORDERS:
+                self.sort_order.addItem(title, sort_by)
+            self.sort_order.currentIndexChanged.connect(lambda _: self.refresh_transactions_view())
+            filter_layout.addWidget(self.sort_order)
+
             filter_buttons_layout = QHBoxLayout()
 
             self.filter_btn = QPushButton("Применить фильтр")
@@ -200,6 +276,10 @@ class MainWindow(QMainWindow):
             self.import_export_btn.clicked.connect(self.safe_show_import_export)
             parent_layout.addWidget(self.import_export_btn)
 
+            self.budgets_btn = QPushButton("💰 Бюджеты")
+            self.budgets_btn.clicked.connect(self.safe_show_budgets)
+            parent_layout.addWidget(self.budgets_btn)
+
             parent_layout.addSpacing(20)
 
             balance_container = QHBoxLayout()
@@ -242,7 +322,9 @@ class MainWindow(QMainWindow):
             categories_label = QLabel("📂 Категории:")
             parent_layout.addWidget(categories_label)
 
-            self.categories_list = QListWidget()
+            self.categories_list = QListView()
+            self.categories_list.setModel(self.category_model)
+            self.categories_list.setUniformItemSizes(True)
             self.categories_list.setMaximumHeight(150)
             parent_layout.addWidget(self.categories_list)
 
@@ -256,7 +338,19 @@ class MainWindow(QMainWindow):
             transactions_label = QLabel("💰 Транзакции:")
             parent_layout.addWidget(transactions_label)
 
-            self.transactions_list = QListWidget()
+            # Строки рисует делегат из записей модели: элементов на каждую
+            # строку нет, а одинаковая высота строк избавляет от их измерения
+            self.transactions_model = TransactionListModel(
+                self.transaction_manager, self.row_presentations, self)
+            self.transactions_list = QListView()
+            self.transactions_list.setModel(self.transactions_model)
+            self.transactions_list.setItemDelegate(
+                TransactionDelegate(self.row_presentations, self.transactions_list))
+            self.transactions_list.setUniformItemSizes(True)
+            # Раскладка строк порциями между событиями: первый экран виден
+            # сразу, а окно не замирает на больших журналах
+            self.transactions_list.setLayoutMode(QListView.Batched)
+            self.transactions_list.setBatchSize(self.LIST_LAYOUT_BATCH)
             self.transactions_list.setAlternatingRowColors(True)
             parent_layout.addWidget(self.transactions_list)
 
@@ -365,88 +459,110 @@ class MainWindow(QMainWindow):
             logger.error(f"Ошибка открытия диалога импорта/экспорта: {str(e)}")
             self.show_error_message("Ошибка", "Не удалось открыть диалог импорта/экспорта")
 
-    def load_categories(self):
-        """Загрузка категорий в комбобоксы"""
+    def safe_show_budgets(self):
+        """Безопасное открытие диалога бюджетов"""
         try:
-            categories = self.transaction_manager.get_categories()
+            self.show_budgets()
+        except Exception as e:
+            logger.error(f"Ошибка открытия диалога бюджетов: {str(e)}")
+            self.show_error_message("Ошибка", "Не удалось открыть диалог бюджетов")
 
+    def load_categories(self):
+        """Загрузка категорий в общую модель полей и списка категорий"""
+        try:
             current_category = self.category_input.currentText()
             current_filter = self.filter_category.currentText()
 
-            self.category_input.clear()
-            self.filter_category.clear()
-            self.filter_category.addItem("Все категории")
+            self.category_model.reload()
 
-            for category in categories:
-                self.category_input.addItem(category)
-                self.filter_category.addItem(category)
-
-            if current_category and self.category_input.findText(current_category) >= 0:
+            if current_category:
                 self.category_input.setCurrentText(current_category)
-            if current_filter and self.filter_category.findText(current_filter) >= 0:
-                self.filter_category.setCurrentText(current_filter)
-
-            logger.debug(f"Загружено {len(categories)} категорий")
+            filter_index = self.filter_category.findText(current_filter)
+            self.filter_category.setCurrentIndex(max(filter_index, 0))
 
         except Exception as e:
             logger.error(f"Ошибка загрузки категорий: {str(e)}")
-            self.category_input.clear()
-            self.filter_category.clear()
-            self.filter_category.addItem("Все категории")
+            self.category_model.setStringList([])
 
     def load_transactions(self):
         """Загрузка транзакций в список"""
-        try:
-            self.transactions_list.clear()
+        self.populate_transactions()
+
+    def populate_transactions(self, category=None):
+        """
+        Заполнение списка в выбранном порядке, при необходимости по категории
+
+        Порядок берется готовым у хранилища, которое поддерживает его при
+        изменениях, поэтому заполнение не сортирует журнал; записи модель
+        читает, только когда строку нужно нарисовать.
+        """
+        try:
+            manager = self.transaction_manager
+            with manager.lock.read():
+                order = manager.sorted_order(self.sort_order.currentData())
+                # Записи проверены менеджером один раз - здесь только поиск по индексу
+                invalid_indices = manager.get_invalid_indices()
+                if invalid_indices or category is not None:
+                    rows = manager.data_storage.view()
+                    order.pairs = [pair for pair in order.pairs if pair[1] not in invalid_indices
+                                   and (category is None or rows[pair[1]]['category'] == category)]
+                    for index in invalid_indices:
+                        logger.warning(f"Пропущена некорректная транзакция: {rows[index]}")
+
+            placeholder = (f"Нет транзакций в категории '{category}'" if category is not None
+                           else "Нет транзакций для отображения")
+            self.transactions_model.set_rows(order, placeholder)
 
-            transactions = self.transaction_manager.get_all_transactions()
-            if not transactions:
-                item = QListWidgetItem("Нет транзакций для отображения")
-                item.setForeground(Qt.gray)
-                self.transactions_list.addItem(item)
-                self.update_balance()
-                return
+            self.update_balance()
+            logger.info(f"Успешно загружено {len(order)} транзакций")
 
-            successful_items = 0
-            for transaction in transactions:
-                try:
-                    if not self.validator.is_valid_transaction_structure(transaction):
-                        logger.warning(f"Пропущена некорректная транзакция: {transaction}")
-                        continue
+        except Exception as e:
+            logger.error(f"Критическая ошибка загрузки транзакций: {str(e)}")
+            self.show_error_message("Ошибка", "Не удалось загрузить список транзакций")
 
-                    amount = transaction['amount']
-                    category = transaction['category']
-                    date = transaction['date']
-                    description = transaction.get('description', '')
+    def selected_transaction_index(self):
+        """Индекс в хранилище транзакции выбранной строки или None"""
+        return self.transactions_model.transaction_index(self.transactions_list.currentIndex().row())
 
-                    amount_str = f"+{amount:.2f}" if amount >= 0 else f"{amount:.2f}"
-                    item_text = f"{date} | {category} | {amount_str} руб."
-                    if description:
-                        item_text += f" | {description}"
+    def on_transactions_changed(self, batch):
+        """Инкрементальное обновление интерфейса по пакету событий менеджера"""
+        try:
+            if batch.is_reset or self.current_filter or not self.transactions_model.has_rows():
+                self.refresh_transactions_view()
+            else:
+                for event in batch:
+                    if not self.apply_change_event(event):
+                        self.refresh_transactions_view()
+                        break
+                else:
+                    self.update_balance()
 
-                    item = QListWidgetItem(item_text)
+            self.update_categories(batch)
+            logger.debug(f"Применен пакет изменений: {batch}")
 
-                    if amount > 0:
-                        item.setForeground(Qt.darkGreen)
-                    elif amount < 0:
-                        item.setForeground(Qt.darkRed)
-                    else:
-                        item.setForeground(Qt.darkGray)
+        except Exception as e:
+            logger.error(f"Ошибка обработки изменений транзакций: {str(e)}")
+            self.refresh_transactions_view()
 
-                    self.transactions_list.addItem(item)
-                    successful_items += 1
+    def apply_change_event(self, event):
+        """
+        Применение одного события к списку транзакций
 
-                except Exception as item_error:
-                    logger.error(f"Ошибка обработки транзакции {transaction}: {item_error}")
-                    continue
+        Строка находится и переставляется двоичным поиском в порядке
+        модели; остальные строки не перестраиваются.
 
-            self.update_balance()
-            self.update_categories_list()
-            logger.info(f"Успешно загружено {successful_items} транзакций")
+        Returns:
+            bool: False, если событие нельзя применить без полной перезагрузки
+        """
+        return self.transactions_model.apply_event(
+            event, self.transaction_manager.get_invalid_indices())
 
-        except Exception as e:
-            logger.error(f"Критическая ошибка загрузки транзакций: {str(e)}")
-            self.show_error_message("Ошибка", "Не удалось загрузить список транзакций")
+    def refresh_transactions_view(self):
+        """Полная перерисовка списка с учетом активного фильтра"""
+        if self.current_filter:
+            self.apply_filter()
+        else:
+            self.load_transactions()
 
     def update_balance(self):
         """Обновление отображения баланса"""
@@ -499,19 +615,16 @@ class MainWindow(QMainWindow):
             self.balance_label.setText("Ошибка расчета баланса")
             self.balance_label.setStyleSheet("color: red; font-weight: bold;")
 
-    def update_categories_list(self):
-        """Обновление списка категорий"""
+    def update_categories(self, batch):
+        """Вставка и удаление категорий, затронутых пакетом изменений"""
         try:
-            self.categories_list.clear()
-            categories = self.transaction_manager.get_categories()
-
-            for category in categories:
-                self.categories_list.addItem(category)
-
+            if batch.is_reset:
+                self.load_categories()
+            else:
+                self.category_model.apply_batch(batch)
         except Exception as e:
             logger.error(f"Ошибка обновления списка категорий: {str(e)}")
-            self.categories_list.clear()
-            self.categories_list.addItem("Ошибка загрузки категорий")
+            self.load_categories()
 
     def add_transaction(self):
         """Добавление новой транзакции"""
@@ -536,8 +649,6 @@ class MainWindow(QMainWindow):
 
             self.amount_input.clear()
             self.description_input.clear()
-            self.load_categories()
-            self.load_transactions()
 
             self.show_info_message("Успех", "✅ Транзакция успешно добавлена")
             logger.info(f"Добавлена новая транзакция: {category} - {amount} руб.")
@@ -549,8 +660,8 @@ class MainWindow(QMainWindow):
     def edit_transaction(self):
         """Редактирование выбранной транзакции"""
         try:
-            current_row = self.transactions_list.currentRow()
-            if current_row == -1:
+            current_row = self.selected_transaction_index()
+            if current_row is None:
                 self.show_warning_message("Предупреждение", "📝 Выберите транзакцию для редактирования")
                 return
 
@@ -558,20 +669,20 @@ class MainWindow(QMainWindow):
             if not transaction_data:
                 raise ValueError("Не удалось загрузить данные выбранной транзакции")
 
-            categories = self.transaction_manager.get_categories()
-
-            dialog = EditTransactionDialog(transaction_data, categories, self)
+            dialog = EditTransactionDialog(transaction_data, self.category_model, self)
             if dialog.exec() == QDialog.Accepted:
                 updated_data = dialog.get_updated_data()
 
                 self.transaction_manager.update_transaction(current_row, updated_data)
 
-                self.load_categories()
-                self.load_transactions()
-
                 self.show_info_message("Успех", "✅ Транзакция успешно обновлена")
                 logger.info(f"Обновлена транзакция #{current_row}")
 
+        except StorageConflictError as ce:
+            logger.warning(f"Конфликт при редактировании: {str(ce)}")
+            self.show_warning_message("Данные изменены",
+                                      "🔄 Файл данных изменен другой программой, список обновлен. "
+                                      "Повторите редактирование.")
         except ValueError as ve:
             logger.warning(f"Ошибка валидации при редактировании: {str(ve)}")
             self.show_warning_message("Ошибка", str(ve))
@@ -582,8 +693,8 @@ class MainWindow(QMainWindow):
     def delete_transaction(self):
         """Удаление выбранной транзакции"""
         try:
-            current_row = self.transactions_list.currentRow()
-            if current_row == -1:
+            current_row = self.selected_transaction_index()
+            if current_row is None:
                 self.show_warning_message("Предупреждение", "🗑️ Выберите транзакцию для удаления")
                 return
 
@@ -597,14 +708,40 @@ class MainWindow(QMainWindow):
 
             if reply == QMessageBox.Yes:
                 self.transaction_manager.delete_transaction(current_row)
-                self.load_transactions()
                 self.show_info_message("Успех", "✅ Транзакция успешно удалена")
                 logger.info(f"Удалена транзакция #{current_row}")
 
+        except StorageConflictError as ce:
+            logger.warning(f"Конфликт при удалении: {str(ce)}")
+            self.show_warning_message("Данные изменены",
+                                      "🔄 Файл данных изменен другой программой, список обновлен. "
+                                      "Повторите удаление.")
         except Exception as e:
             logger.error(f"Ошибка удаления транзакции: {str(e)}")
             self.show_error_message("Ошибка", "❌ Не удалось удалить транзакцию")
 
+    def undo_change(self):
+        """Отмена последнего изменения; список обновляется по событиям"""
+        self.replay_change(self.transaction_manager.undo, "↩️ Отменено", "Нечего отменять")
+
+    def redo_change(self):
+        """Повтор отмененного изменения"""
+        self.replay_change(self.transaction_manager.redo, "↪️ Повторено", "Нечего повторять")
+
+    def replay_change(self, replay, done_text, empty_text):
+        try:
+            title = replay()
+            self.statusBar().showMessage(f"{done_text}: {title}" if title else empty_text, 3000)
+
+        except StorageConflictError as ce:
+            logger.warning(f"Конфликт при отмене изменения: {str(ce)}")
+            self.show_warning_message("Данные изменены",
+                                      "🔄 Файл данных изменен другой программой, список обновлен. "
+                                      "Отмена прежних изменений больше недоступна.")
+        except Exception as e:
+            logger.error(f"Ошибка отмены или повтора изменения: {str(e)}")
+            self.show_error_message("Ошибка", "❌ Не удалось отменить или повторить изменение")
+
     def apply_filter(self):
         """Применение фильтра по категории"""
         try:
@@ -613,43 +750,7 @@ class MainWindow(QMainWindow):
                 self.load_transactions()
                 self.current_filter = None
             else:
-                self.transactions_list.clear()
-                transactions = self.transaction_manager.filter_by_category(category)
-
-                if not transactions:
-                    item = QListWidgetItem(f"Нет транзакций в категории '{category}'")
-                    item.setForeground(Qt.gray)
-                    self.transactions_list.addItem(item)
-                    return
-
-                for transaction in transactions:
-                    try:
-                        if not self.validator.is_valid_transaction_structure(transaction):
-                            continue
-
-                        amount = transaction['amount']
-                        cat = transaction['category']
-                        date = transaction['date']
-                        description = transaction.get('description', '')
-
-                        amount_str = f"+{amount:.2f}" if amount >= 0 else f"{amount:.2f}"
-                        item_text = f"{date} | {cat} | {amount_str} руб."
-                        if description:
-                            item_text += f" | {description}"
-
-                        item = QListWidgetItem(item_text)
-
-                        if amount > 0:
-                            item.setForeground(Qt.darkGreen)
-                        elif amount < 0:
-                            item.setForeground(Qt.darkRed)
-
-                        self.transactions_list.addItem(item)
-
-                    except Exception as item_error:
-                        logger.error(f"Ошибка обработки отфильтрованной транзакции: {item_error}")
-                        continue
-
+                self.populate_transactions(category)
                 self.current_filter = category
                 logger.info(f"Применен фильтр по категории: {category}")
 
@@ -672,7 +773,8 @@ class MainWindow(QMainWindow):
     def show_history(self):
         """Открытие окна истории транзакций"""
         try:
-            self.history_window = HistoryWidget(self.transaction_manager, self)
+            if self.history_window is None:
+                self.history_window = HistoryWidget(self.transaction_manager, self)
             self.history_window.exec()
             logger.info("Окно истории транзакций закрыто")
 
@@ -683,18 +785,33 @@ class MainWindow(QMainWindow):
     def show_import_export(self):
         """Открытие диалога импорта/экспорта данных"""
         try:
-            dialog = ImportExportWidget(self.transaction_manager, self)
-            result = dialog.exec()
+            if self.import_export_dialog is None:
+                self.import_export_dialog = ImportExportWidget(self.transaction_manager, self)
+            result = self.import_export_dialog.exec()
 
             if result == QDialog.Accepted:
-                self.load_categories()
-                self.load_transactions()
                 self.show_info_message("Успех", "✅ Данные успешно обновлены")
 
         except Exception as e:
             logger.error(f"Ошибка в диалоге импорта/экспорта: {str(e)}")
             self.show_error_message("Ошибка", "Произошла ошибка при работе с данными")
 
+    def show_budgets(self):
+        """Открытие диалога месячных бюджетов"""
+        if self.budget_dialog is None:
+            self.budget_dialog = BudgetDialog(self.budget_manager, self.category_model, self)
+        self.budget_dialog.exec()
+
+    def on_budget_alerts(self, alerts):
+        """Предупреждения о пересечении порогов бюджета"""
+        try:
+            text = "\n".join(alert.message() for alert in alerts)
+            self.statusBar().showMessage(text.replace("\n", "; "), 10000)
+            # Окно показывается после завершения изменения, вне блокировки менеджера
+            QTimer.singleShot(0, lambda: self.show_warning_message("💰 Бюджет", text))
+        except Exception as e:
+            logger.error(f"Ошибка показа предупреждений бюджета: {str(e)}")
+
     def show_error_message(self, title, message):
         """Показать сообщение об ошибке"""
         QMessageBox.critical(self, title, message)
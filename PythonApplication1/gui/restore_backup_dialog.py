@@ -0,0 +1,154 @@
+﻿from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QTableWidget, QTableWidgetItem, QAbstractItemView,
+                               QHeaderView, QFileDialog)
+from PySide6.QtCore import Qt
+from datetime import datetime
+from gui.base_dialog import BaseDialog
+from logic.backup_catalog import BackupCatalog
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RestoreBackupDialog(BaseDialog):
+    """Выбор резервной копии по каталогу без чтения содержимого копий"""
+
+    KIND_TITLES = {
+        "backup": "Копия",
+        "pre_import_backup": "Перед импортом",
+    }
+
+    def __init__(self, transaction_manager, parent=None):
+        super().__init__(parent)
+        self.transaction_manager = transaction_manager
+        self.catalog = transaction_manager.backup_store.catalog
+        self.entries = []
+        self.selected_path = None
+        self.init_ui()
+        self.load_entries()
+
+    def init_ui(self):
+        self.setWindowTitle("♻️ Восстановление из резервной копии")
+        self.setModal(True)
+        self.resize(760, 420)
+        self.apply_styles()
+
+        layout = QVBoxLayout()
+        layout.setSpacing(12)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(
+            ["Дата", "Тип", "Транзакций", "Баланс", "Категорий", "Размер"])
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.itemSelectionChanged.connect(self.update_comparison)
+        self.table.itemDoubleClicked.connect(self.restore_selected)
+        layout.addWidget(self.table)
+
+        self.comparison_label = QLabel("Выберите копию для восстановления или две копии для сравнения")
+        self.comparison_label.setWordWrap(True)
+        layout.addWidget(self.comparison_label)
+
+        btn_layout = QHBoxLayout()
+        self.other_file_btn = QPushButton("📂 Другой файл...")
+        self.other_file_btn.clicked.connect(self.choose_other_file)
+        btn_layout.addWidget(self.other_file_btn)
+        btn_layout.addStretch()
+        self.restore_btn = QPushButton("♻️ Восстановить")
+        self.restore_btn.setEnabled(False)
+        self.restore_btn.clicked.connect(self.restore_selected)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(self.restore_btn)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    def load_entries(self):
+        """Заполняет таблицу записями каталога"""
+        self.entries = self.transaction_manager.list_backups()
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            values = [
+                self.format_date(entry.get('created', '')),
+                self.KIND_TITLES.get(entry.get('kind'), entry.get('kind', '')),
+                str(entry.get('row_count', 0)),
+                f"{entry.get('balance', 0):.2f} руб.",
+                str(entry.get('category_count', 0)),
+                self.format_size(entry.get('size', 0)),
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        if not self.entries:
+            self.comparison_label.setText(
+                "Каталог копий пуст. Выберите файл копии вручную кнопкой «Другой файл...»")
+
+    def selected_entries(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self.entries[row] for row in rows]
+
+    def update_comparison(self):
+        """Показывает сводку выбранной копии или разницу между двумя копиями"""
+        selected = self.selected_entries()
+        self.restore_btn.setEnabled(len(selected) == 1)
+
+        if len(selected) == 1:
+            entry = selected[0]
+            self.comparison_label.setText(
+                f"📄 {entry['file']}\n"
+                f"Транзакций: {entry.get('row_count', 0)}, баланс: {entry.get('balance', 0):.2f} руб., "
+                f"категорий: {entry.get('category_count', 0)}")
+        elif len(selected) == 2:
+            # Сравнение от более старой копии к более новой
+            newer, older = selected if selected[0].get('created', '') >= selected[1].get('created', '') \
+                else selected[::-1]
+            diff = BackupCatalog.compare(older, newer)
+            if diff['same_content']:
+                text = "⚖️ Содержимое копий совпадает"
+            else:
+                text = (f"⚖️ Изменения с {self.format_date(older.get('created', ''))} "
+                        f"по {self.format_date(newer.get('created', ''))}:\n"
+                        f"Транзакций: {diff['row_count']:+d}, баланс: {diff['balance']:+.2f} руб., "
+                        f"категорий: {diff['category_count']:+d}")
+            self.comparison_label.setText(text)
+        elif len(selected) > 2:
+            self.comparison_label.setText("Для сравнения выберите ровно две копии")
+
+    def restore_selected(self):
+        selected = self.selected_entries()
+        if len(selected) != 1:
+            return
+        self.selected_path = self.catalog.file_path(selected[0])
+        self.accept()
+
+    def choose_other_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите резервную копию для восстановления", self.catalog.backup_dir,
+            "Резервные копии (*.fmbak *.json *.json.gz *.json.xz);;All Files (*)")
+        if file_path:
+            self.selected_path = file_path
+            self.accept()
+
+    @staticmethod
+    def format_date(value):
+        try:
+            return datetime.fromisoformat(value).strftime("%d.%m.%Y %H:%M:%S")
+        except (TypeError, ValueError):
+            return str(value)
+
+    @staticmethod
+    def format_size(size):
+        for unit in ("Б", "КБ", "МБ"):
+            if size < 1024:
+                return f"{size:.0f} {unit}"
+            size /= 1024
+        return f"{size:.1f} ГБ"
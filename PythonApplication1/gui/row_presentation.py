@@ -0,0 +1,114 @@
+﻿# gui/row_presentation.py
+import logging
+from collections import OrderedDict
+from PySide6.QtCore import Qt
+
+logger = logging.getLogger(__name__)
+
+# Раскладки строк: основной список и выровненные колонки истории
+LAYOUT_LIST = "list"
+LAYOUT_COLUMNS = "columns"
+
+
+class RowPresentation:
+    """Готовые к показу части строки транзакции и ее цвет"""
+
+    __slots__ = ('date', 'category', 'amount_text', 'description', 'text', 'color')
+
+    def __init__(self, date, category, amount_text, description, text, color):
+        self.date = date
+        self.category = category
+        self.amount_text = amount_text
+        self.description = description
+        self.text = text
+        self.color = color
+
+
+def _amount_color(amount, zero_color):
+    if amount > 0:
+        return Qt.darkGreen
+    if amount < 0:
+        return Qt.darkRed
+    return zero_color
+
+
+def _present(transaction, layout):
+    amount = transaction['amount']
+    category = transaction['category']
+    date = transaction['date']
+    description = transaction.get('description', '')
+
+    amount_text = f"+{amount:.2f}" if amount >= 0 else f"{amount:.2f}"
+    if layout == LAYOUT_COLUMNS:
+        text = f"{date} | {category:<15} | {amount_text:>10} руб."
+        color = _amount_color(amount, None)
+    else:
+        text = f"{date} | {category} | {amount_text} руб."
+        color = _amount_color(amount, Qt.darkGray)
+    if description:
+        text += f" | {description}"
+    return RowPresentation(date, category, amount_text, description, text, color)
+
+
+class RowPresentationCache:
+    """
+    Общий для всех представлений кэш текста и цвета строк транзакций
+
+    Ключ - раскладка и отображаемые поля записи: у записей нет
+    постоянных идентификаторов, а любое изменение записи меняет ключ,
+    поэтому устаревшая строка просто не запрашивается и вытесняется.
+    Повторные заполнения списков, фильтры и поиск берут готовые строки
+    вместо повторного форматирования. Память ограничена max_entries
+    последними использованными строками (LRU).
+    """
+
+    MAX_ENTRIES = 50000
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, transaction, layout=LAYOUT_LIST):
+        """Возвращает RowPresentation записи, форматируя ее только при промахе"""
+        key = (layout, transaction['date'], transaction['category'],
+               transaction['amount'], transaction.get('description', ''))
+        presentation = self._entries.get(key)
+        if presentation is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return presentation
+
+        self.misses += 1
+        presentation = _present(transaction, layout)
+        self._entries[key] = presentation
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return presentation
+
+    def apply_to_item(self, item, transaction, layout=LAYOUT_LIST):
+        """Заполняет текст и цвет элемента списка"""
+        presentation = self.get(transaction, layout)
+        item.setText(presentation.text)
+        if presentation.color is not None:
+            item.setForeground(presentation.color)
+        else:
+            item.setData(Qt.ForegroundRole, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_shared_cache = None
+
+
+def shared_row_presentations():
+    """Кэш строк, общий для главного окна и окна истории"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = RowPresentationCache()
+    return _shared_cache
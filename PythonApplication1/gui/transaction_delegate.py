@@ -0,0 +1,86 @@
+﻿# gui/transaction_delegate.py
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate
+from PySide6.QtCore import QRect, QSize, Qt
+from PySide6.QtGui import QColor, QPalette
+from gui.row_presentation import LAYOUT_LIST
+from gui.transaction_list_model import TRANSACTION_ROLE
+
+
+class TransactionDelegate(QStyledItemDelegate):
+    """
+    Рисует строку транзакции колонками прямо из полей записи
+
+    Дата, категория, сумма (по правому краю) и описание выводятся
+    отдельными колонками; цвета те же, что у строк главного окна.
+    Высота всех строк одинакова и зависит только от шрифта, поэтому
+    представление с uniformItemSizes не измеряет строки по одной.
+    """
+
+    HORIZONTAL_PADDING = 8
+    VERTICAL_PADDING = 10
+    COLUMN_SPACING = 16
+    # Доля ширины строки под категорию
+    CATEGORY_SHARE = 0.25
+    AMOUNT_SAMPLE = "+0000000.00 руб."
+    DATE_SAMPLE = "0000-00-00"
+
+    def __init__(self, row_presentations, parent=None):
+        super().__init__(parent)
+        self.row_presentations = row_presentations
+        self._widths = {}
+
+    def sizeHint(self, option, index):
+        return QSize(0, option.fontMetrics.height() + 2 * self.VERTICAL_PADDING)
+
+    def paint(self, painter, option, index):
+        transaction = index.data(TRANSACTION_ROLE)
+        if transaction is None:
+            super().paint(painter, option, index)
+            return
+
+        widget = option.widget
+        style = widget.style() if widget is not None else QApplication.style()
+        # Фон строки: выделение и наведение по стилю представления
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, widget)
+
+        presentation = self.row_presentations.get(transaction, LAYOUT_LIST)
+        metrics = option.fontMetrics
+        date_width, amount_width = self._column_widths(option.font.key(), metrics)
+        rect = option.rect.adjusted(self.HORIZONTAL_PADDING, 0, -self.HORIZONTAL_PADDING, 0)
+        category_width = max(0, int(rect.width() * self.CATEGORY_SHARE))
+
+        if option.state & QStyle.State_Selected:
+            color = option.palette.color(QPalette.HighlightedText)
+        elif presentation.color is not None:
+            color = QColor(presentation.color)
+        else:
+            color = option.palette.color(QPalette.Text)
+
+        painter.save()
+        painter.setPen(color)
+        painter.setFont(option.font)
+        x = rect.left()
+        x = self._draw_column(painter, metrics, rect, x, date_width, presentation.date)
+        x = self._draw_column(painter, metrics, rect, x, category_width, presentation.category)
+        x = self._draw_column(painter, metrics, rect, x, amount_width,
+                              f"{presentation.amount_text} руб.", Qt.AlignRight)
+        if presentation.description:
+            self._draw_column(painter, metrics, rect, x, rect.right() - x, presentation.description)
+        painter.restore()
+
+    def _draw_column(self, painter, metrics, rect, x, width, text, alignment=Qt.AlignLeft):
+        """Рисует текст колонки с многоточием и возвращает начало следующей"""
+        if width > 0:
+            text = metrics.elidedText(str(text), Qt.ElideRight, width)
+            painter.drawText(QRect(x, rect.top(), width, rect.height()),
+                             alignment | Qt.AlignVCenter, text)
+        return x + width + self.COLUMN_SPACING
+
+    def _column_widths(self, font_key, metrics):
+        """Ширины колонок даты и суммы; считаются один раз для шрифта"""
+        widths = self._widths.get(font_key)
+        if widths is None:
+            widths = (metrics.horizontalAdvance(self.DATE_SAMPLE),
+                      metrics.horizontalAdvance(self.AMOUNT_SAMPLE))
+            self._widths[font_key] = widths
+        return widths
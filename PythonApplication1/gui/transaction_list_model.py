@@ -0,0 +1,134 @@
+﻿# gui/transaction_list_model.py
+import logging
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+from logic.events import ChangeType
+from gui.row_presentation import LAYOUT_LIST
+
+logger = logging.getLogger(__name__)
+
+# Роль, по которой делегат получает саму запись транзакции
+TRANSACTION_ROLE = Qt.UserRole + 1
+
+
+class TransactionListModel(QAbstractListModel):
+    """
+    Модель списка транзакций поверх порядка SortedOrder
+
+    Строки не хранят ни текста, ни цвета: запись берется у менеджера по
+    индексу из порядка, когда представлению нужно нарисовать строку,
+    поэтому память и время заполнения не зависят от числа строк.
+    События изменений вставляют, переставляют и убирают отдельные
+    строки. Пока строк нет, модель показывает одну строку-заглушку.
+    """
+
+    def __init__(self, transaction_manager, row_presentations, parent=None):
+        super().__init__(parent)
+        self.transaction_manager = transaction_manager
+        self.row_presentations = row_presentations
+        self.order = None
+        self.placeholder = ""
+
+    # ----- чтение -----
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.order is None:
+            return 1 if self.placeholder else 0
+        return len(self.order)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.order is None:
+            if role == Qt.DisplayRole:
+                return self.placeholder
+            if role == Qt.ForegroundRole:
+                return QColor(Qt.gray)
+            return None
+
+        transaction = self.transaction_manager.get_transaction_by_index(self.order[index.row()][1])
+        if role == TRANSACTION_ROLE:
+            return transaction
+        if transaction is None:
+            return None
+        if role == Qt.DisplayRole:
+            return self.row_presentations.get(transaction, LAYOUT_LIST).text
+        if role == Qt.ForegroundRole:
+            color = self.row_presentations.get(transaction, LAYOUT_LIST).color
+            return QColor(color) if color is not None else None
+        return None
+
+    def has_rows(self):
+        """True, если показаны транзакции, а не заглушка"""
+        return self.order is not None
+
+    def transaction_index(self, row):
+        """Индекс в хранилище записи строки row или None"""
+        if self.order is None or not 0 <= row < len(self.order):
+            return None
+        return self.order[row][1]
+
+    # ----- изменение -----
+
+    def set_rows(self, order, placeholder=""):
+        """Показывает строки порядка order; пустой порядок - заглушка placeholder"""
+        self.beginResetModel()
+        self.order = order if len(order) else None
+        self.placeholder = placeholder
+        self.endResetModel()
+
+    def apply_event(self, event, invalid_indices):
+        """
+        Применяет событие изменения к строкам
+
+        Returns:
+            bool: False, если строки нужно заполнить заново
+        """
+        order = self.order
+        if order is None:
+            return False
+
+        if event.change_type is ChangeType.ADDED:
+            if event.index in invalid_indices:
+                # Некорректная запись не показывается - сдвигаются только индексы
+                order.shift(event.index, 1)
+                return True
+            row = order.insertion_point(event.index, event.transaction)
+            self.beginInsertRows(QModelIndex(), row, row)
+            order.insert(event.index, event.transaction)
+            self.endInsertRows()
+            return True
+
+        if event.change_type is ChangeType.UPDATED:
+            old_row = order.position(event.index, event.previous)
+            if old_row is None or event.index in invalid_indices:
+                return False
+            # Позиция перед строкой, куда встанет запись, в координатах до перемещения
+            target = order.insertion_point(event.index, event.transaction)
+            if target in (old_row, old_row + 1):
+                order.update(event.index, event.previous, event.transaction)
+                changed = self.index(old_row)
+            else:
+                self.beginMoveRows(QModelIndex(), old_row, old_row, QModelIndex(), target)
+                _, new_row = order.update(event.index, event.previous, event.transaction)
+                self.endMoveRows()
+                changed = self.index(new_row)
+            self.dataChanged.emit(changed, changed)
+            return True
+
+        if event.change_type is ChangeType.DELETED:
+            row = order.position(event.index, event.previous)
+            if row is None:
+                order.shift(event.index + 1, -1)
+                return True
+            if len(order) == 1:
+                # Последняя строка - модель перезаполняется, чтобы показать заглушку
+                return False
+            self.beginRemoveRows(QModelIndex(), row, row)
+            order.remove(event.index, event.previous)
+            self.endRemoveRows()
+            return True
+
+        return False
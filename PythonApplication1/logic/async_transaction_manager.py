@@ -0,0 +1,216 @@
+﻿# logic/async_transaction_manager.py
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from logic.transaction_manager import TransactionManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTransactionManager:
+    """
+    Асинхронный фасад над TransactionManager
+
+    Блокирующие операции с файлами выполняются в пуле потоков, поэтому
+    цикл событий не останавливается. Чтения идут параллельно, изменения
+    выполняются по одному в порядке вызова. Долгие импорт и экспорт
+    можно отменить обычной отменой задачи: операция останавливается на
+    ближайшей строке, недописанный экспорт удаляется, а записанная
+    часть импорта откатывается.
+
+    Фасад не привязан к конкретному циклу: он берет текущий запущенный
+    цикл при каждом вызове и работает как в asyncio.run(), так и в цикле
+    поверх Qt (qasync).
+    """
+
+    MAX_WORKERS = 4
+
+    def __init__(self, manager=None, executor=None):
+        self.manager = manager if manager is not None else TransactionManager()
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS, thread_name_prefix="transactions")
+        self._write_lock = None
+        self._subscribers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        """Останавливает собственный пул потоков после завершения операций"""
+        for callback in list(self._subscribers):
+            self.unsubscribe(callback)
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
+
+    # ----- события -----
+
+    def subscribe(self, callback):
+        """
+        Подписывает обработчик на пакеты событий об изменениях
+
+        События возникают в рабочем потоке; обработчик вызывается в цикле
+        событий, из которого выполнена подписка.
+        """
+        loop = asyncio.get_running_loop()
+
+        def dispatch(batch):
+            loop.call_soon_threadsafe(callback, batch)
+
+        self._subscribers[callback] = dispatch
+        self.manager.subscribe(dispatch)
+
+    def unsubscribe(self, callback):
+        """Отписывает обработчик от событий об изменениях"""
+        dispatch = self._subscribers.pop(callback, None)
+        if dispatch is not None:
+            self.manager.unsubscribe(dispatch)
+
+    # ----- изменения -----
+
+    async def add_transaction(self, amount, category, date, description=""):
+        """Добавляет новую транзакцию"""
+        return await self._write(self.manager.add_transaction, amount, category, date, description)
+
+    async def update_transaction(self, index, updated_data):
+        """Обновляет транзакцию по индексу"""
+        return await self._write(self.manager.update_transaction, index, updated_data)
+
+    async def delete_transaction(self, index):
+        """Удаляет транзакцию по индексу"""
+        return await self._write(self.manager.delete_transaction, index)
+
+    async def undo(self):
+        """Отменяет последнее изменение; возвращает его название или None"""
+        return await self._write(self.manager.undo)
+
+    async def redo(self):
+        """Повторяет отмененное изменение; возвращает его название или None"""
+        return await self._write(self.manager.redo)
+
+    async def sync_external_changes(self):
+        """Подхватывает изменения файла данных другими процессами"""
+        return await self._write(self.manager.sync_external_changes)
+
+    # ----- чтение -----
+
+    async def get_transaction(self, index):
+        """Возвращает транзакцию по индексу"""
+        return await self._run(self.manager.get_transaction_by_index, index)
+
+    async def snapshot(self):
+        """Согласованная копия всех транзакций"""
+        return await self._run(self.manager.snapshot)
+
+    async def get_categories(self):
+        """Возвращает список уникальных категорий"""
+        return await self._run(self.manager.get_categories)
+
+    async def calculate_balance(self):
+        """Рассчитывает общий баланс"""
+        return await self._run(self.manager.calculate_balance)
+
+    async def query_transactions(self, offset=0, limit=TransactionManager.DEFAULT_PAGE_SIZE,
+                                 **filters):
+        """Страница транзакций по смещению; фильтры как у TransactionManager.query_transactions"""
+        return await self._run(self.manager.query_transactions, offset, limit, **filters)
+
+    async def query_after(self, cursor=None, limit=TransactionManager.DEFAULT_PAGE_SIZE, **filters):
+        """Страница транзакций после курсора; фильтры как у TransactionManager.query_after"""
+        return await self._run(self.manager.query_after, cursor, limit, **filters)
+
+    async def iter_transactions(self, page_size=TransactionManager.DEFAULT_PAGE_SIZE, **filters):
+        """Асинхронно итерирует транзакции, запрашивая страницы в пуле потоков"""
+        cursor = None
+        while True:
+            page = await self.query_after(cursor, page_size, **filters)
+            for transaction in page.items:
+                yield transaction
+            if not page.has_more:
+                return
+            cursor = page.next_cursor
+
+    # ----- импорт, экспорт, копии -----
+
+    async def import_from_json(self, file_path, mode=TransactionManager.IMPORT_REPLACE):
+        """Импортирует JSON; возвращает (success, message)"""
+        return await self._cancellable(self.manager.import_from_json, file_path, mode=mode, write=True)
+
+    async def import_from_csv(self, file_path, column_mapping=None, delimiter=None,
+                              mode=TransactionManager.IMPORT_REPLACE):
+        """Потоково импортирует CSV; возвращает (success, message)"""
+        return await self._cancellable(self.manager.import_from_csv, file_path, column_mapping,
+                                       delimiter, mode, write=True)
+
+    async def import_from_jsonl(self, file_path, mode=TransactionManager.IMPORT_REPLACE):
+        """Потоково импортирует JSON Lines; возвращает (success, message)"""
+        return await self._cancellable(self.manager.import_from_jsonl, file_path, mode, write=True)
+
+    async def export_to_json(self, file_path, compression=None, compression_level=None):
+        """Экспортирует все транзакции в JSON"""
+        return await self._cancellable(self.manager.export_to_json, file_path, compression,
+                                       compression_level)
+
+    async def export_to_csv(self, file_path, column_mapping=None, delimiter=',',
+                            compression=None, compression_level=None):
+        """Потоково экспортирует транзакции в CSV"""
+        return await self._cancellable(self.manager.export_to_csv, file_path, column_mapping,
+                                       delimiter, compression, compression_level)
+
+    async def export_to_jsonl(self, file_path, compression=None, compression_level=None):
+        """Потоково экспортирует транзакции в JSON Lines"""
+        return await self._cancellable(self.manager.export_to_jsonl, file_path, compression,
+                                       compression_level)
+
+    async def create_backup(self, backup_path=None):
+        """Создает резервную копию (инкрементальную, если путь не задан)"""
+        return await self._run(self.manager.create_backup, backup_path)
+
+    async def list_backups(self):
+        """Записи каталога резервных копий, начиная с новых"""
+        return await self._run(self.manager.list_backups)
+
+    # ----- выполнение -----
+
+    async def _run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    async def _write(self, function, *args, **kwargs):
+        """Выполняет изменение после завершения предыдущих изменений"""
+        async with self._writes():
+            return await self._run(function, *args, **kwargs)
+
+    def _writes(self):
+        # Создается при первом изменении, уже внутри работающего цикла
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def _cancellable(self, function, *args, write=False, **kwargs):
+        """
+        Выполняет долгую операцию, которую можно отменить отменой задачи
+
+        Поток нельзя прервать извне, поэтому при отмене устанавливается
+        событие, которое операция проверяет на каждой строке; задача
+        дожидается остановки (и отката) и только затем сообщает об отмене.
+        """
+        if write:
+            async with self._writes():
+                return await self._cancellable(function, *args, **kwargs)
+
+        cancel = threading.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(function, *args, cancel=cancel, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            logger.info(f"Запрошена отмена операции {function.__name__}")
+            await asyncio.wait({future})
+            raise
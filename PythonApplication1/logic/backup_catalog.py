@@ -0,0 +1,101 @@
+﻿# logic/backup_catalog.py
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+
+class BackupCatalog:
+    """
+    Каталог резервных копий
+
+    Небольшой JSON индекс в папке копий: для каждой копии хранятся время,
+    тип, число транзакций, баланс, число категорий, размер и контрольная
+    сумма. Позволяет показывать и сравнивать копии, не читая их содержимое.
+    """
+
+    def __init__(self, backup_dir="backups"):
+        self.backup_dir = backup_dir
+        self.path = os.path.join(backup_dir, CATALOG_FILE)
+
+    def entries(self):
+        """Возвращает записи каталога, начиная с самых новых"""
+        entries = self._load()
+        return sorted(entries.values(), key=lambda entry: entry.get('created', ''), reverse=True)
+
+    def get(self, file_name):
+        """Возвращает запись каталога по имени файла копии или None"""
+        return self._load().get(file_name)
+
+    def add(self, file_name, kind, created, row_count, balance, category_count, size, checksum):
+        """Добавляет или заменяет запись о копии"""
+        entries = self._load()
+        entries[file_name] = {
+            "file": file_name,
+            "kind": kind,
+            "created": created,
+            "row_count": row_count,
+            "balance": balance,
+            "category_count": category_count,
+            "size": size,
+            "checksum": checksum,
+        }
+        self._save(entries)
+
+    def remove(self, file_names):
+        """Удаляет записи о копиях, которых больше нет"""
+        entries = self._load()
+        removed = [name for name in file_names if entries.pop(name, None) is not None]
+        if removed:
+            self._save(entries)
+        return len(removed)
+
+    def prune_missing(self):
+        """Удаляет записи, файлы которых отсутствуют на диске"""
+        entries = self._load()
+        missing = [name for name in entries
+                   if not os.path.exists(os.path.join(self.backup_dir, name))]
+        return self.remove(missing)
+
+    def file_path(self, entry):
+        """Полный путь к файлу копии по записи каталога"""
+        return os.path.join(self.backup_dir, entry['file'])
+
+    @staticmethod
+    def compare(first, second):
+        """
+        Сравнивает две записи каталога
+
+        Returns:
+            dict: Разница second - first по числу строк, балансу и категориям,
+                а также признак совпадения содержимого по контрольной сумме
+        """
+        return {
+            "row_count": second.get('row_count', 0) - first.get('row_count', 0),
+            "balance": second.get('balance', 0) - first.get('balance', 0),
+            "category_count": second.get('category_count', 0) - first.get('category_count', 0),
+            "same_content": bool(first.get('checksum')) and first.get('checksum') == second.get('checksum'),
+        }
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get('backups'), dict):
+                return data['backups']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Каталог копий {self.path} поврежден: {str(e)}")
+        return {}
+
+    def _save(self, entries):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CATALOG_VERSION, "backups": entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,454 @@
+﻿# logic/backup_store.py
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+import logging
+from datetime import datetime
+from storage.compression import EXTENSIONS, open_for_read, open_for_write
+from logic.backup_catalog import BackupCatalog
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT = "incremental-backup"
+MANIFEST_VERSION = 1
+MANIFEST_EXTENSION = ".fmbak"
+CHUNKS_DIR = "chunks"
+HEAD_FILE = "incremental_head.json"
+CHUNK_EXTENSION = ".json"
+
+# Самостоятельные (не инкрементальные) файлы копий, подпадающие под ротацию
+_STANDALONE_BACKUP = re.compile(r"^(backup|pre_import_backup)_.*\.json(\.gz|\.xz)?$")
+_NAME_TIMESTAMP = re.compile(r"_(\d{8}_\d{6})(?:_(\d{6}))?")
+
+
+class BackupError(Exception):
+    """Ошибка создания или восстановления инкрементальной копии"""
+
+
+def summarize_transactions(transactions):
+    """Баланс и число категорий для записи каталога"""
+    balance = 0
+    categories = set()
+    for transaction in transactions:
+        if isinstance(transaction, dict):
+            amount = transaction.get('amount', 0)
+            if isinstance(amount, (int, float)):
+                balance += amount
+            categories.add(transaction.get('category', ''))
+    return {"balance": balance, "category_count": len(categories)}
+
+
+class BackupRetentionPolicy:
+    """
+    Политика хранения копий
+
+    Сохраняются keep_last последних копий, а также самая свежая копия
+    за каждый из последних keep_daily дней, keep_weekly недель и
+    keep_monthly месяцев, в которые копии создавались.
+    """
+
+    def __init__(self, keep_last=10, keep_daily=7, keep_weekly=4, keep_monthly=12):
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.keep_monthly = keep_monthly
+
+    def select(self, entries):
+        """
+        Выбирает копии, которые нужно сохранить
+
+        Args:
+            entries: Пары (имя, datetime)
+
+        Returns:
+            set: Имена сохраняемых копий
+        """
+        ordered = sorted(entries, key=lambda entry: entry[1], reverse=True)
+        keep = {name for name, _ in ordered[:self.keep_last]}
+
+        buckets = (
+            (self.keep_daily, lambda when: when.date()),
+            (self.keep_weekly, lambda when: when.isocalendar()[:2]),
+            (self.keep_monthly, lambda when: (when.year, when.month)),
+        )
+        for limit, bucket_of in buckets:
+            seen = set()
+            for name, when in ordered:
+                bucket = bucket_of(when)
+                if bucket in seen:
+                    continue
+                if len(seen) >= limit:
+                    break
+                seen.add(bucket)
+                keep.add(name)
+        return keep
+
+
+class IncrementalBackupStore:
+    """
+    Хранилище инкрементальных резервных копий
+
+    Данные режутся на блоки в среднем по chunk_size транзакций. Границы
+    блоков задает содержимое строк (CRC32 строки), а не позиция, поэтому
+    вставка или удаление записи меняет только соседний блок, а не все
+    следующие. Каждый блок сохраняется один раз в chunks/ под именем
+    своего SHA-256. Манифест
+    копии перечисляет только блоки, изменившиеся с предыдущей копии, и
+    ссылается на нее как на родителя. Каждая full_every-я копия - полная,
+    поэтому цепочка восстановления не длиннее full_every манифестов.
+
+    Блоки пишутся через потоковый компрессор (gzip или lzma); после
+    каждой копии применяется политика хранения retention. Копии, пути
+    которых возвращает pinned() (на них ссылается журнал отмены), ротация
+    не удаляет. Создание копий и ротация выполняются под собственной
+    блокировкой хранилища копий, чтобы параллельные копии не перепутали
+    голову цепочки.
+    """
+
+    def __init__(self, backup_dir="backups", chunk_size=1000, full_every=10,
+                 compression=None, compression_level=None, retention=None, pinned=None):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Неизвестный вид сжатия: {compression}")
+        self.backup_dir = backup_dir
+        self.chunks_dir = os.path.join(backup_dir, CHUNKS_DIR)
+        self.chunk_size = chunk_size
+        self.full_every = full_every
+        self.compression = compression
+        self.compression_level = compression_level
+        self.retention = retention
+        self.pinned = pinned
+        self.catalog = BackupCatalog(backup_dir)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def is_manifest(data):
+        """Проверяет, что загруженный JSON - манифест инкрементальной копии"""
+        return isinstance(data, dict) and data.get('format') == MANIFEST_FORMAT
+
+    def create_backup(self, transactions, kind="backup", summary=None):
+        """
+        Создает инкрементальную копию и регистрирует ее в каталоге
+
+        Args:
+            transactions: Последовательность транзакций
+            kind (str): Префикс имени манифеста
+            summary (dict, optional): Готовые 'balance' и 'category_count'
+                для каталога; иначе считаются по transactions
+
+        Returns:
+            str: Путь к манифесту
+        """
+        with self._lock:
+            return self._create_backup(transactions, kind, summary)
+
+    def _create_backup(self, transactions, kind, summary):
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+        hashes = []
+        written = 0
+        written_bytes = 0
+        for payload in self._chunk_payloads(transactions):
+            chunk_hash, chunk_bytes = self._store_chunk(payload)
+            hashes.append(chunk_hash)
+            written += chunk_bytes > 0
+            written_bytes += chunk_bytes
+
+        parent_name = self._read_head()
+        parent_hashes, parent_chain = None, 0
+        if parent_name is not None:
+            try:
+                parent_hashes, parent_chain = self._resolve(parent_name)
+            except (OSError, ValueError, BackupError) as e:
+                logger.warning(f"Родительская копия {parent_name} недоступна: {str(e)}")
+                parent_name = None
+
+        is_base = parent_name is None or parent_chain + 1 >= self.full_every
+        if is_base:
+            changed = dict(enumerate(hashes))
+            chain_length = 0
+        else:
+            changed = {position: chunk_hash for position, chunk_hash in enumerate(hashes)
+                       if position >= len(parent_hashes) or parent_hashes[position] != chunk_hash}
+            chain_length = parent_chain + 1
+
+        created = datetime.now()
+        manifest_name = f"{kind}_{created.strftime('%Y%m%d_%H%M%S_%f')}{MANIFEST_EXTENSION}"
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "kind": kind,
+            "created": created.isoformat(),
+            "base": is_base,
+            "parent": None if is_base else parent_name,
+            "chain_length": chain_length,
+            "transaction_count": len(transactions),
+            "chunk_size": self.chunk_size,
+            "chunk_count": len(hashes),
+            "chunks": {str(position): chunk_hash for position, chunk_hash in changed.items()},
+        }
+        manifest_path = os.path.join(self.backup_dir, manifest_name)
+        self._write_json(manifest_path, manifest)
+        self._write_json(os.path.join(self.backup_dir, HEAD_FILE), {"manifest": manifest_name})
+
+        logger.info(f"Создана {'полная' if is_base else 'инкрементальная'} копия {manifest_path}: "
+                    f"{len(changed)} из {len(hashes)} блоков в манифесте, {written} новых")
+
+        if summary is None:
+            summary = summarize_transactions(transactions)
+        # Контрольная сумма состояния: одинаковые данные дают одинаковый хеш
+        state_checksum = hashlib.sha256("\n".join(hashes).encode('ascii')).hexdigest()
+        self.catalog.add(
+            manifest_name, kind, manifest['created'], len(transactions),
+            summary['balance'], summary['category_count'],
+            os.path.getsize(manifest_path) + written_bytes, state_checksum
+        )
+
+        if self.retention is not None:
+            try:
+                self.apply_retention()
+            except OSError as e:
+                logger.warning(f"Не удалось применить политику хранения копий: {str(e)}")
+        return manifest_path
+
+    def create_file_backup(self, copy_file, row_count, summary, kind="pre_import_backup"):
+        """
+        Создает копию на уровне файла без чтения и сериализации транзакций
+
+        Args:
+            copy_file: Функция copy_file(target_path) -> bool, копирующая
+                файл данных; False - формат нельзя скопировать напрямую
+            row_count (int): Число транзакций для каталога
+            summary (dict): 'balance' и 'category_count' для каталога
+            kind (str): Префикс имени файла копии
+
+        Returns:
+            str: Путь к копии или None, если файл скопировать нельзя
+        """
+        with self._lock:
+            return self._create_file_backup(copy_file, row_count, summary, kind)
+
+    def _create_file_backup(self, copy_file, row_count, summary, kind):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        created = datetime.now()
+        backup_name = f"{kind}_{created.strftime('%Y%m%d_%H%M%S_%f')}.json"
+        backup_path = os.path.join(self.backup_dir, backup_name)
+        if not copy_file(backup_path):
+            return None
+
+        logger.info(f"Создана файловая копия {backup_path}")
+        # Контрольная сумма не считается: это потребовало бы прочитать файл
+        self.catalog.add(
+            backup_name, kind, created.isoformat(), row_count,
+            summary['balance'], summary['category_count'],
+            os.path.getsize(backup_path), None
+        )
+
+        if self.retention is not None:
+            try:
+                self.apply_retention()
+            except OSError as e:
+                logger.warning(f"Не удалось применить политику хранения копий: {str(e)}")
+        return backup_path
+
+    def apply_retention(self):
+        """
+        Удаляет копии, не попавшие под политику хранения, и осиротевшие блоки
+
+        Предки сохраняемых инкрементальных копий и копии из pinned()
+        сохраняются всегда.
+
+        Returns:
+            int: Количество удаленных файлов
+        """
+        with self._lock:
+            return self._apply_retention()
+
+    def _apply_retention(self):
+        if self.retention is None or not os.path.isdir(self.backup_dir):
+            return 0
+
+        manifests, standalone = [], []
+        for name in os.listdir(self.backup_dir):
+            if name.endswith(MANIFEST_EXTENSION):
+                manifests.append(name)
+            elif _STANDALONE_BACKUP.match(name):
+                standalone.append(name)
+
+        entries = [(name, self._backup_time(name)) for name in manifests + standalone]
+        keep = self.retention.select(entries)
+        head = self._read_head()
+        if head is not None:
+            keep.add(head)
+        if self.pinned is not None:
+            keep.update(os.path.basename(path) for path in self.pinned()
+                        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.backup_dir))
+
+        # Инкрементальной копии нужны все манифесты цепочки до полной копии
+        referenced_chunks = set()
+        pending = [name for name in manifests if name in keep]
+        while pending:
+            name = pending.pop()
+            manifest = self._read_manifest(name)
+            if manifest is None:
+                continue
+            referenced_chunks.update(manifest['chunks'].values())
+            parent = manifest.get('parent')
+            if parent and parent not in keep:
+                keep.add(parent)
+                pending.append(parent)
+
+        removed = 0
+        removed_names = []
+        for name in manifests + standalone:
+            if name not in keep:
+                os.remove(os.path.join(self.backup_dir, name))
+                removed_names.append(name)
+                removed += 1
+        self.catalog.remove(removed_names)
+
+        if os.path.isdir(self.chunks_dir):
+            for name in os.listdir(self.chunks_dir):
+                chunk_hash = name.split('.', 1)[0]
+                if chunk_hash not in referenced_chunks:
+                    os.remove(os.path.join(self.chunks_dir, name))
+                    removed += 1
+
+        if removed:
+            logger.info(f"Политика хранения: удалено {removed} файлов резервных копий")
+        return removed
+
+    def load_transactions(self, manifest_path):
+        """Восстанавливает список транзакций на момент создания копии"""
+        backup_dir = os.path.dirname(manifest_path) or self.backup_dir
+        hashes, _ = self._resolve(os.path.basename(manifest_path), backup_dir)
+        chunks_dir = os.path.join(backup_dir, CHUNKS_DIR)
+
+        transactions = []
+        for chunk_hash in hashes:
+            chunk_path = self._find_chunk(chunks_dir, chunk_hash)
+            if chunk_path is None:
+                raise BackupError(f"Отсутствует блок копии {chunk_hash}")
+            with open_for_read(chunk_path, text=False) as f:
+                payload = f.read()
+            if hashlib.sha256(payload).hexdigest() != chunk_hash:
+                raise BackupError(f"Блок копии {chunk_hash} поврежден")
+            transactions.extend(json.loads(payload.decode('utf-8')))
+        return transactions
+
+    def _resolve(self, manifest_name, backup_dir=None):
+        """
+        Собирает полный список хешей блоков, проходя цепочку до полной копии
+
+        Returns:
+            tuple: (список хешей по позициям, длина цепочки манифеста)
+        """
+        backup_dir = backup_dir or self.backup_dir
+        chain = []
+        name = manifest_name
+        while name is not None:
+            if len(chain) > self.full_every * 4 + 1:
+                raise BackupError(f"Цепочка копий {manifest_name} слишком длинная или зациклена")
+            with open(os.path.join(backup_dir, name), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if not self.is_manifest(manifest):
+                raise BackupError(f"Файл {name} не является манифестом копии")
+            chain.append(manifest)
+            name = None if manifest.get('base') else manifest.get('parent')
+            if name is None and not manifest.get('base'):
+                raise BackupError(f"У копии {manifest_name} нет полной базовой копии")
+
+        target = chain[0]
+        hashes = [None] * target['chunk_count']
+        for manifest in reversed(chain):
+            for position, chunk_hash in manifest['chunks'].items():
+                position = int(position)
+                if position < len(hashes):
+                    hashes[position] = chunk_hash
+        if any(chunk_hash is None for chunk_hash in hashes):
+            raise BackupError(f"Копия {manifest_name} ссылается на отсутствующие блоки")
+        return hashes, target.get('chain_length', 0)
+
+    def _chunk_payloads(self, transactions):
+        """
+        Режет записи на блоки по содержимому и отдает JSON каждого блока
+
+        Блок заканчивается на строке, CRC32 которой кратен делителю, но не
+        короче четверти и не длиннее четырех chunk_size строк. Байты блока
+        совпадают с json.dumps списка его записей, поэтому хеши блоков
+        прежних копий остаются действительными.
+        """
+        min_rows = max(1, self.chunk_size // 4)
+        max_rows = self.chunk_size * 4
+        divisor = max(1, self.chunk_size - min_rows)
+        rows = []
+        for transaction in transactions:
+            row = json.dumps(transaction, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            rows.append(row)
+            if len(rows) >= max_rows or (len(rows) >= min_rows and zlib.crc32(row) % divisor == 0):
+                yield b"[" + b",".join(rows) + b"]"
+                rows = []
+        if rows:
+            yield b"[" + b",".join(rows) + b"]"
+
+    def _store_chunk(self, payload):
+        """Сохраняет блок, если такого содержимого еще нет; возвращает (хеш, записано байт)"""
+        # Хеш считается по несжатому содержимому, поэтому смена сжатия
+        # не ломает дедупликацию
+        chunk_hash = hashlib.sha256(payload).hexdigest()
+        if self._find_chunk(self.chunks_dir, chunk_hash) is not None:
+            return chunk_hash, 0
+        chunk_path = os.path.join(
+            self.chunks_dir, f"{chunk_hash}{CHUNK_EXTENSION}{EXTENSIONS[self.compression]}")
+        temp_path = f"{chunk_path}.tmp"
+        with open_for_write(temp_path, self.compression, self.compression_level, text=False) as f:
+            f.write(payload)
+        os.replace(temp_path, chunk_path)
+        return chunk_hash, os.path.getsize(chunk_path)
+
+    @staticmethod
+    def _find_chunk(chunks_dir, chunk_hash):
+        """Ищет файл блока с любым видом сжатия"""
+        for extension in EXTENSIONS.values():
+            path = os.path.join(chunks_dir, f"{chunk_hash}{CHUNK_EXTENSION}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _read_manifest(self, name):
+        try:
+            with open(os.path.join(self.backup_dir, name), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if self.is_manifest(manifest) else None
+        except (OSError, ValueError):
+            return None
+
+    def _backup_time(self, name):
+        """Время копии из имени файла, иначе время изменения файла"""
+        match = _NAME_TIMESTAMP.search(name)
+        if match:
+            try:
+                when = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+                return when.replace(microsecond=int(match.group(2) or 0))
+            except ValueError:
+                pass
+        return datetime.fromtimestamp(os.path.getmtime(os.path.join(self.backup_dir, name)))
+
+    def _read_head(self):
+        try:
+            with open(os.path.join(self.backup_dir, HEAD_FILE), 'r', encoding='utf-8') as f:
+                name = json.load(f).get('manifest')
+            if name and os.path.exists(os.path.join(self.backup_dir, name)):
+                return name
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+
+    @staticmethod
+    def _write_json(path, data):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
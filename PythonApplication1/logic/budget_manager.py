@@ -0,0 +1,289 @@
+﻿# logic/budget_manager.py
+import json
+import math
+import os
+import logging
+from datetime import datetime
+from logic.events import ChangeType
+
+logger = logging.getLogger(__name__)
+
+BUDGETS_FILE = "budgets.json"
+BUDGETS_VERSION = 1
+# Остаток суммы расходов меньше этого значения считается нулем
+SPENT_EPSILON = 1e-9
+
+
+def current_month():
+    """Текущий месяц в формате ГГГГ-ММ"""
+    return datetime.now().strftime("%Y-%m")
+
+
+def _expense_of(transaction):
+    """Ключ (категория, месяц ГГГГ-ММ) и сумма расхода записи или None"""
+    if not isinstance(transaction, dict):
+        return None
+    category = transaction.get('category')
+    date = transaction.get('date')
+    amount = transaction.get('amount')
+    if not isinstance(category, str) or not isinstance(date, str) or len(date) < 7:
+        return None
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount >= 0:
+        return None
+    return (category, date[:7]), -amount
+
+
+def _validated_budget(limit, thresholds):
+    """
+    Лимит и упорядоченные пороги бюджета после проверки
+
+    Raises:
+        ValueError: Лимит или порог не положительное конечное число
+        TypeError: Значения не числа
+    """
+    limit = float(limit)
+    if not math.isfinite(limit) or limit <= 0:
+        raise ValueError("Лимит бюджета должен быть положительным числом")
+    thresholds = tuple(sorted({float(t) for t in thresholds}))
+    if not thresholds or any(not math.isfinite(t) or t <= 0 for t in thresholds):
+        raise ValueError("Пороги бюджета должны быть положительными")
+    return limit, thresholds
+
+
+class BudgetAlert:
+    """Пересечение порога бюджета категории за месяц"""
+
+    __slots__ = ('category', 'month', 'limit', 'spent', 'threshold')
+
+    def __init__(self, category, month, limit, spent, threshold):
+        self.category = category
+        self.month = month
+        self.limit = limit
+        self.spent = spent
+        self.threshold = threshold
+
+    @property
+    def exceeded(self):
+        """True, если расходы превысили сам лимит"""
+        return self.spent > self.limit
+
+    def message(self):
+        if self.exceeded:
+            return (f"Бюджет «{self.category}» за {self.month} превышен: "
+                    f"{self.spent:.2f} из {self.limit:.2f} руб.")
+        return (f"Расходы «{self.category}» за {self.month} достигли {self.threshold:.0%} бюджета: "
+                f"{self.spent:.2f} из {self.limit:.2f} руб.")
+
+    def __repr__(self):
+        return f"BudgetAlert({self.category!r}, {self.month}, {self.spent:.2f}/{self.limit:.2f})"
+
+
+class BudgetManager:
+    """
+    Месячные бюджеты по категориям и предупреждения о порогах
+
+    Суммы расходов по парам (категория, месяц) считаются одним просмотром
+    журнала при создании и после сброса (импорт с заменой, изменение
+    файла другим процессом). Дальше каждое событие добавления, изменения
+    или удаления меняет только сумму своей пары, и пороги этой пары
+    проверяются сразу - без повторного просмотра журнала.
+
+    Предупреждение отправляется подписчикам, когда изменение переводит
+    расходы через порог вверх; повторно оно придет, только если расходы
+    опустятся ниже порога и снова его пересекут. Бюджеты хранятся в
+    небольшом JSON файле.
+    """
+
+    # Доли лимита, при пересечении которых отправляется предупреждение
+    DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+    def __init__(self, transaction_manager, path=BUDGETS_FILE):
+        self.transaction_manager = transaction_manager
+        self.path = path
+        self._budgets = self._load()
+        self._listeners = []
+        self._spent = self._count_spent()
+        transaction_manager.subscribe(self.on_transactions_changed)
+
+    # ----- подписка на предупреждения -----
+
+    def subscribe(self, callback):
+        """Подписывает обработчик на списки BudgetAlert"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Отписывает обработчик предупреждений"""
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    # ----- бюджеты -----
+
+    def budgets(self):
+        """Возвращает словарь категория -> {'limit', 'thresholds'}"""
+        return {category: {"limit": budget["limit"], "thresholds": list(budget["thresholds"])}
+                for category, budget in self._budgets.items()}
+
+    def set_budget(self, category, limit, thresholds=None):
+        """
+        Задает месячный лимит расходов категории
+
+        Args:
+            category (str): Категория
+            limit (float): Лимит расходов за месяц, руб.
+            thresholds (iterable, optional): Доли лимита для предупреждений
+
+        Raises:
+            ValueError: Пустая категория, неположительный лимит или порог
+        """
+        category = category.strip() if isinstance(category, str) else ""
+        if not category:
+            raise ValueError("Не указана категория бюджета")
+        limit, thresholds = _validated_budget(limit, thresholds or self.DEFAULT_THRESHOLDS)
+
+        self._budgets[category] = {"limit": limit, "thresholds": thresholds}
+        self._save()
+        logger.info(f"Бюджет категории {category}: {limit:.2f} руб. в месяц")
+
+    def remove_budget(self, category):
+        """Удаляет бюджет категории; False, если его не было"""
+        if self._budgets.pop(category, None) is None:
+            return False
+        self._save()
+        logger.info(f"Бюджет категории {category} удален")
+        return True
+
+    # ----- расходы -----
+
+    def spent(self, category, month=None):
+        """Расходы категории за месяц ГГГГ-ММ (по умолчанию текущий)"""
+        with self.transaction_manager.lock.read():
+            return self._spent.get((category, month or current_month()), 0.0)
+
+    def status(self, month=None):
+        """
+        Состояние всех бюджетов за месяц
+
+        Returns:
+            list: Словари 'category', 'month', 'limit', 'spent', 'ratio'
+                в порядке категорий
+        """
+        month = month or current_month()
+        result = []
+        with self.transaction_manager.lock.read():
+            for category in sorted(self._budgets):
+                limit = self._budgets[category]["limit"]
+                spent = self._spent.get((category, month), 0.0)
+                result.append({
+                    "category": category,
+                    "month": month,
+                    "limit": limit,
+                    "spent": spent,
+                    "ratio": spent / limit,
+                })
+        return result
+
+    # ----- события -----
+
+    def on_transactions_changed(self, batch):
+        """Обновляет суммы пар, затронутых пакетом, и проверяет их пороги"""
+        if batch.is_reset:
+            self._spent = self._count_spent()
+            return
+
+        # Сумма каждой затронутой пары до пакета
+        before = {}
+        for event in batch:
+            if event.change_type in (ChangeType.DELETED, ChangeType.UPDATED):
+                self._add_expense(event.previous, -1, before)
+            if event.change_type in (ChangeType.ADDED, ChangeType.UPDATED):
+                self._add_expense(event.transaction, 1, before)
+
+        alerts = []
+        for key, old_spent in before.items():
+            alert = self._crossed_threshold(key, old_spent, self._spent.get(key, 0.0))
+            if alert is not None:
+                alerts.append(alert)
+        if alerts:
+            self._notify(alerts)
+
+    def _add_expense(self, transaction, sign, before):
+        expense = _expense_of(transaction)
+        if expense is None:
+            return
+        key, amount = expense
+        total = self._spent.get(key, 0.0)
+        before.setdefault(key, total)
+        total += sign * amount
+        if total > SPENT_EPSILON:
+            self._spent[key] = total
+        else:
+            self._spent.pop(key, None)
+
+    def _crossed_threshold(self, key, old_spent, new_spent):
+        """Предупреждение о самом высоком пороге между old и new или None"""
+        budget = self._budgets.get(key[0])
+        if budget is None or new_spent <= old_spent:
+            return None
+        limit = budget["limit"]
+        for threshold in reversed(budget["thresholds"]):
+            if old_spent < threshold * limit <= new_spent:
+                return BudgetAlert(key[0], key[1], limit, new_spent, threshold)
+        return None
+
+    def _notify(self, alerts):
+        for alert in alerts:
+            logger.warning(alert.message())
+        for callback in list(self._listeners):
+            try:
+                callback(alerts)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика предупреждений бюджета {callback}: {str(e)}")
+
+    def _count_spent(self):
+        """Суммы расходов по парам (категория, месяц) одним просмотром журнала"""
+        spent = {}
+        with self.transaction_manager.lock.read():
+            for transaction in self.transaction_manager.get_all_transactions():
+                expense = _expense_of(transaction)
+                if expense is not None:
+                    key, amount = expense
+                    spent[key] = spent.get(key, 0.0) + amount
+        return spent
+
+    # ----- файл бюджетов -----
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Файл бюджетов {self.path} поврежден: {str(e)}")
+            return {}
+
+        budgets = {}
+        entries = data.get('budgets') if isinstance(data, dict) else None
+        for category, entry in (entries or {}).items():
+            try:
+                limit, thresholds = _validated_budget(
+                    entry['limit'], entry.get('thresholds') or self.DEFAULT_THRESHOLDS)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                logger.warning(f"Пропущен некорректный бюджет категории {category}")
+                continue
+            budgets[category] = {"limit": limit, "thresholds": thresholds}
+        return budgets
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        entries = {category: {"limit": budget["limit"], "thresholds": list(budget["thresholds"])}
+                   for category, budget in self._budgets.items()}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": BUDGETS_VERSION, "budgets": entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
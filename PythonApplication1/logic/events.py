@@ -0,0 +1,112 @@
+﻿# logic/events.py
+import logging
+from contextlib import contextmanager
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeType(Enum):
+    """Тип изменения в наборе транзакций"""
+    ADDED = "added"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    RESET = "reset"
+
+
+class TransactionEvent:
+    """Событие изменения одной транзакции"""
+
+    __slots__ = ('change_type', 'index', 'transaction', 'previous')
+
+    def __init__(self, change_type, index=None, transaction=None, previous=None):
+        self.change_type = change_type
+        self.index = index
+        self.transaction = transaction
+        self.previous = previous
+
+    def __repr__(self):
+        return f"TransactionEvent({self.change_type.value}, index={self.index})"
+
+
+class ChangeBatch:
+    """Пакет событий, порожденных одной операцией менеджера"""
+
+    def __init__(self, operation, events):
+        self.operation = operation
+        self.events = tuple(events)
+
+    @property
+    def is_reset(self):
+        """True, если набор транзакций был заменен целиком"""
+        return any(event.change_type is ChangeType.RESET for event in self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __repr__(self):
+        return f"ChangeBatch({self.operation!r}, {len(self.events)} событий)"
+
+
+class TransactionEventBus:
+    """
+    Шина уведомлений об изменениях транзакций
+
+    Подписчики получают ChangeBatch - все события одной операции сразу.
+    Внутри batch() события накапливаются и публикуются при выходе
+    из самого внешнего блока.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._pending = None
+        self._operation = None
+        self._depth = 0
+
+    def subscribe(self, callback):
+        """Подписывает обработчик callback(batch) на изменения"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Отписывает обработчик, если он был подписан"""
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    @contextmanager
+    def batch(self, operation):
+        """Группирует события операции в один пакет"""
+        if self._depth == 0:
+            self._pending = []
+            self._operation = operation
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                events, self._pending = self._pending, None
+                operation_name, self._operation = self._operation, None
+                if events:
+                    self.publish(ChangeBatch(operation_name, events))
+
+    def emit(self, change_type, index=None, transaction=None, previous=None):
+        """Регистрирует событие; вне batch() оно публикуется сразу"""
+        event = TransactionEvent(change_type, index, transaction, previous)
+        if self._pending is not None:
+            self._pending.append(event)
+        else:
+            self.publish(ChangeBatch(change_type.value, [event]))
+
+    def publish(self, batch):
+        """Рассылает пакет событий всем подписчикам"""
+        for callback in list(self._subscribers):
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика событий {callback}: {str(e)}")
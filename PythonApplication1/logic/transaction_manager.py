@@ -1,18 +1,445 @@
 ﻿import json
 import os
+import time
 import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from operator import itemgetter
 from datetime import datetime
-from storage.data_storage import DataStorage
+from storage.data_storage import DataStorage, SORT_KEYS
+from storage.binary_snapshot import SnapshotTransactions
+from storage.sorted_order import SortedOrder
+from logic.events import TransactionEventBus, ChangeType
+from logic.undo_log import (OP_DELETE, OP_INSERT, OP_REPLACE, OP_RESTORE, OP_UPDATE,
+                            ReplaceDiff, UndoEntry, UndoLog, inverse_operations)
+from logic.backup_store import IncrementalBackupStore, BackupRetentionPolicy
+from storage.compression import COMPRESSION_GZIP, compression_for_path, open_for_read, open_for_write
+from storage.interchange import (read_csv_header, read_csv_rows, read_jsonl_rows,
+                                 write_csv_rows, write_jsonl_rows)
+from validators.data_validator import TRANSACTION_SCHEMA
 
 logger = logging.getLogger(__name__)
 
 
+def is_valid_transaction_structure(transaction):
+    """Проверяет валидность структуры транзакции по общей схеме"""
+    return TRANSACTION_SCHEMA.is_valid(transaction)
+
+
+def _category_of(transaction):
+    """Категория записи или None, если у записи нет строковой категории"""
+    category = transaction.get('category') if isinstance(transaction, dict) else None
+    return category if isinstance(category, str) else None
+
+
+def _count_category(counts, transaction, delta):
+    category = _category_of(transaction)
+    if category is None:
+        return
+    counts[category] += delta
+    if counts[category] <= 0:
+        del counts[category]
+
+
+class OperationCancelled(Exception):
+    """Долгая операция (импорт, экспорт) остановлена по запросу"""
+
+
+def _check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled("Операция отменена")
+
+
+def _cancellable(rows, cancel):
+    """Пропускает строки, прерывая поток при установке события cancel"""
+    if cancel is None:
+        yield from rows
+        return
+    for row in rows:
+        if cancel.is_set():
+            raise OperationCancelled("Операция отменена")
+        yield row
+
+
+def _check_limit(limit):
+    if not isinstance(limit, int) or limit <= 0:
+        raise ValueError(f"Размер страницы должен быть положительным: {limit!r}")
+
+
+def _read_locked(method):
+    """Выполняет метод менеджера под блокировкой чтения хранилища"""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _write_locked(method):
+    """Выполняет метод менеджера под исключительной блокировкой хранилища"""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _storage_order_key(transaction):
+    """Ключ порядка хранения: записи различаются только индексом"""
+    return None
+
+
+def transaction_fingerprint(transaction):
+    """
+    Отпечаток транзакции для поиска дубликатов при слиянии
+
+    Кортеж из даты, суммы, категории и описания, а не его hash(): при
+    совпадении хешей разных записей слияние отбросило бы настоящую
+    транзакцию как дубликат. Равные числа равны и как ключи Counter,
+    поэтому 10 и 10.0 дают одинаковый отпечаток.
+    """
+    return (
+        str(transaction.get('date', '')),
+        transaction.get('amount', 0),
+        transaction.get('category', ''),
+        transaction.get('description', ''),
+    )
+
+
+def normalize_transaction(transaction):
+    """Нормализует данные транзакции"""
+    try:
+        normalized = transaction.copy()
+
+        if isinstance(normalized['amount'], str):
+            try:
+                normalized['amount'] = float(normalized['amount'])
+            except ValueError:
+                normalized['amount'] = 0.0
+
+        normalized['category'] = normalized['category'].strip()
+
+        if 'description' in normalized:
+            if not isinstance(normalized['description'], str):
+                normalized['description'] = str(normalized.get('description', ''))
+            normalized['description'] = normalized['description'].strip()
+        else:
+            normalized['description'] = ''
+
+        return normalized
+
+    except Exception as e:
+        logger.error(f"Ошибка нормализации транзакции: {str(e)}")
+        return transaction
+
+
+def validate_transaction_chunk(start, transactions):
+    """
+    Проверяет и нормализует блок импортируемых записей
+
+    Функция уровня модуля, чтобы ее можно было выполнять в пуле процессов.
+
+    Args:
+        start (int): Номер первой записи блока в исходных данных
+        transactions (list): Записи блока
+
+    Returns:
+        tuple: (валидные нормализованные записи, [(номер, запись, ошибка), ...] пропущенных)
+    """
+    return TRANSACTION_SCHEMA.validate_many(transactions, start, normalize_transaction)
+
+
+class TransactionPage:
+    """Страница результатов постраничного запроса"""
+
+    def __init__(self, items, indices, next_cursor=None, offset=0, total=None):
+        self.items = items
+        self.indices = indices
+        self.next_cursor = next_cursor
+        self.offset = offset
+        self.total = total
+
+    @property
+    def has_more(self):
+        """True, если за страницей есть еще результаты"""
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
 class TransactionManager:
     """Менеджер транзакций - бизнес-логика приложения"""
 
-    def __init__(self):
-        self.data_storage = DataStorage()
+    # Поля сортировки постраничных запросов; None - порядок хранения
+    SORT_FIELDS = tuple(SORT_KEYS)
+    DEFAULT_PAGE_SIZE = 100
+    EXPORT_PAGE_SIZE = 1000
+    # Импорт от этого размера проверяется в пуле процессов
+    PARALLEL_IMPORT_THRESHOLD = 100000
+    IMPORT_CHUNK_SIZE = 20000
+    # Режимы импорта: замена всех транзакций или слияние без дубликатов
+    IMPORT_REPLACE = "replace"
+    IMPORT_MERGE = "merge"
+    BACKUP_DIR = "backups"
+    BACKUP_COMPRESSION = COMPRESSION_GZIP
+    # Шаг отмены с большим числом операций (слияние импорта) применяется
+    # одной заменой журнала вместо поштучной записи на диск
+    BULK_UNDO_THRESHOLD = 50
+
+    def __init__(self, data_storage=None):
+        if data_storage is None:
+            data_storage = DataStorage()
+        self.data_storage = data_storage
+        # Общая с хранилищем блокировка: составные операции менеджера
+        # (импорт, события, сводки) выполняются целиком под ней
+        self.lock = data_storage.lock
+        self.events = TransactionEventBus()
+        self.backup_store = IncrementalBackupStore(
+            self.BACKUP_DIR,
+            compression=self.BACKUP_COMPRESSION,
+            retention=BackupRetentionPolicy(),
+            pinned=self._undo_backup_paths
+        )
+        # Индексы записей с некорректной структурой; None - еще не вычислены.
+        # Обновляются по событиям, поэтому каждая запись проверяется один раз
+        self._invalid_indices = None
+        self.events.subscribe(self._track_validity)
+        # Число записей по категориям; None - еще не подсчитано. Список
+        # категорий берется отсюда, а не повторным просмотром журнала
+        self._category_counts = None
+        self.events.subscribe(self._track_categories)
+        # Журнал отмены строится по тем же событиям: каждое изменение
+        # хранится как обратные операции, а не как копия журнала
+        self.undo_log = UndoLog()
+        self._replace_undo = None
+        self._replaying = None
+        self.events.subscribe(self._record_undo)
+
+    def subscribe(self, callback):
+        """Подписывает обработчик на пакеты событий об изменениях"""
+        self.events.subscribe(callback)
+
+    def unsubscribe(self, callback):
+        """Отписывает обработчик от событий об изменениях"""
+        self.events.unsubscribe(callback)
+
+    @_read_locked
+    def get_invalid_indices(self):
+        """
+        Возвращает множество индексов записей с некорректной структурой
+
+        Все записи проверяются один раз; дальше множество поддерживается по
+        событиям изменений, и при отображении записи повторно не проверяются.
+        Множество нельзя изменять.
+        """
+        if self._invalid_indices is None:
+            self._invalid_indices = {index for index, _, _ in
+                                     TRANSACTION_SCHEMA.invalid_rows(self.get_all_transactions())}
+        return self._invalid_indices
+
+    def _track_validity(self, batch):
+        """Сдвигает индексы некорректных записей по событиям изменений"""
+        if self._invalid_indices is None:
+            return
+        if batch.is_reset:
+            self._invalid_indices = None
+            return
+
+        invalid = self._invalid_indices
+        for event in batch:
+            index = event.index
+            if event.change_type is ChangeType.ADDED:
+                if invalid:
+                    invalid = {i + 1 if i >= index else i for i in invalid}
+                if not TRANSACTION_SCHEMA.is_valid(event.transaction):
+                    invalid.add(index)
+            elif event.change_type is ChangeType.DELETED:
+                invalid.discard(index)
+                if invalid:
+                    invalid = {i - 1 if i > index else i for i in invalid}
+            elif event.change_type is ChangeType.UPDATED:
+                if TRANSACTION_SCHEMA.is_valid(event.transaction):
+                    invalid.discard(index)
+                else:
+                    invalid.add(index)
+        self._invalid_indices = invalid
+
+    @_read_locked
+    def get_category_counts(self):
+        """
+        Возвращает Counter числа записей по категориям
+
+        Журнал просматривается один раз, дальше счетчик поддерживается по
+        событиям изменений. Записи без строковой категории не считаются.
+        Счетчик нельзя изменять.
+        """
+        if self._category_counts is None:
+            transactions = self.data_storage.view()
+            if isinstance(transactions, SnapshotTransactions):
+                self._category_counts = transactions.category_counts()
+            else:
+                counts = Counter(_category_of(transaction) for transaction in transactions)
+                counts.pop(None, None)
+                self._category_counts = counts
+        return self._category_counts
+
+    def _track_categories(self, batch):
+        """Пересчитывает число записей по категориям по событиям изменений"""
+        if self._category_counts is None:
+            return
+        if batch.is_reset:
+            self._category_counts = None
+            return
+
+        counts = self._category_counts
+        for event in batch:
+            if event.change_type is ChangeType.ADDED:
+                _count_category(counts, event.transaction, 1)
+            elif event.change_type is ChangeType.DELETED:
+                _count_category(counts, event.previous, -1)
+            elif event.change_type is ChangeType.UPDATED:
+                _count_category(counts, event.previous, -1)
+                _count_category(counts, event.transaction, 1)
+
+    def _record_undo(self, batch):
+        """Запоминает обратные операции пакета событий в журнале отмены"""
+        replace_undo, self._replace_undo = self._replace_undo, None
+        if batch.operation == "external":
+            self.undo_log.clear()
+            return
+        operations = [replace_undo] if batch.is_reset and replace_undo else inverse_operations(batch)
+        if not operations:
+            # Замена без разницы и копии: прежние индексы больше не верны
+            self.undo_log.clear()
+            return
+
+        if batch.operation == "undo":
+            self.undo_log.push_redo(UndoEntry(self._replaying, operations))
+        elif batch.operation == "redo":
+            self.undo_log.push_undo(UndoEntry(self._replaying, operations))
+        else:
+            self.undo_log.record(UndoEntry(batch.operation, operations))
+
+    def can_undo(self):
+        """Название операции, которую отменит undo(), или None"""
+        entry = self.undo_log.peek_undo()
+        return entry.title if entry is not None else None
+
+    def can_redo(self):
+        """Название операции, которую повторит redo(), или None"""
+        entry = self.undo_log.peek_redo()
+        return entry.title if entry is not None else None
+
+    @_write_locked
+    def undo(self):
+        """
+        Отменяет последнее изменение
+
+        Обратные операции применяются с обычными событиями изменений,
+        поэтому представления обновляют только затронутые строки.
+
+        Returns:
+            str: Название отмененной операции или None, если отменять нечего
+
+        Raises:
+            StorageConflictError: Данные изменены другим процессом; журнал
+                отмены очищен, подписчики получили событие сброса
+        """
+        return self._replay(self.undo_log.pop_undo(), "undo")
+
+    @_write_locked
+    def redo(self):
+        """
+        Повторяет последнее отмененное изменение
+
+        Returns:
+            str: Название повторенной операции или None, если повторять нечего
+        """
+        return self._replay(self.undo_log.pop_redo(), "redo")
+
+    def _replay(self, entry, direction):
+        if entry is None:
+            return None
+        self._replaying = entry.operation
+        try:
+            with self.events.batch(direction):
+                self._apply_operations(entry.operations)
+        except Exception:
+            # Шаг мог примениться частично - остальные шаги уже неверны
+            self.undo_log.clear()
+            raise
+        finally:
+            self._replaying = None
+            self.sync_external_changes()
+        logger.info(f"{'Отменено' if direction == 'undo' else 'Повторено'}: {entry.title}")
+        return entry.title
+
+    def _apply_operations(self, operations):
+        """Применяет обратные операции шага отмены, сообщая о каждом изменении"""
+        if len(operations) > self.BULK_UNDO_THRESHOLD and all(
+                operation[0] in (OP_INSERT, OP_DELETE, OP_UPDATE) for operation in operations):
+            current = list(self.data_storage.get_all_transactions())
+            target = list(current)
+            for operation in operations:
+                if operation[0] == OP_DELETE:
+                    del target[operation[1]]
+                elif operation[0] == OP_INSERT:
+                    target.insert(operation[1], operation[2])
+                else:
+                    target[operation[1]] = operation[2]
+            self._replace_with(target, current)
+            return
+
+        for operation in operations:
+            kind = operation[0]
+            if kind == OP_DELETE:
+                removed = self.data_storage.delete_transaction(operation[1])
+                if removed is None:
+                    raise IndexError(f"Индекс {operation[1]} вне диапазона")
+                self.events.emit(ChangeType.DELETED, operation[1], previous=removed)
+            elif kind == OP_INSERT:
+                index = self.data_storage.insert_transaction(operation[1], operation[2])
+                self.events.emit(ChangeType.ADDED, index, operation[2])
+            elif kind == OP_UPDATE:
+                previous = self.data_storage.update_transaction(operation[1], operation[2])
+                self.events.emit(ChangeType.UPDATED, operation[1], operation[2], previous)
+            elif kind == OP_REPLACE:
+                current = self.data_storage.get_all_transactions()
+                self._replace_with(operation[1].apply(current), current)
+            elif kind == OP_RESTORE:
+                target = self._load_backup_transactions(operation[1])
+                self._replace_with(target, self.data_storage.get_all_transactions())
+
+    def _replace_with(self, target, current):
+        """Заменяет журнал на target; обратный шаг - разница до current"""
+        reverse = ReplaceDiff.build(target, current)
+        if not self.data_storage.replace_all_transactions(target):
+            raise IOError("Не удалось заменить транзакции")
+        self._replace_undo = (OP_REPLACE, reverse)
+        self.events.emit(ChangeType.RESET)
+
+    def _replace_undo_operation(self, previous, backup_path):
+        """
+        Обратная операция импорта с заменой
+
+        Если прежний журнал был в памяти (режим JSON), хранится разница
+        с новым; иначе - путь к копии, созданной перед импортом.
+        """
+        if previous is not None:
+            diff = ReplaceDiff.build(self.data_storage.view(), previous)
+            logger.debug(f"Разница для отмены импорта: {len(diff)} элементов")
+            return OP_REPLACE, diff
+        if backup_path:
+            return OP_RESTORE, backup_path
+        return None
 
+    @_write_locked
     def add_transaction(self, amount, category, date, description=""):
         """Добавляет новую транзакцию"""
         transaction = {
@@ -21,40 +448,109 @@ class TransactionManager:
             'date': date,
             'description': description
         }
-        self.data_storage.add_transaction(transaction)
+        try:
+            with self.events.batch("add"):
+                index = self.data_storage.add_transaction(transaction)
+                self.events.emit(ChangeType.ADDED, index, transaction)
+        finally:
+            self.sync_external_changes()
+
+    @_write_locked
+    def add_transactions(self, transactions, source="add"):
+        """
+        Добавляет транзакции одним пакетом с одной записью на диск
+
+        Записи не проверяются: передаются уже нормализованные транзакции
+        (см. TRANSACTION_SCHEMA и normalize_transaction).
 
+        Returns:
+            list: Индексы добавленных транзакций в порядке transactions
+        """
+        try:
+            with self.events.batch(source):
+                indices = self.data_storage.add_transactions(transactions)
+                # По возрастанию итоговых индексов: каждая вставка верна
+                # для списка с уже примененными предыдущими
+                for index, transaction in sorted(zip(indices, transactions), key=itemgetter(0)):
+                    self.events.emit(ChangeType.ADDED, index, transaction)
+            return indices
+        finally:
+            self.sync_external_changes()
+
+    @_read_locked
     def get_all_transactions(self):
         """Возвращает все транзакции"""
         return self.data_storage.get_all_transactions()
 
+    @_read_locked
     def get_transaction_by_index(self, index):
         """Возвращает транзакцию по индексу"""
-        transactions = self.get_all_transactions()
-        if 0 <= index < len(transactions):
-            return transactions[index]
-        return None
+        return self.data_storage.get_transaction(index)
 
+    @_write_locked
     def update_transaction(self, index, updated_data):
-        """Обновляет транзакцию по индексу"""
-        self.data_storage.update_transaction(index, updated_data)
+        """
+        Обновляет транзакцию по индексу
+
+        Raises:
+            StorageConflictError: Данные изменены другим процессом; подписчики
+                уже получили событие сброса, изменение нужно повторить
+        """
+        try:
+            with self.events.batch("update"):
+                previous = self.data_storage.update_transaction(index, updated_data)
+                self.events.emit(ChangeType.UPDATED, index, updated_data, previous)
+        finally:
+            self.sync_external_changes()
 
+    @_write_locked
     def delete_transaction(self, index):
-        """Удаляет транзакцию по индексу"""
-        self.data_storage.delete_transaction(index)
+        """
+        Удаляет транзакцию по индексу
 
-    def get_categories(self):
-        """Возвращает список уникальных категорий"""
-        transactions = self.get_all_transactions()
-        categories = set()
+        Raises:
+            StorageConflictError: Данные изменены другим процессом; подписчики
+                уже получили событие сброса, изменение нужно повторить
+        """
+        try:
+            with self.events.batch("delete"):
+                removed = self.data_storage.delete_transaction(index)
+                if removed is not None:
+                    self.events.emit(ChangeType.DELETED, index, previous=removed)
+        finally:
+            self.sync_external_changes()
+
+    @_write_locked
+    def sync_external_changes(self):
+        """
+        Сообщает подписчикам об изменениях файла данных другим процессом
 
-        for transaction in transactions:
-            categories.add(transaction['category'])
+        Проверка стоит нескольких вызовов stat, поэтому ее можно
+        выполнять по таймеру; при изменении отправляется событие сброса.
 
-        return sorted(list(categories))
+        Returns:
+            bool: True, если данные были изменены извне
+        """
+        if not self.data_storage.reload_if_changed():
+            return False
+        logger.info("Данные изменены другим процессом, подписчики обновляются")
+        with self.events.batch("external"):
+            self.events.emit(ChangeType.RESET)
+        return True
 
+    @_read_locked
+    def get_categories(self):
+        """Возвращает список уникальных категорий"""
+        return sorted(self.get_category_counts())
+
+    @_read_locked
     def calculate_balance(self):
         """Рассчитывает общий баланс"""
-        transactions = self.get_all_transactions()
+        # Без копии: снимок считает сумму прямо по колонке
+        transactions = self.data_storage.view()
+        if isinstance(transactions, SnapshotTransactions):
+            return transactions.total_amount()
+
         balance = 0
 
         for transaction in transactions:
@@ -62,6 +558,7 @@ class TransactionManager:
 
         return balance
 
+    @_read_locked
     def filter_by_category(self, category):
         """Фильтрует транзакции по категории"""
         transactions = self.get_all_transactions()
@@ -73,6 +570,7 @@ class TransactionManager:
 
         return filtered
 
+    @_read_locked
     def search_transactions(self, search_text):
         """Ищет транзакции по тексту (без учета регистра)"""
         transactions = self.get_all_transactions()
@@ -86,46 +584,263 @@ class TransactionManager:
 
         return results
 
-    def export_to_json(self, file_path):
+    @_read_locked
+    def query_transactions(self, offset=0, limit=DEFAULT_PAGE_SIZE, sort_by=None, descending=False,
+                           category=None, search_text=None, date_from=None, date_to=None):
+        """
+        Возвращает страницу транзакций по смещению и лимиту
+
+        Args:
+            offset (int): Сколько подходящих транзакций пропустить
+            limit (int): Максимальный размер страницы
+            sort_by (str, optional): 'date', 'date_amount' (дата, затем сумма),
+                'amount', 'category' или None
+            descending (bool): Обратный порядок
+            category (str, optional): Точная категория для фильтра
+            search_text (str, optional): Подстрока в категории или описании
+            date_from (str, optional): Начальная дата YYYY-MM-DD включительно
+            date_to (str, optional): Конечная дата YYYY-MM-DD включительно
+
+        Returns:
+            TransactionPage: Страница; total заполняется для запросов без фильтра
+
+        Raises:
+            ValueError: limit не положительный
+        """
+        _check_limit(limit)
+        matches = self._make_matcher(category, search_text, date_from, date_to)
+        rows, order = self.data_storage.ordered_view(sort_by)
+        ordered = self._iter_ordered(rows, order, sort_by, descending, date_from=date_from, date_to=date_to)
+        items, indices = [], []
+        skipped = 0
+        next_cursor = None
+
+        for cursor, index in ordered:
+            transaction = rows[index]
+            if matches is not None and not matches(transaction):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(items) == limit:
+                next_cursor = last_cursor
+                break
+            items.append(transaction)
+            indices.append(index)
+            last_cursor = cursor
+
+        total = len(rows) if matches is None else None
+        return TransactionPage(items, indices, next_cursor, offset, total)
+
+    @_read_locked
+    def query_after(self, cursor=None, limit=DEFAULT_PAGE_SIZE, sort_by=None, descending=False,
+                    category=None, search_text=None, date_from=None, date_to=None):
+        """
+        Возвращает страницу транзакций после курсора (keyset-пагинация)
+
+        Курсор берется из next_cursor предыдущей страницы: для порядка
+        хранения это индекс, для сортировки - пара (ключ, индекс).
+
+        Returns:
+            TransactionPage: Страница с курсором следующей страницы
+
+        Raises:
+            ValueError: limit не положительный
+        """
+        _check_limit(limit)
+        matches = self._make_matcher(category, search_text, date_from, date_to)
+        items, indices = [], []
+        next_cursor = None
+
+        rows, order = self.data_storage.ordered_view(sort_by)
+        for position, index in self._iter_ordered(rows, order, sort_by, descending, cursor, date_from, date_to):
+            transaction = rows[index]
+            if matches is not None and not matches(transaction):
+                continue
+            if len(items) == limit:
+                next_cursor = last_cursor
+                break
+            items.append(transaction)
+            indices.append(index)
+            last_cursor = position
+
+        return TransactionPage(items, indices, next_cursor)
+
+    def iter_transactions(self, page_size=DEFAULT_PAGE_SIZE, sort_by=None, descending=False,
+                          category=None, search_text=None, date_from=None, date_to=None):
+        """
+        Итерирует транзакции, запрашивая их у хранилища постранично
+
+        Каждая страница читается под блокировкой, но между страницами
+        данные могут измениться; для согласованного обхода итерацию
+        выполняют под lock.read() или используют snapshot().
+        """
+        cursor = None
+        while True:
+            page = self.query_after(cursor, page_size, sort_by, descending, category, search_text,
+                                    date_from, date_to)
+            yield from page.items
+            if not page.has_more:
+                return
+            cursor = page.next_cursor
+
+    @_read_locked
+    def sorted_order(self, sort_by=None):
+        """
+        Копия поддерживаемого хранилищем порядка для представления
+
+        Копируется готовый список пар, журнал не сортируется. Дальше
+        представление само поддерживает копию по событиям изменений
+        (SortedOrder.insert/update/remove) и не запрашивает порядок
+        заново при каждом обновлении.
+
+        Args:
+            sort_by (str, optional): Поле из SORT_FIELDS; None - порядок хранения
+        """
+        if sort_by is None:
+            count = self.data_storage.get_transactions_count()
+            return SortedOrder(_storage_order_key, [(None, index) for index in range(count)])
+        if sort_by not in self.SORT_FIELDS:
+            raise ValueError(f"Неизвестное поле сортировки: {sort_by}")
+        return SortedOrder(SORT_KEYS[sort_by], list(self.data_storage.get_sorted_order(sort_by)))
+
+    @_read_locked
+    def snapshot(self):
+        """
+        Согласованная копия всех транзакций для долгих чтений
+
+        Список копируется под блокировкой чтения, после чего изменения
+        продолжаются и на копию не влияют: хранилище заменяет записи, а не
+        изменяет их на месте.
+        """
+        return list(self.data_storage.get_all_transactions())
+
+    @contextmanager
+    def export_rows(self):
+        """
+        Источник транзакций для экспорта: (количество, итерируемые записи)
+
+        Данные JSON хранилища уже в памяти - экспорт пишет их копию, не
+        задерживая изменения. Файл записей и разделы читаются постранично
+        под блокировкой чтения, чтобы не загружать все записи в память;
+        изменения в это время ждут окончания экспорта.
+        """
+        if self.data_storage.storage_mode == DataStorage.MODE_JSON:
+            rows = self.snapshot()
+            yield len(rows), rows
+        else:
+            with self.lock.read():
+                yield (self.data_storage.get_transactions_count(),
+                       self.iter_transactions(self.EXPORT_PAGE_SIZE))
+
+    def _iter_ordered(self, rows, order, sort_by, descending, after=None, date_from=None, date_to=None):
+        """
+        Генерирует пары (курсор, индекс) в заданном порядке после курсора after
+
+        rows и order - результат data_storage.ordered_view(sort_by) одной
+        версии кэша; order None - порядок хранения.
+        """
+        if order is None:
+            # При границах дат хранилище отбрасывает разделы вне диапазона
+            ranges = self.data_storage.get_index_ranges(date_from, date_to, rows)
+            if descending:
+                last = None if after is None else after - 1
+                return ((i, i) for start, stop in reversed(ranges)
+                        for i in range(stop - 1 if last is None else min(stop - 1, last), start - 1, -1))
+            first = 0 if after is None else after + 1
+            return ((i, i) for start, stop in ranges for i in range(max(start, first), stop))
+
+        low, high = 0, len(order)
+        if sort_by in ('date', 'date_amount'):
+            # Ключ порядка начинается с даты: границы находятся двоичным поиском
+            wrap = (lambda bound: (bound,)) if sort_by == 'date' else (lambda bound: ((bound,),))
+            if date_from is not None:
+                low = bisect_left(order, wrap(date_from))
+            if date_to is not None:
+                high = bisect_left(order, wrap(date_to + '\uffff'))
+        if after is not None:
+            # Курсор из JSON: составной ключ приходит списком
+            after = tuple(tuple(part) if isinstance(part, list) else part for part in after)
+        if descending:
+            start = high - 1 if after is None else min(high, bisect_left(order, after)) - 1
+            return ((order[p], order[p][1]) for p in range(start, low - 1, -1))
+        start = low if after is None else max(low, bisect_right(order, after))
+        return ((order[p], order[p][1]) for p in range(start, high))
+
+    @staticmethod
+    def _make_matcher(category, search_text, date_from=None, date_to=None):
+        """Строит предикат фильтрации или None, если фильтр не задан"""
+        if category is None and not search_text and date_from is None and date_to is None:
+            return None
+        search_text = search_text.lower() if search_text else None
+
+        def matches(transaction):
+            if category is not None and transaction['category'] != category:
+                return False
+            if date_from is not None and not str(transaction.get('date', '')) >= date_from:
+                return False
+            # Сравнение по длине границы: "2024-01-31 10:00" входит в date_to="2024-01-31"
+            if date_to is not None and not str(transaction.get('date', ''))[:len(date_to)] <= date_to:
+                return False
+            if search_text and not (search_text in transaction['category'].lower() or
+                                    search_text in transaction.get('description', '').lower()):
+                return False
+            return True
+
+        return matches
+
+    def export_to_json(self, file_path, compression=None, compression_level=None, cancel=None):
         """
         Экспортирует все транзакции в JSON файл
 
         Args:
             file_path (str): Путь для сохранения файла
+            compression (str, optional): "gzip" или "lzma"; по умолчанию
+                определяется по расширению .gz/.xz
+            compression_level (int, optional): Уровень сжатия
+            cancel (threading.Event, optional): Установленное событие
+                прерывает экспорт; недописанный файл удаляется
 
         Returns:
-            bool: True если успешно, False в случае ошибки
+            bool: True если успешно, False в случае ошибки или отмены
         """
         try:
-            transactions = self.get_all_transactions()
+            if compression is None:
+                compression = compression_for_path(file_path)
 
-            export_data = {
-                "export_info": {
+            with self.export_rows() as (transaction_count, transactions):
+                export_info = {
                     "version": "1.0",
                     "export_date": datetime.now().isoformat(),
-                    "transaction_count": len(transactions),
+                    "transaction_count": transaction_count,
                     "application": "Finance Manager"
-                },
-                "transactions": transactions
-            }
+                }
 
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2,
-                          default=self._json_serializer)
+                with open_for_write(file_path, compression, compression_level) as f:
+                    self._write_json_export(f, export_info, _cancellable(transactions, cancel))
 
-            logger.info(f"Успешно экспортировано {len(transactions)} транзакций в {file_path}")
+            logger.info(f"Успешно экспортировано {transaction_count} транзакций в {file_path}")
             return True
 
+        except OperationCancelled:
+            self._remove_partial_export(file_path)
+            return False
         except Exception as e:
             logger.error(f"Ошибка экспорта в {file_path}: {str(e)}")
             return False
 
-    def import_from_json(self, file_path):
+    def import_from_json(self, file_path, parallel=None, mode=IMPORT_REPLACE, cancel=None):
         """
         Импортирует транзакции из JSON файла
 
         Args:
             file_path (str): Путь к файлу для импорта
+            parallel (bool, optional): Параллельная проверка записей;
+                None - автоматически для больших файлов
+            mode (str): IMPORT_REPLACE - заменить все транзакции,
+                IMPORT_MERGE - добавить только отсутствующие
+            cancel (threading.Event, optional): Установленное событие
+                прерывает импорт до изменения данных
 
         Returns:
             tuple: (success, message) - успех и сообщение
@@ -134,27 +849,46 @@ class TransactionManager:
             if not os.path.exists(file_path):
                 return False, f"Файл не найден: {file_path}"
 
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # Сжатые копии распаковываются потоково, без временных файлов
+            with open_for_read(file_path) as f:
                 data = json.load(f)
 
-            transactions = self._validate_import_data(data)
+            export_info = data.get('export_info', {}) if isinstance(data, dict) else {}
+            if self.backup_store.is_manifest(data):
+                export_info = {"application": "Finance Manager", "export_date": data.get('created')}
+                data = self.backup_store.load_transactions(file_path)
+
+            _check_cancelled(cancel)
+            transactions = self._validate_import_data(data, parallel)
             if transactions is None:
                 return False, "Некорректный формат файла"
 
             if not transactions:
                 return False, "Файл не содержит корректных транзакций"
 
-            backup_success = self._create_pre_import_backup()
-            if not backup_success:
-                logger.warning("Не удалось создать резервную копию перед импортом")
+            _check_cancelled(cancel)
+            if mode == self.IMPORT_MERGE:
+                return self._merge_transactions(transactions, export_info, file_path)
 
-            self.data_storage.replace_all_transactions(transactions)
+            with self.lock.write():
+                backup_path = self._create_pre_import_backup()
+                if not backup_path:
+                    logger.warning("Не удалось создать резервную копию перед импортом")
 
-            report = self._generate_import_report(transactions, data.get('export_info', {}))
+                previous = self._previous_for_undo()
+                with self.events.batch("import"):
+                    if self.data_storage.replace_all_transactions(transactions):
+                        self._replace_undo = self._replace_undo_operation(previous, backup_path)
+                        self.events.emit(ChangeType.RESET)
+
+            report = self._generate_import_report(transactions, export_info)
 
             logger.info(f"Успешно импортировано {len(transactions)} транзакций из {file_path}")
             return True, report
 
+        except OperationCancelled:
+            logger.info(f"Импорт из {file_path} отменен")
+            return False, "Импорт отменен"
         except json.JSONDecodeError as e:
             logger.error(f"Ошибка JSON в файле {file_path}: {str(e)}")
             return False, f"Ошибка формата JSON: {str(e)}"
@@ -162,24 +896,301 @@ class TransactionManager:
             logger.error(f"Ошибка импорта из {file_path}: {str(e)}")
             return False, f"Ошибка импорта: {str(e)}"
 
+    def export_to_csv(self, file_path, column_mapping=None, delimiter=',',
+                      compression=None, compression_level=None, cancel=None):
+        """
+        Потоково экспортирует транзакции в CSV
+
+        Args:
+            file_path (str): Путь для сохранения файла
+            column_mapping (dict, optional): Поле транзакции -> заголовок столбца
+            delimiter (str): Разделитель столбцов
+            compression (str, optional): "gzip" или "lzma"; по умолчанию
+                определяется по расширению .gz/.xz
+            compression_level (int, optional): Уровень сжатия
+            cancel (threading.Event, optional): Установленное событие
+                прерывает экспорт; недописанный файл удаляется
+
+        Returns:
+            bool: True если успешно, False в случае ошибки или отмены
+        """
+        return self._export_stream(
+            file_path, compression, compression_level,
+            lambda f, transactions: write_csv_rows(f, transactions, column_mapping, delimiter),
+            cancel)
+
+    def export_to_jsonl(self, file_path, compression=None, compression_level=None, cancel=None):
+        """Потоково экспортирует транзакции в JSON Lines (одна транзакция на строку)"""
+        return self._export_stream(
+            file_path, compression, compression_level,
+            lambda f, transactions: write_jsonl_rows(f, transactions, self._json_serializer),
+            cancel)
+
+    def get_csv_columns(self, file_path, delimiter=None):
+        """Возвращает заголовки столбцов CSV файла для настройки соответствия полей"""
+        with open_for_read(file_path, newline='') as f:
+            header, _ = read_csv_header(f, delimiter)
+        return header
+
+    def import_from_csv(self, file_path, column_mapping=None, delimiter=None, mode=IMPORT_REPLACE,
+                        cancel=None):
+        """
+        Потоково импортирует транзакции из CSV
+
+        Строки читаются по одной, проверяются и нормализуются так же, как
+        при импорте JSON.
+
+        Args:
+            file_path (str): Путь к файлу для импорта
+            column_mapping (dict, optional): Поле транзакции -> заголовок
+                столбца, например {"amount": "Сумма операции"}
+            delimiter (str, optional): Разделитель; None - по заголовку
+            mode (str): IMPORT_REPLACE или IMPORT_MERGE
+            cancel (threading.Event, optional): Установленное событие
+                прерывает импорт; уже записанные блоки откатываются из
+                резервной копии перед импортом
+
+        Returns:
+            tuple: (success, message) - успех и сообщение
+        """
+        return self._import_stream(
+            file_path, mode, lambda f: read_csv_rows(f, column_mapping, delimiter), cancel)
+
+    def import_from_jsonl(self, file_path, mode=IMPORT_REPLACE, cancel=None):
+        """Потоково импортирует транзакции из JSON Lines; см. import_from_csv"""
+        return self._import_stream(file_path, mode, read_jsonl_rows, cancel)
+
+    def _export_stream(self, file_path, compression, compression_level, write_rows, cancel=None):
+        """Пишет транзакции постранично через write_rows(f, transactions)"""
+        try:
+            if compression is None:
+                compression = compression_for_path(file_path)
+
+            started = time.perf_counter()
+            with self.export_rows() as (_, transactions), \
+                    open_for_write(file_path, compression, compression_level, newline='') as f:
+                count = write_rows(f, _cancellable(transactions, cancel))
+            elapsed = time.perf_counter() - started
+
+            logger.info(f"Экспортировано {count} транзакций в {file_path} за {elapsed:.2f} с "
+                        f"({count / max(elapsed, 1e-9):.0f} строк/с)")
+            return True
+
+        except OperationCancelled:
+            self._remove_partial_export(file_path)
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка экспорта в {file_path}: {str(e)}")
+            return False
+
+    def _remove_partial_export(self, file_path):
+        """Удаляет файл прерванного экспорта"""
+        logger.info(f"Экспорт в {file_path} отменен")
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить недописанный файл {file_path}: {str(e)}")
+
+    @_write_locked
+    def _import_stream(self, file_path, mode, read_rows, cancel=None):
+        """
+        Импортирует транзакции из потока строк read_rows(f)
+
+        В режимах файла записей и разделов транзакции дописываются блоками по
+        IMPORT_CHUNK_SIZE, поэтому память не зависит от размера файла;
+        JSON хранилище держит все транзакции в памяти и записывается один раз.
+        """
+        if not os.path.exists(file_path):
+            return False, f"Файл не найден: {file_path}"
+
+        batch_size = (self.IMPORT_CHUNK_SIZE
+                      if self.data_storage.storage_mode != DataStorage.MODE_JSON else None)
+        existing = self._fingerprints() if mode == self.IMPORT_MERGE else None
+        backup = {"path": None, "previous": None}
+        pending = []
+        stats = {"read": 0, "written": 0, "skipped": 0, "duplicates": 0,
+                 "income": 0, "expense": 0, "categories": set()}
+
+        def flush():
+            if not pending:
+                return
+            if stats["written"] == 0:
+                backup["path"] = self._create_pre_import_backup()
+                if not backup["path"]:
+                    logger.warning("Не удалось создать резервную копию перед импортом")
+                backup["previous"] = self._previous_for_undo()
+                if existing is None and not self.data_storage.replace_all_transactions(pending):
+                    raise IOError("Не удалось заменить транзакции")
+            if existing is not None or stats["written"] > 0:
+                self.data_storage.add_transactions(pending)
+            stats["written"] += len(pending)
+            pending.clear()
+
+        started = time.perf_counter()
+        try:
+            with self.events.batch("import"):
+                try:
+                    with open_for_read(file_path, newline='') as f:
+                        for row in _cancellable(read_rows(f), cancel):
+                            stats["read"] += 1
+                            error = TRANSACTION_SCHEMA.first_error(row)
+                            if error is not None:
+                                stats["skipped"] += 1
+                                logger.warning(f"Пропущена некорректная строка #{stats['read']} ({error}): {row}")
+                                continue
+                            transaction = normalize_transaction(row)
+                            if existing is not None:
+                                fingerprint = transaction_fingerprint(transaction)
+                                if existing[fingerprint] > 0:
+                                    existing[fingerprint] -= 1
+                                    stats["duplicates"] += 1
+                                    continue
+
+                            pending.append(transaction)
+                            if transaction['amount'] > 0:
+                                stats["income"] += 1
+                            elif transaction['amount'] < 0:
+                                stats["expense"] += 1
+                            stats["categories"].add(transaction['category'])
+                            if batch_size and len(pending) >= batch_size:
+                                flush()
+                        flush()
+                    if stats["written"]:
+                        self._replace_undo = self._replace_undo_operation(
+                            backup["previous"], backup["path"])
+                except OperationCancelled:
+                    if stats["written"] and not self._rollback_import(backup["path"]):
+                        return False, (f"Импорт отменен, но {stats['written']} транзакций уже записаны; "
+                                       f"прежние данные сохранены в резервной копии перед импортом")
+                    logger.info(f"Импорт из {file_path} отменен")
+                    return False, "Импорт отменен"
+                finally:
+                    if stats["written"]:
+                        self.events.emit(ChangeType.RESET)
+
+        except Exception as e:
+            logger.error(f"Ошибка импорта из {file_path}: {str(e)}")
+            message = f"Ошибка импорта: {str(e)}"
+            if stats["written"]:
+                message += (f"\nУспели записаться {stats['written']} транзакций; "
+                            f"прежние данные сохранены в резервной копии перед импортом")
+            return False, message
+
+        elapsed = time.perf_counter() - started
+        if stats["written"] == 0 and stats["duplicates"] == 0:
+            return False, "Файл не содержит корректных транзакций"
+
+        throughput = stats["read"] / max(elapsed, 1e-9)
+        logger.info(f"Импортировано {stats['written']} транзакций из {file_path} за {elapsed:.2f} с "
+                    f"({throughput:.0f} строк/с)")
+
+        report = f"""✅ Импорт завершен успешно!
+
+📊 Статистика импортированных данных:
+• Прочитано строк: {stats['read']}
+• Импортировано транзакций: {stats['written']}
+• Доходы: {stats['income']}
+• Расходы: {stats['expense']}
+• Уникальных категорий: {len(stats['categories'])}
+• Пропущено некорректных строк: {stats['skipped']}"""
+        if existing is not None:
+            report += f"\n• Пропущено уже существующих транзакций: {stats['duplicates']}"
+        report += f"\n\n⏱️ Время: {elapsed:.2f} с ({throughput:.0f} строк/с)"
+        return True, report
+
+    def _rollback_import(self, backup_path):
+        """
+        Возвращает данные из копии, созданной перед прерванным импортом
+
+        Returns:
+            bool: True, если прежние данные восстановлены
+        """
+        if not backup_path:
+            return False
+        try:
+            restored = self.data_storage.replace_all_transactions(
+                self._load_backup_transactions(backup_path))
+            if restored:
+                logger.info(f"Прерванный импорт откатан из {backup_path}")
+            return restored
+        except Exception as e:
+            logger.error(f"Ошибка отката импорта из {backup_path}: {str(e)}")
+            return False
+
+    def _previous_for_undo(self):
+        """
+        Журнал до импорта для разницы отмены
+
+        Только в режиме JSON, где журнал и так целиком в памяти (копия
+        списка не копирует записи); снимок декодируется, так как при
+        замене он закрывается. В остальных режимах отмена импорта
+        использует копию перед импортом.
+        """
+        if self.data_storage.storage_mode != DataStorage.MODE_JSON:
+            return None
+        return list(self.data_storage.get_all_transactions())
+
+    def _load_backup_transactions(self, backup_path):
+        """Транзакции из копии перед импортом (файл данных или инкрементальная копия)"""
+        with open_for_read(backup_path) as f:
+            data = json.load(f)
+        if self.backup_store.is_manifest(data):
+            data = self.backup_store.load_transactions(backup_path)
+        if isinstance(data, dict):
+            data = data.get('transactions', [])
+        if not isinstance(data, list):
+            raise ValueError(f"Копия {backup_path} не содержит списка транзакций")
+        return data
+
+    def _fingerprints(self):
+        """Мультимножество отпечатков транзакций журнала"""
+        return Counter(transaction_fingerprint(t) for t in self.get_all_transactions()
+                       if isinstance(t, dict))
+
+    @_write_locked
+    def _merge_transactions(self, transactions, export_info, file_path):
+        """
+        Добавляет одним пакетом только транзакции, которых еще нет
+
+        Существующие отпечатки считаются как мультимножество: две
+        одинаковые покупки в файле при одной в журнале дают одну новую.
+        """
+        existing = self._fingerprints()
+        new_transactions = []
+        for transaction in transactions:
+            fingerprint = transaction_fingerprint(transaction)
+            if existing[fingerprint] > 0:
+                existing[fingerprint] -= 1
+            else:
+                new_transactions.append(transaction)
+        duplicates = len(transactions) - len(new_transactions)
+
+        if new_transactions:
+            if not self._create_pre_import_backup():
+                logger.warning("Не удалось создать резервную копию перед импортом")
+            self.add_transactions(new_transactions, "import")
+
+        report = self._generate_import_report(new_transactions, export_info)
+        report += f"\n\n🔁 Пропущено уже существующих транзакций: {duplicates}"
+
+        logger.info(f"Слияние из {file_path}: добавлено {len(new_transactions)}, "
+                    f"пропущено дубликатов {duplicates}")
+        return True, report
+
     def create_backup(self, backup_path=None):
         """
         Создает резервную копию данных
 
         Args:
-            backup_path (str, optional): Путь для бэкапа. Если None - автоматический
+            backup_path (str, optional): Путь для полного JSON экспорта.
+                Если None - создается инкрементальная копия в backups/
 
         Returns:
             bool: True если успешно, False в случае ошибки
         """
         try:
             if backup_path is None:
-                backup_dir = "backups"
-                if not os.path.exists(backup_dir):
-                    os.makedirs(backup_dir)
-
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_path = os.path.join(backup_dir, f"backup_{timestamp}.json")
+                return self.create_incremental_backup() is not None
 
             return self.export_to_json(backup_path)
 
@@ -187,18 +1198,74 @@ class TransactionManager:
             logger.error(f"Ошибка создания резервной копии: {str(e)}")
             return False
 
+    @_read_locked
+    def create_incremental_backup(self, kind="backup"):
+        """
+        Создает инкрементальную резервную копию
+
+        Сохраняются только блоки транзакций, изменившиеся с прошлой копии.
+
+        Args:
+            kind (str): Префикс имени манифеста копии
+
+        Returns:
+            str: Путь к манифесту копии или None в случае ошибки
+        """
+        try:
+            return self.backup_store.create_backup(self.data_storage.view(), kind,
+                                                   self._backup_summary())
+        except Exception as e:
+            logger.error(f"Ошибка создания инкрементальной копии: {str(e)}")
+            return None
+
+    def list_backups(self):
+        """
+        Возвращает записи каталога резервных копий, начиная с новых
+
+        Содержимое копий не читается - данные берутся из каталога.
+        """
+        try:
+            self.backup_store.catalog.prune_missing()
+            return self.backup_store.catalog.entries()
+        except Exception as e:
+            logger.error(f"Ошибка чтения каталога копий: {str(e)}")
+            return []
+
+    def _write_json_export(self, f, export_info, transactions):
+        """
+        Потоково пишет документ экспорта
+
+        Результат совпадает с json.dump(..., indent=2), но транзакции
+        сериализуются по одной и не собираются в общий список.
+        """
+        def dumps(value, prefix):
+            text = json.dumps(value, ensure_ascii=False, indent=2, default=self._json_serializer)
+            return text.replace('\n', '\n' + prefix)
+
+        f.write('{\n  "export_info": ')
+        f.write(dumps(export_info, '  '))
+        f.write(',\n  "transactions": [')
+        written = 0
+        for transaction in transactions:
+            f.write(',\n    ' if written else '\n    ')
+            f.write(dumps(transaction, '    '))
+            written += 1
+        f.write('\n  ]\n}' if written else ']\n}')
+
     def _json_serializer(self, obj):
         """Сериализатор для объектов, которые не могут быть сериализованы JSON по умолчанию"""
         if isinstance(obj, datetime):
             return obj.isoformat()
         raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
-    def _validate_import_data(self, data):
+    def _validate_import_data(self, data, parallel=None):
         """
         Валидирует и извлекает транзакции из импортируемых данных
 
         Args:
             data: Загруженные данные
+            parallel (bool, optional): Проверять записи в нескольких процессах.
+                None - выбрать автоматически по объему данных
 
         Returns:
             list: Список валидных транзакций или None при ошибке
@@ -211,13 +1278,20 @@ class TransactionManager:
             else:
                 return None
 
+            if parallel is None:
+                parallel = (len(transactions) >= self.PARALLEL_IMPORT_THRESHOLD
+                            and (os.cpu_count() or 1) > 1)
+
+            if parallel:
+                chunk_results = self._validate_chunks_parallel(transactions)
+            else:
+                chunk_results = [validate_transaction_chunk(0, transactions)]
+
             valid_transactions = []
-            for i, transaction in enumerate(transactions):
-                if self._is_valid_transaction_structure(transaction):
-                    normalized = self._normalize_transaction(transaction)
-                    valid_transactions.append(normalized)
-                else:
-                    logger.warning(f"Пропущена некорректная транзакция #{i}: {transaction}")
+            for valid, skipped in chunk_results:
+                valid_transactions.extend(valid)
+                for i, transaction, error in skipped:
+                    logger.warning(f"Пропущена некорректная транзакция #{i} ({error}): {transaction}")
 
             return valid_transactions
 
@@ -225,72 +1299,78 @@ class TransactionManager:
             logger.error(f"Ошибка валидации импортируемых данных: {str(e)}")
             return None
 
-    def _is_valid_transaction_structure(self, transaction):
-        """Проверяет валидность структуры транзакции"""
-        try:
-            if not isinstance(transaction, dict):
-                return False
-
-            required_fields = ['amount', 'category', 'date']
-            for field in required_fields:
-                if field not in transaction:
-                    return False
-
-            if not isinstance(transaction['amount'], (int, float)):
-                return False
-
-            if not isinstance(transaction['category'], str) or not transaction['category'].strip():
-                return False
-
-            if not isinstance(transaction['date'], str) or not transaction['date'].strip():
-                return False
-
-            return True
+    def _validate_chunks_parallel(self, transactions):
+        """
+        Проверяет записи блоками в пуле процессов
 
-        except Exception:
-            return False
+        Результаты возвращаются в исходном порядке блоков. Если пул
+        процессов недоступен, проверка выполняется в текущем процессе.
+        """
+        # Пул процессов нужен только большим импортам; модуль multiprocessing
+        # заметно замедляет запуск, поэтому загружается здесь
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        chunk_size = self.IMPORT_CHUNK_SIZE
+        starts = range(0, len(transactions), chunk_size)
+        chunks = (transactions[start:start + chunk_size] for start in starts)
+        try:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(validate_transaction_chunk, starts, chunks))
+            logger.info(f"Параллельная проверка импорта: {len(transactions)} записей, "
+                        f"{len(starts)} блоков")
+            return results
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Пул процессов недоступен, проверка выполняется последовательно: {str(e)}")
+            return [validate_transaction_chunk(0, transactions)]
 
     def _normalize_transaction(self, transaction):
         """Нормализует данные транзакции"""
-        try:
-            normalized = transaction.copy()
+        return normalize_transaction(transaction)
 
-            if isinstance(normalized['amount'], str):
-                try:
-                    normalized['amount'] = float(normalized['amount'])
-                except ValueError:
-                    normalized['amount'] = 0.0
-
-            normalized['category'] = normalized['category'].strip()
+    def _backup_summary(self):
+        """Баланс и число категорий для каталога копий или None"""
+        try:
+            return {
+                "balance": self.calculate_balance(),
+                "category_count": len(self.get_category_counts()),
+            }
+        except (KeyError, TypeError):
+            # Некорректные записи - сводку посчитает хранилище копий
+            return None
 
-            if 'description' in normalized:
-                if not isinstance(normalized['description'], str):
-                    normalized['description'] = str(normalized.get('description', ''))
-                normalized['description'] = normalized['description'].strip()
-            else:
-                normalized['description'] = ''
+    def _undo_backup_paths(self):
+        """Копии перед импортом, нужные журналу отмены; ротация их не удаляет"""
+        return self.undo_log.backup_paths()
 
-            return normalized
+    def _create_pre_import_backup(self):
+        """
+        Создает резервную копию перед импортом
 
-        except Exception as e:
-            logger.error(f"Ошибка нормализации транзакции: {str(e)}")
-            return transaction
+        Файл данных копируется (или связывается жесткой ссылкой) без
+        разбора; инкрементальная копия создается, только если формат
+        хранения нельзя скопировать напрямую.
 
-    def _create_pre_import_backup(self):
-        """Создает резервную копию перед импортом"""
+        Returns:
+            str: Путь к копии или None, если копию создать не удалось
+        """
         try:
-            backup_dir = "backups"
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(backup_dir, f"pre_import_backup_{timestamp}.json")
+            summary = self._backup_summary()
+            if summary is not None:
+                try:
+                    backup_path = self.backup_store.create_file_backup(
+                        self.data_storage.copy_data_file,
+                        self.data_storage.get_transactions_count(), summary)
+                    if backup_path is not None:
+                        return backup_path
+                except OSError as e:
+                    logger.warning(f"Не удалось скопировать файл данных: {str(e)}")
 
-            return self.export_to_json(backup_path)
+            return self.create_incremental_backup("pre_import_backup")
 
         except Exception as e:
             logger.error(f"Ошибка создания предварительной резервной копии: {str(e)}")
-            return False
+            return None
 
     def _generate_import_report(self, transactions, export_info):
         """Генерирует отчет об импорте"""
@@ -0,0 +1,188 @@
+﻿# logic/undo_log.py
+import logging
+from collections import deque
+from logic.events import ChangeType
+
+logger = logging.getLogger(__name__)
+
+# Обратные операции записи журнала отмены:
+#   (OP_INSERT, index, transaction) - вернуть удаленную запись
+#   (OP_DELETE, index)              - убрать добавленную запись
+#   (OP_UPDATE, index, transaction) - вернуть прежнюю версию записи
+#   (OP_REPLACE, ReplaceDiff)       - собрать весь журнал из текущего по разнице
+#   (OP_RESTORE, backup_path)       - вернуть журнал из копии перед импортом
+OP_INSERT = "insert"
+OP_DELETE = "delete"
+OP_UPDATE = "update"
+OP_REPLACE = "replace"
+OP_RESTORE = "restore"
+
+# Названия операций для сообщений интерфейса
+OPERATION_TITLES = {
+    "add": "добавление",
+    "update": "изменение",
+    "delete": "удаление",
+    "import": "импорт",
+}
+
+
+def _row_key(row):
+    """Ключ точного совпадения записей при построении разницы"""
+    if isinstance(row, dict):
+        try:
+            key = tuple(sorted(row.items()))
+            hash(key)
+            return key
+        except TypeError:
+            return repr(sorted(row.items(), key=lambda item: str(item[0])))
+    return repr(row)
+
+
+class ReplaceDiff:
+    """
+    Компактная разница между двумя версиями журнала
+
+    Целевой журнал описывается отрезками (позиция, позиция в исходном,
+    длина), скопированными из исходного журнала, и записями, которых в
+    исходном нет. Размер разницы зависит от числа изменений, а не от
+    размера журнала: импорт, дописавший или заменивший часть записей,
+    дает несколько отрезков и только измененные записи.
+    """
+
+    __slots__ = ('length', 'runs', 'rows')
+
+    def __init__(self, length, runs, rows):
+        self.length = length
+        self.runs = runs
+        self.rows = rows
+
+    @classmethod
+    def build(cls, source, target):
+        """
+        Строит разницу, по которой target собирается из source
+
+        Совпадающие записи берутся из source по порядку, поэтому
+        неизменные участки образуют длинные отрезки.
+        """
+        positions = {}
+        for index, row in enumerate(source):
+            positions.setdefault(_row_key(row), deque()).append(index)
+
+        runs = []
+        rows = {}
+        length = 0
+        for position, row in enumerate(target):
+            length += 1
+            candidates = positions.get(_row_key(row))
+            if not candidates:
+                rows[position] = row
+                continue
+            index = candidates.popleft()
+            if runs:
+                start, source_start, count = runs[-1]
+                if start + count == position and source_start + count == index:
+                    runs[-1] = (start, source_start, count + 1)
+                    continue
+            runs.append((position, index, 1))
+        return cls(length, runs, rows)
+
+    def apply(self, source):
+        """Собирает целевой журнал из source"""
+        target = [None] * self.length
+        for start, source_start, count in self.runs:
+            target[start:start + count] = source[source_start:source_start + count]
+        for position, row in self.rows.items():
+            target[position] = row
+        return target
+
+    def __len__(self):
+        """Размер разницы: число отрезков и записей"""
+        return len(self.runs) + len(self.rows)
+
+
+def inverse_operations(batch):
+    """
+    Обратные операции для пакета событий в порядке применения
+
+    События отменяются с конца: индекс каждого верен для журнала, в
+    котором более поздние изменения уже отменены.
+
+    Returns:
+        list: Операции или None, если пакет нельзя отменить по событиям
+    """
+    operations = []
+    for event in reversed(batch.events):
+        if event.change_type is ChangeType.ADDED:
+            operations.append((OP_DELETE, event.index))
+        elif event.change_type is ChangeType.DELETED:
+            operations.append((OP_INSERT, event.index, event.previous))
+        elif event.change_type is ChangeType.UPDATED:
+            operations.append((OP_UPDATE, event.index, event.previous))
+        else:
+            return None
+    return operations
+
+
+class UndoEntry:
+    """Шаг журнала отмены: название операции и ее обратные операции"""
+
+    __slots__ = ('operation', 'operations')
+
+    def __init__(self, operation, operations):
+        self.operation = operation
+        self.operations = operations
+
+    @property
+    def title(self):
+        return OPERATION_TITLES.get(self.operation, self.operation)
+
+
+class UndoLog:
+    """
+    Стеки отмены и повтора из обратных операций
+
+    Хранятся не копии журнала, а операции, возвращающие изменение,
+    поэтому память пропорциональна объему изменений. Число шагов
+    ограничено max_steps; самые старые шаги отбрасываются.
+    """
+
+    MAX_STEPS = 100
+
+    def __init__(self, max_steps=MAX_STEPS):
+        self._undo = deque(maxlen=max_steps)
+        self._redo = deque(maxlen=max_steps)
+
+    def record(self, entry):
+        """Новое изменение: шаг в стек отмены, повторы больше недоступны"""
+        self._undo.append(entry)
+        self._redo.clear()
+
+    def push_undo(self, entry):
+        self._undo.append(entry)
+
+    def push_redo(self, entry):
+        self._redo.append(entry)
+
+    def pop_undo(self):
+        return self._undo.pop() if self._undo else None
+
+    def pop_redo(self):
+        return self._redo.pop() if self._redo else None
+
+    def peek_undo(self):
+        return self._undo[-1] if self._undo else None
+
+    def peek_redo(self):
+        return self._redo[-1] if self._redo else None
+
+    def backup_paths(self):
+        """Пути копий, из которых шаги отмены и повтора восстанавливают журнал"""
+        return {operation[1] for stack in (self._undo, self._redo) for entry in stack
+                for operation in entry.operations if operation[0] == OP_RESTORE}
+
+    def clear(self):
+        """Сбрасывает оба стека: индексы в операциях больше не верны"""
+        if self._undo or self._redo:
+            logger.info("Журнал отмены очищен")
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,124 @@
+﻿# scripts/bench_transaction_list.py
+"""
+Замер прокрутки списка транзакций главного окна
+
+Создает временный журнал из --rows записей в режиме файла записей,
+открывает QListView с моделью и делегатом главного окна и
+прокручивает его страницами и случайными переходами, измеряя время
+перерисовки каждого кадра.
+
+Запуск из каталога проекта (без дисплея - платформа offscreen):
+    QT_QPA_PLATFORM=offscreen python scripts/bench_transaction_list.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication, QListView
+from storage.data_storage import DataStorage
+from logic.transaction_manager import TransactionManager
+from gui.row_presentation import shared_row_presentations
+from gui.transaction_delegate import TransactionDelegate
+from gui.transaction_list_model import TransactionListModel
+from gui.main_window import MainWindow
+
+CATEGORIES = ("Продукты", "Транспорт", "Зарплата", "Кафе", "Связь", "Коммунальные платежи")
+BATCH_SIZE = 100000
+
+
+def random_transaction(rng):
+    return {
+        "date": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "amount": float(rng.choice((-1, 1)) * rng.randint(1, 50000)),
+        "category": rng.choice(CATEGORIES),
+        "description": rng.choice(("", "карта", "наличные", "перевод по номеру телефона")),
+    }
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--frames", type=int, default=200, help="Число кадров прокрутки")
+    parser.add_argument("--budget-ms", type=float, default=16.0,
+                        help="Допустимое время кадра (95-й перцентиль)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = DataStorage(os.path.join(directory, "transactions.json"),
+                              storage_mode=DataStorage.MODE_RECORDS)
+        manager = TransactionManager(storage)
+        for start in range(0, args.rows, BATCH_SIZE):
+            manager.add_transactions([random_transaction(rng)
+                                      for _ in range(min(BATCH_SIZE, args.rows - start))])
+
+        orders = {}
+        build = timed(lambda: orders.setdefault("date", manager.sorted_order("date")))
+        copy = timed(lambda: manager.sorted_order("date"))
+
+        presentations = shared_row_presentations()
+        model = TransactionListModel(manager, presentations)
+        view = QListView()
+        view.setModel(model)
+        view.setItemDelegate(TransactionDelegate(presentations, view))
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setBatchSize(MainWindow.LIST_LAYOUT_BATCH)
+        view.setAlternatingRowColors(True)
+        view.resize(1000, 700)
+        view.show()
+        fill = timed(lambda: (model.set_rows(orders["date"]), app.processEvents()))
+
+        # Остальные порции раскладки выполняются в цикле событий
+        scrollbar = view.verticalScrollBar()
+        layout_frames = []
+        started = time.perf_counter()
+        while scrollbar.maximum() < model.rowCount() - view.viewport().height() // view.sizeHintForRow(0):
+            layout_frames.append(timed(app.processEvents))
+        layout = time.perf_counter() - started
+        frames = []
+        for frame in range(args.frames):
+            if frame % 4 == 3:
+                value = rng.randint(0, scrollbar.maximum())
+            else:
+                value = min(scrollbar.maximum(), scrollbar.value() + scrollbar.pageStep())
+
+            def scroll():
+                scrollbar.setValue(value)
+                view.viewport().repaint()
+            frames.append(timed(scroll))
+
+        view.close()
+        storage.close()
+
+    frames_ms = sorted(frame * 1000 for frame in frames)
+    p95 = frames_ms[min(len(frames_ms) - 1, int(len(frames_ms) * 0.95))]
+    print(f"{args.rows} строк: порядок по дате {build:.2f} с (копия {copy * 1000:.1f} мс), "
+          f"первый экран {fill * 1000:.1f} мс")
+    print(f"Раскладка всех строк: {layout:.2f} с порциями, самая долгая "
+          f"{max(layout_frames, default=0) * 1000:.1f} мс")
+    print(f"Кадры прокрутки: p50 {statistics.median(frames_ms):.2f} мс, p95 {p95:.2f} мс, "
+          f"максимум {frames_ms[-1]:.2f} мс (бюджет {args.budget_ms:.0f} мс)")
+    print(f"Кэш строк: {presentations.hits} попаданий, {presentations.misses} промахов")
+    if p95 > args.budget_ms:
+        print("ОШИБКА: прокрутка медленнее бюджета")
+        return 1
+    print("Проверка пройдена")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+﻿# scripts/load_test_server.py
+"""
+Нагрузочная проверка HTTP сервиса журнала
+
+Клиенты держат по одному keep-alive соединению и отправляют смесь
+запросов: баланс, страницы с фильтрами и пакетное добавление. В конце
+выводятся запросы в секунду и задержки по перцентилям.
+
+Без --url сервис поднимается в этом же процессе на свободном порту со
+временным файлом данных. Запуск из каталога проекта:
+    python scripts/load_test_server.py --clients 8 --seconds 10
+    python scripts/load_test_server.py --url http://127.0.0.1:8765
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.data_storage import DataStorage
+from logic.transaction_manager import TransactionManager
+from server.http_server import LedgerServer
+
+CATEGORIES = ("Продукты", "Транспорт", "Зарплата", "Кафе", "Связь")
+
+
+def random_transaction(rng):
+    return {
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "amount": rng.choice((-1, 1)) * rng.randint(1, 5000),
+        "category": rng.choice(CATEGORIES),
+        "description": "нагрузка",
+    }
+
+
+class Client:
+    def __init__(self, host, port, seed, deadline, batch_size, write_share):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.rng = random.Random(seed)
+        self.deadline = deadline
+        self.batch_size = batch_size
+        self.write_share = write_share
+        self.latencies = {}
+        self.errors = 0
+
+    def request(self, kind, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        started = time.perf_counter()
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        self.latencies.setdefault(kind, []).append(time.perf_counter() - started)
+        if response.status >= 400:
+            self.errors += 1
+
+    def run(self):
+        rng = self.rng
+        while time.monotonic() < self.deadline:
+            choice = rng.random()
+            if choice < self.write_share:
+                batch = [random_transaction(rng) for _ in range(self.batch_size)]
+                self.request("add", "POST", "/transactions",
+                             json.dumps({"transactions": batch}, ensure_ascii=False).encode('utf-8'))
+            elif choice < self.write_share + 0.3:
+                self.request("balance", "GET", "/balance")
+            else:
+                month = rng.randint(1, 12)
+                self.request("query", "GET", f"/transactions?limit=50&sort_by=date&descending=1"
+                                             f"&date_from=2024-{month:02d}-01&date_to=2024-{month:02d}-31")
+        self.connection.close()
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Адрес работающего сервиса; по умолчанию встроенный")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--write-share", type=float, default=0.1, help="Доля запросов добавления")
+    parser.add_argument("--preload", type=int, default=10000,
+                        help="Транзакций во встроенном сервисе перед замером")
+    parser.add_argument("--storage-mode", default=DataStorage.MODE_JSON,
+                        choices=(DataStorage.MODE_JSON, DataStorage.MODE_RECORDS,
+                                 DataStorage.MODE_PARTITIONED),
+                        help="Режим хранения встроенного сервиса")
+    args = parser.parse_args()
+
+    server = None
+    directory = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        directory = tempfile.TemporaryDirectory()
+        os.chdir(directory.name)
+        storage = DataStorage(os.path.join(directory.name, "transactions.json"),
+                              storage_mode=args.storage_mode)
+        manager = TransactionManager(storage)
+        rng = random.Random(0)
+        manager.add_transactions([random_transaction(rng) for _ in range(args.preload)])
+        server = LedgerServer(manager, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+    deadline = time.monotonic() + args.seconds
+    clients = [Client(host, port, seed, deadline, args.batch_size, args.write_share)
+               for seed in range(args.clients)]
+    threads = [threading.Thread(target=client.run) for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = {}
+    for client in clients:
+        for kind, values in client.latencies.items():
+            latencies.setdefault(kind, []).extend(values)
+    total = sum(len(values) for values in latencies.values())
+    errors = sum(client.errors for client in clients)
+
+    print(f"{args.clients} клиентов, {elapsed:.1f} с: {total} запросов, "
+          f"{total / elapsed:.0f} запросов/с, ошибок {errors}")
+    for kind, values in sorted(latencies.items()):
+        print(f"  {kind:8} {len(values):7} запросов  "
+              f"p50 {percentile(values, 0.5) * 1000:7.2f} мс  "
+              f"p95 {percentile(values, 0.95) * 1000:7.2f} мс  "
+              f"p99 {percentile(values, 0.99) * 1000:7.2f} мс")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        storage.close()
+        os.chdir(os.path.dirname(directory.name))
+        directory.cleanup()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+﻿# server/http_server.py
+"""
+Локальный HTTP сервис журнала транзакций (JSON поверх HTTP)
+
+Запуск из каталога проекта:
+    python -m server.http_server --port 8765
+
+Конечные точки:
+    GET  /health                    состояние и число транзакций
+    GET  /balance                   баланс и число транзакций
+    GET  /categories                список категорий
+    GET  /transactions              страница транзакций; параметры offset,
+                                    limit, cursor, sort_by, descending,
+                                    category, search, date_from, date_to
+    POST /transactions              пакетное добавление: {"transactions": [...]}
+    GET  /export?format=jsonl|csv   потоковая выгрузка всех транзакций
+"""
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from storage.data_storage import DataStorage
+from storage.interchange import write_csv_rows, write_jsonl_rows
+from logic.transaction_manager import TransactionManager, normalize_transaction
+from validators.data_validator import ISO_DATE_FORMAT, FieldRule, TransactionSchema
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Наибольший размер тела запроса пакетного добавления
+MAX_BODY_SIZE = 16 * 1024 * 1024
+MAX_PAGE_SIZE = 10000
+
+# Записи от других программ: структура как при импорте, но сумма - конечное
+# число (не bool), дата строго в формате YYYY-MM-DD и ограничена длина
+# текстовых полей
+API_SCHEMA = TransactionSchema([
+    FieldRule('amount', types=(int, float), finite_number=True),
+    FieldRule('category', types=(str,), non_blank=True, max_length=100),
+    FieldRule('date', types=(str,), non_blank=True, date_format=ISO_DATE_FORMAT),
+    FieldRule('description', required=False, types=(str,), max_length=500),
+])
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Проверки ключа курсора по полю сортировки: ключ сравнивается с ключами
+# порядка хранилища, и значение другого типа сломало бы двоичный поиск
+CURSOR_KEY_CHECKS = {
+    'date': lambda key: isinstance(key, str),
+    'date_amount': lambda key: (isinstance(key, list) and len(key) == 2 and
+                                isinstance(key[0], str) and _is_number(key[1])),
+    'amount': _is_number,
+    'category': lambda key: isinstance(key, str),
+}
+
+
+def _valid_cursor(cursor, sort_by):
+    """True, если cursor - значение next_cursor страницы с сортировкой sort_by"""
+    if sort_by is None:
+        return isinstance(cursor, int) and not isinstance(cursor, bool)
+    return (isinstance(cursor, list) and len(cursor) == 2 and
+            isinstance(cursor[1], int) and not isinstance(cursor[1], bool) and
+            CURSOR_KEY_CHECKS[sort_by](cursor[0]))
+
+
+class RequestError(Exception):
+    """Некорректный запрос; сообщение возвращается клиенту"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _reject_constant(name):
+    """parse_constant для json.loads: NaN и Infinity не являются числами JSON"""
+    raise RequestError(f"Недопустимое число {name}", 422)
+
+
+class ChunkedWriter:
+    """
+    Текстовый поток ответа с кодированием Transfer-Encoding: chunked
+
+    Текст копится в буфере и отправляется кусками по CHUNK_SIZE байт,
+    поэтому выгрузка не собирается в памяти целиком.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= self.CHUNK_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if not self._size:
+            return
+        data = b''.join(self._parts)
+        self.stream.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self._parts = []
+        self._size = 0
+
+    def close(self):
+        self.flush()
+        self.stream.write(b"0\r\n\r\n")
+
+
+class LedgerRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов; журнал общий для всех соединений сервера"""
+
+    # HTTP/1.1: соединение остается открытым между запросами (keep-alive)
+    protocol_version = "HTTP/1.1"
+    server_version = "FinanceManager/1.0"
+    # Простаивающее или зависшее соединение закрывается, чтобы не держать
+    # поток и блокировку чтения во время выгрузки
+    timeout = 30
+    # Заголовки и тело уходят разными вызовами send; без TCP_NODELAY
+    # алгоритм Нейгла с отложенным ACK клиента добавляет ~40 мс к ответу
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch({
+            "/health": self.handle_health,
+            "/balance": self.handle_balance,
+            "/categories": self.handle_categories,
+            "/transactions": self.handle_query,
+            "/export": self.handle_export,
+        })
+
+    def do_POST(self):
+        self._dispatch({
+            "/transactions": self.handle_add,
+        })
+
+    def _dispatch(self, routes):
+        self._body_read = False
+        url = urlsplit(self.path)
+        handler = routes.get(url.path.rstrip('/') or '/')
+        try:
+            if handler is None:
+                raise RequestError(f"Неизвестный адрес: {self.command} {url.path}", 404)
+            handler({key: values[-1] for key, values in parse_qs(url.query).items()})
+        except RequestError as e:
+            self._discard_body()
+            self.send_json({"error": str(e)}, e.status)
+        except Exception as e:
+            logger.error(f"Ошибка обработки {self.command} {self.path}: {str(e)}")
+            self._discard_body()
+            self.send_json({"error": "Внутренняя ошибка сервера"}, 500)
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    # ----- конечные точки -----
+
+    def handle_health(self, params):
+        self.send_json({"status": "ok", "count": self.manager.data_storage.get_transactions_count()})
+
+    def handle_balance(self, params):
+        # Ответ отправляется после снятия блокировки: медленный клиент не задерживает запись
+        with self.manager.lock.read():
+            payload = {
+                "balance": self.manager.calculate_balance(),
+                "count": self.manager.data_storage.get_transactions_count(),
+            }
+        self.send_json(payload)
+
+    def handle_categories(self, params):
+        self.send_json({"categories": self.manager.get_categories()})
+
+    def handle_query(self, params):
+        limit = self._int_param(params, 'limit', TransactionManager.DEFAULT_PAGE_SIZE)
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise RequestError(f"limit должен быть от 1 до {MAX_PAGE_SIZE}")
+        sort_by = params.get('sort_by') or None
+        if sort_by is not None and sort_by not in TransactionManager.SORT_FIELDS:
+            raise RequestError(f"Неизвестное поле сортировки: {sort_by}")
+        filters = {
+            "sort_by": sort_by,
+            "descending": params.get('descending', '').lower() in ('1', 'true', 'yes'),
+            "category": params.get('category') or None,
+            "search_text": params.get('search') or None,
+            "date_from": params.get('date_from') or None,
+            "date_to": params.get('date_to') or None,
+        }
+
+        if 'cursor' in params:
+            try:
+                cursor = json.loads(params['cursor'])
+            except ValueError:
+                cursor = None
+            if not _valid_cursor(cursor, sort_by):
+                raise RequestError("cursor должен быть значением next_cursor предыдущей страницы "
+                                   "с той же сортировкой")
+            page = self.manager.query_after(cursor, limit, **filters)
+        else:
+            offset = self._int_param(params, 'offset', 0)
+            page = self.manager.query_transactions(offset, limit, **filters)
+
+        self.send_json({
+            "items": page.items,
+            "indices": page.indices,
+            "next_cursor": page.next_cursor,
+            "total": page.total,
+        })
+
+    def handle_add(self, params):
+        """Пакетное добавление: некорректные записи отклоняют весь пакет"""
+        data = self._read_json_body()
+        transactions = data.get('transactions') if isinstance(data, dict) else data
+        if not isinstance(transactions, list) or not transactions:
+            raise RequestError("Ожидается непустой список transactions")
+
+        valid, rejected = API_SCHEMA.validate_many(transactions, normalize=normalize_transaction)
+        if rejected:
+            raise RequestError("; ".join(f"#{i}: {error}" for i, _, error in rejected[:20]), 422)
+
+        indices = self.manager.add_transactions(valid)
+        logger.info(f"Через HTTP добавлено {len(indices)} транзакций")
+        self.send_json({"added": len(indices), "indices": indices}, 201)
+
+    def handle_export(self, params):
+        export_format = params.get('format', 'jsonl')
+        if export_format == 'jsonl':
+            content_type = "application/x-ndjson; charset=utf-8"
+            write_rows = lambda f, rows: write_jsonl_rows(f, rows, str)
+        elif export_format == 'csv':
+            content_type = "text/csv; charset=utf-8"
+            write_rows = write_csv_rows
+        else:
+            raise RequestError(f"Неизвестный формат выгрузки: {export_format}")
+
+        # Медленный клиент не должен держать блокировку чтения: JSON
+        # хранилище выгружается из копии, файл записей и разделы - страницами,
+        # каждая под своей короткой блокировкой. Изменения между страницами
+        # в выгрузку могут попасть, X-Transaction-Count - число на ее начало
+        if self.manager.data_storage.storage_mode == DataStorage.MODE_JSON:
+            rows = self.manager.snapshot()
+            count = len(rows)
+        else:
+            count = self.manager.data_storage.get_transactions_count()
+            rows = self.manager.iter_transactions(TransactionManager.EXPORT_PAGE_SIZE)
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Transaction-Count", str(count))
+        self.end_headers()
+        writer = ChunkedWriter(self.wfile)
+        try:
+            write_rows(writer, rows)
+            writer.close()
+        except Exception as e:
+            # Заголовки уже отправлены - сообщить об ошибке можно только
+            # обрывом соединения без завершающего блока
+            logger.error(f"Выгрузка прервана: {str(e)}")
+            self.close_connection = True
+
+    # ----- вспомогательные -----
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str, allow_nan=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json_body(self):
+        length = self._content_length()
+        if length > MAX_BODY_SIZE:
+            raise RequestError(f"Тело запроса больше {MAX_BODY_SIZE} байт", 413)
+        body = self.rfile.read(length)
+        self._body_read = True
+        try:
+            return json.loads(body, parse_constant=_reject_constant)
+        except ValueError as e:
+            raise RequestError(f"Некорректный JSON: {str(e)}")
+
+    def _discard_body(self):
+        """Дочитывает тело отклоненного запроса, чтобы не сбить следующий запрос соединения"""
+        length = self._content_length()
+        if self._body_read or not length:
+            return
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            return
+        self.rfile.read(length)
+
+    def _content_length(self):
+        try:
+            return int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.close_connection = True
+            return 0
+
+    @staticmethod
+    def _int_param(params, name, default):
+        try:
+            return int(params.get(name, default))
+        except ValueError:
+            raise RequestError(f"Параметр {name} должен быть целым числом")
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class LedgerServer(ThreadingHTTPServer):
+    """
+    HTTP сервер журнала: каждое соединение обслуживается своим потоком
+
+    Журнал загружается один раз и остается в памяти между запросами;
+    одновременные запросы разделяет блокировка чтения/записи менеджера.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, manager, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.manager = manager
+        super().__init__((host, port), LedgerRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный HTTP сервис журнала транзакций")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="Адрес прослушивания; по умолчанию только локальные подключения")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data", default="transactions.json", help="Файл данных")
+    parser.add_argument("--storage-mode", default=DataStorage.MODE_JSON,
+                        choices=(DataStorage.MODE_JSON, DataStorage.MODE_RECORDS,
+                                 DataStorage.MODE_PARTITIONED))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    storage = DataStorage(args.data, storage_mode=args.storage_mode)
+    server = LedgerServer(TransactionManager(storage), args.host, args.port)
+    logger.info(f"Сервис журнала запущен: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Остановка сервиса журнала")
+    finally:
+        server.server_close()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+﻿# storage/binary_snapshot.py
+import mmap
+import os
+import struct
+import sys
+import zlib
+import logging
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_EXTENSION = ".fmsnap"
+MAGIC = b"FMSNAP01"
+FORMAT_VERSION = 1
+
+# magic, версия, флаги, число строк, число блоков, CRC32 всех блоков
+HEADER = struct.Struct("<8sHHQII")
+# тег блока и длина его содержимого
+BLOCK_HEADER = struct.Struct("<4sQ")
+
+# Колоночные блоки снимка
+BLOCK_AMOUNTS = b"AMNT"        # float64 x n
+BLOCK_ROW_FLAGS = b"RFLG"      # uint8 x n
+BLOCK_DATE_DICT = b"DTDC"      # словарь дат
+BLOCK_DATE_CODES = b"DTCD"     # uint32 x n
+BLOCK_CATEGORY_DICT = b"CTDC"  # словарь категорий
+BLOCK_CATEGORY_CODES = b"CTCD"  # uint32 x n
+BLOCK_DESC_OFFSETS = b"DSOF"   # uint64 x (n + 1)
+BLOCK_DESC_DATA = b"DSDT"      # UTF-8 описания подряд
+
+ROW_INT_AMOUNT = 0x01
+ROW_HAS_DESCRIPTION = 0x02
+
+_FIELDS = frozenset(('amount', 'category', 'date', 'description'))
+_MAX_EXACT_INT = 2 ** 53
+
+
+class SnapshotError(Exception):
+    """Ошибка чтения или записи бинарного снимка"""
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_string_table(strings):
+    """Словарь строк: uint32 количество, uint64 смещения (k + 1), UTF-8 данные"""
+    offsets = array("Q", [0])
+    chunks = []
+    position = 0
+    for value in strings:
+        encoded = value.encode("utf-8")
+        chunks.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    return struct.pack("<I", len(strings)) + _to_little_endian(offsets) + b"".join(chunks)
+
+
+def _decode_string_table(buffer):
+    (count,) = struct.unpack_from("<I", buffer, 0)
+    offsets_end = 4 + (count + 1) * 8
+    offsets = _numeric_column(buffer[4:offsets_end], "Q")
+    data = buffer[offsets_end:]
+    return [str(data[offsets[i]:offsets[i + 1]], "utf-8") for i in range(count)]
+
+
+def _numeric_column(buffer, typecode):
+    """Представляет блок как числовую колонку без копирования, если это возможно"""
+    if sys.byteorder == "little":
+        return buffer.cast(typecode)
+    values = array(typecode)
+    values.frombytes(buffer)
+    values.byteswap()
+    return values
+
+
+def is_snapshot_compatible(transaction):
+    """Проверяет, что транзакцию можно сохранить в снимок без потерь"""
+    if not isinstance(transaction, dict) or not transaction.keys() <= _FIELDS:
+        return False
+    amount = transaction.get('amount')
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return False
+    if isinstance(amount, int) and abs(amount) > _MAX_EXACT_INT:
+        return False
+    if not isinstance(transaction.get('category'), str) or not isinstance(transaction.get('date'), str):
+        return False
+    return isinstance(transaction.get('description', ''), str)
+
+
+def write_snapshot(path, transactions):
+    """
+    Записывает транзакции в бинарный колоночный снимок
+
+    Файл пишется во временный и атомарно подменяет прежний снимок.
+
+    Args:
+        path (str): Путь к файлу снимка
+        transactions: Последовательность словарей транзакций
+
+    Raises:
+        SnapshotError: если запись не может быть представлена в снимке
+    """
+    row_count = len(transactions)
+    amounts = array("d")
+    row_flags = bytearray(row_count)
+    date_index, date_codes = {}, array("I")
+    category_index, category_codes = {}, array("I")
+    desc_offsets = array("Q", [0])
+    desc_chunks = []
+    desc_position = 0
+
+    for i, transaction in enumerate(transactions):
+        if not is_snapshot_compatible(transaction):
+            raise SnapshotError(f"Транзакция #{i} не может быть сохранена в снимок")
+
+        amount = transaction['amount']
+        amounts.append(amount)
+        flags = ROW_INT_AMOUNT if isinstance(amount, int) else 0
+
+        date_codes.append(date_index.setdefault(transaction['date'], len(date_index)))
+        category_codes.append(category_index.setdefault(transaction['category'], len(category_index)))
+
+        if 'description' in transaction:
+            flags |= ROW_HAS_DESCRIPTION
+            encoded = transaction['description'].encode("utf-8")
+            desc_chunks.append(encoded)
+            desc_position += len(encoded)
+        desc_offsets.append(desc_position)
+        row_flags[i] = flags
+
+    blocks = [
+        (BLOCK_AMOUNTS, _to_little_endian(amounts)),
+        (BLOCK_ROW_FLAGS, bytes(row_flags)),
+        (BLOCK_DATE_DICT, _encode_string_table(list(date_index))),
+        (BLOCK_DATE_CODES, _to_little_endian(date_codes)),
+        (BLOCK_CATEGORY_DICT, _encode_string_table(list(category_index))),
+        (BLOCK_CATEGORY_CODES, _to_little_endian(category_codes)),
+        (BLOCK_DESC_OFFSETS, _to_little_endian(desc_offsets)),
+        (BLOCK_DESC_DATA, b"".join(desc_chunks)),
+    ]
+
+    checksum = 0
+    payload = []
+    for tag, data in blocks:
+        block_header = BLOCK_HEADER.pack(tag, len(data))
+        checksum = zlib.crc32(data, zlib.crc32(block_header, checksum))
+        payload.append(block_header)
+        payload.append(data)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, row_count, len(blocks), checksum))
+        for part in payload:
+            f.write(part)
+    os.replace(temp_path, path)
+    logger.debug(f"Снимок {path} записан: {row_count} транзакций")
+
+
+class SnapshotReader:
+    """Отображает файл снимка в память и разбирает заголовок и блоки"""
+
+    def __init__(self, path, verify_checksum=True):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise SnapshotError(f"Файл снимка {path} поврежден: слишком короткий")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        try:
+            self._buffer = memoryview(self._mmap)
+            self._parse(verify_checksum)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, verify_checksum):
+        magic, version, _flags, row_count, block_count, checksum = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"Файл {self.path} не является снимком транзакций")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Неподдерживаемая версия снимка: {version}")
+        if verify_checksum and zlib.crc32(self._buffer[HEADER.size:]) != checksum:
+            raise SnapshotError(f"Контрольная сумма снимка {self.path} не совпадает")
+
+        self.row_count = row_count
+        self.blocks = {}
+        position = HEADER.size
+        for _ in range(block_count):
+            tag, length = BLOCK_HEADER.unpack_from(self._buffer, position)
+            position += BLOCK_HEADER.size
+            if position + length > len(self._buffer):
+                raise SnapshotError(f"Блок {tag!r} выходит за пределы файла {self.path}")
+            self.blocks[tag] = self._buffer[position:position + length]
+            position += length
+
+    def block(self, tag):
+        try:
+            return self.blocks[tag]
+        except KeyError:
+            raise SnapshotError(f"В снимке {self.path} отсутствует блок {tag!r}") from None
+
+    def close(self):
+        """Освобождает отображение файла"""
+        blocks = getattr(self, "blocks", {})
+        for view in blocks.values():
+            view.release()
+        self.blocks = {}
+        if getattr(self, "_buffer", None) is not None:
+            self._buffer.release()
+            self._buffer = None
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class SnapshotTransactions(Sequence):
+    """
+    Ленивое представление транзакций из снимка
+
+    Колонки читаются прямо из отображенного файла; словарь транзакции
+    собирается только при обращении к строке.
+    """
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._amounts = _numeric_column(reader.block(BLOCK_AMOUNTS), "d")
+        self._row_flags = reader.block(BLOCK_ROW_FLAGS)
+        self._dates = _decode_string_table(reader.block(BLOCK_DATE_DICT))
+        self._date_codes = _numeric_column(reader.block(BLOCK_DATE_CODES), "I")
+        self._categories = _decode_string_table(reader.block(BLOCK_CATEGORY_DICT))
+        self._category_codes = _numeric_column(reader.block(BLOCK_CATEGORY_CODES), "I")
+        self._desc_offsets = _numeric_column(reader.block(BLOCK_DESC_OFFSETS), "Q")
+        self._desc_data = reader.block(BLOCK_DESC_DATA)
+        self._length = reader.row_count
+
+        if not (len(self._amounts) == len(self._row_flags) == len(self._date_codes)
+                == len(self._category_codes) == len(self._desc_offsets) - 1 == self._length):
+            raise SnapshotError(f"Размеры колонок снимка {reader.path} не согласованы")
+
+    @classmethod
+    def open(cls, path, verify_checksum=True):
+        """Открывает файл снимка и возвращает ленивую последовательность"""
+        reader = SnapshotReader(path, verify_checksum)
+        try:
+            return cls(reader)
+        except Exception:
+            reader.close()
+            raise
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("индекс снимка вне диапазона")
+        return self._decode(index)
+
+    def _decode(self, index):
+        flags = self._row_flags[index]
+        amount = self._amounts[index]
+        transaction = {
+            'amount': int(amount) if flags & ROW_INT_AMOUNT else amount,
+            'category': self._categories[self._category_codes[index]],
+            'date': self._dates[self._date_codes[index]],
+        }
+        if flags & ROW_HAS_DESCRIPTION:
+            start, end = self._desc_offsets[index], self._desc_offsets[index + 1]
+            transaction['description'] = str(self._desc_data[start:end], "utf-8")
+        return transaction
+
+    def total_amount(self):
+        """Сумма всех транзакций по колонке сумм, без сборки словарей"""
+        return sum(self._amounts)
+
+    def unique_categories(self):
+        """Множество категорий из словаря снимка"""
+        # Словарь строится только из встречающихся категорий
+        return set(self._categories)
+
+    def category_counts(self):
+        """Число записей каждой категории по колонке кодов, без сборки словарей"""
+        counts = Counter(self._category_codes)
+        return Counter({self._categories[code]: count for code, count in counts.items()})
+
+    def close(self):
+        """Закрывает файл снимка; после вызова представление недоступно"""
+        for column in (self._amounts, self._date_codes, self._category_codes, self._desc_offsets):
+            if isinstance(column, memoryview):
+                column.release()
+        self._reader.close()
@@ -0,0 +1,78 @@
+﻿# storage/compression.py
+import gzip
+import lzma
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_LZMA = "lzma"
+
+# Расширение файла для каждого вида сжатия
+EXTENSIONS = {
+    None: "",
+    COMPRESSION_GZIP: ".gz",
+    COMPRESSION_LZMA: ".xz",
+}
+
+DEFAULT_LEVELS = {
+    COMPRESSION_GZIP: 6,
+    COMPRESSION_LZMA: 6,
+}
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+def compression_for_path(path):
+    """Определяет вид сжатия по расширению файла"""
+    lowered = path.lower()
+    for compression, extension in EXTENSIONS.items():
+        if extension and lowered.endswith(extension):
+            return compression
+    return None
+
+
+def detect_compression(path):
+    """Определяет вид сжатия по сигнатуре в начале файла"""
+    with open(path, "rb") as f:
+        header = f.read(len(_XZ_MAGIC))
+    if header.startswith(_GZIP_MAGIC):
+        return COMPRESSION_GZIP
+    if header.startswith(_XZ_MAGIC):
+        return COMPRESSION_LZMA
+    return None
+
+
+def open_for_write(path, compression=None, level=None, text=True, newline=None):
+    """
+    Открывает файл на запись через потоковый компрессор
+
+    Args:
+        path (str): Путь к файлу
+        compression (str, optional): None, "gzip" или "lzma"
+        level (int, optional): Уровень сжатия (0-9)
+        text (bool): Текстовый режим UTF-8 или двоичный
+        newline (str, optional): Как в open(); для модуля csv - ''
+    """
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Неизвестный вид сжатия: {compression}")
+    if level is None:
+        level = DEFAULT_LEVELS.get(compression)
+    encoding = "utf-8" if text else None
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(path, "wt" if text else "wb", compresslevel=level,
+                         encoding=encoding, newline=newline)
+    if compression == COMPRESSION_LZMA:
+        return lzma.open(path, "wt" if text else "wb", preset=level, encoding=encoding, newline=newline)
+    return open(path, "w" if text else "wb", encoding=encoding, newline=newline)
+
+
+def open_for_read(path, text=True, newline=None):
+    """Открывает файл на чтение, распаковывая его на лету, если он сжат"""
+    compression = detect_compression(path)
+    encoding = "utf-8" if text else None
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(path, "rt" if text else "rb", encoding=encoding, newline=newline)
+    if compression == COMPRESSION_LZMA:
+        return lzma.open(path, "rt" if text else "rb", encoding=encoding, newline=newline)
+    return open(path, "r" if text else "rb", encoding=encoding, newline=newline)
@@ -1,54 +1,334 @@
 ﻿# Data storage for transactions
 import json
 import os
+import shutil
+import threading
+import time
 import logging
+from contextlib import contextmanager
+from storage.binary_snapshot import (SNAPSHOT_EXTENSION, SnapshotError,
+                                     SnapshotTransactions, write_snapshot)
+from storage.record_file import INDEX_EXTENSION, RECORD_EXTENSION, RecordFile
+from storage.partitioned_store import MANIFEST_FILE, PARTITIONS_SUFFIX, PartitionedStore
+from storage.file_lock import FileLock, change_token
+from storage.rw_lock import ReadWriteLock
+from storage.sorted_order import SortedOrder
 
 logger = logging.getLogger(__name__)
 
 
+def _date_sort_key(transaction):
+    return str(transaction.get('date', '')) if isinstance(transaction, dict) else ''
+
+
+def _amount_sort_key(transaction):
+    amount = transaction.get('amount') if isinstance(transaction, dict) else None
+    return amount if isinstance(amount, (int, float)) else 0
+
+
+def _category_sort_key(transaction):
+    return str(transaction.get('category', '')).lower() if isinstance(transaction, dict) else ''
+
+
+def _date_amount_sort_key(transaction):
+    return _date_sort_key(transaction), _amount_sort_key(transaction)
+
+
+# Ключи сортировки, доступные для постраничных запросов;
+# date_amount - по дате, в пределах дня по сумме
+SORT_KEYS = {
+    'date': _date_sort_key,
+    'date_amount': _date_amount_sort_key,
+    'amount': _amount_sort_key,
+    'category': _category_sort_key,
+}
+
+
+class StorageConflictError(Exception):
+    """Данные изменены другим процессом, и индекс записи мог устареть"""
+
+
 class DataStorage:
-    """Класс для работы с хранением данных в JSON файле"""
+    """
+    Класс для работы с хранением данных в JSON файле
+
+    Методы можно вызывать из нескольких потоков: чтения выполняются
+    параллельно под lock.read(), изменения - по одному под lock.write().
+    Ленивые последовательности (снимок, файл записей, разделы) читаются
+    безопасно, пока вызывающий удерживает lock.read().
+
+    Чтение тоже может заменить кэш, если файлы изменил другой процесс.
+    Такая замена выполняется под отдельным мьютексом, а уже выданные
+    последовательности остаются открытыми, пока на них есть ссылки.
+    Данные и порядок сортировки одной версии возвращает ordered_view().
+    """
+
+    # Режимы бинарного снимка: None - только JSON,
+    # "alongside" - JSON и снимок, "only" - только снимок
+    SNAPSHOT_ALONGSIDE = "alongside"
+    SNAPSHOT_ONLY = "only"
 
-    def __init__(self, filename="transactions.json"):
+    # Режимы хранения: JSON документ, файл записей с индексом смещений,
+    # отображаемый в память без загрузки всех записей, или разделы по
+    # месяцам, из которых читаются только нужные
+    MODE_JSON = "json"
+    MODE_RECORDS = "records"
+    MODE_PARTITIONED = "partitioned"
+
+    # Как часто (в секундах) чтение проверяет, не изменил ли файлы
+    # другой процесс; запись проверяет всегда
+    CHANGE_CHECK_INTERVAL = 0.5
+
+    def __init__(self, filename="transactions.json", snapshot_mode=None, storage_mode=MODE_JSON):
+        if snapshot_mode not in (None, self.SNAPSHOT_ALONGSIDE, self.SNAPSHOT_ONLY):
+            raise ValueError(f"Неизвестный режим снимка: {snapshot_mode}")
+        if storage_mode not in (self.MODE_JSON, self.MODE_RECORDS, self.MODE_PARTITIONED):
+            raise ValueError(f"Неизвестный режим хранения: {storage_mode}")
+        if storage_mode != self.MODE_JSON and snapshot_mode is not None:
+            raise ValueError("Бинарный снимок используется только в режиме JSON")
         self.filename = filename
-        self.ensure_file_exists()
+        self.snapshot_mode = snapshot_mode
+        self.storage_mode = storage_mode
+        base_name = os.path.splitext(filename)[0]
+        self.snapshot_filename = base_name + SNAPSHOT_EXTENSION
+        self.records_filename = base_name + RECORD_EXTENSION
+        self.records_index_filename = base_name + INDEX_EXTENSION
+        self.partitions_dirname = base_name + PARTITIONS_SUFFIX
+        self._transactions = None
+        self._records = None
+        # Порядки сортировки строятся при первом запросе и далее
+        # поддерживаются при каждом изменении (см. SortedOrder)
+        self._orders = {}
+        self.lock = ReadWriteLock()
+        # Читатели под общим lock.read() перезагружают кэш и строят порядки по одному
+        self._reload_mutex = threading.RLock()
+        self._lock = FileLock(filename)
+        self._token = None
+        self._checked_at = 0.0
+        self._external_change = False
+        with self._lock.exclusive():
+            self.ensure_file_exists()
+            self._token = self._change_token()
 
     def ensure_file_exists(self):
         """Создает файл, если он не существует"""
+        if self.storage_mode != self.MODE_JSON:
+            self._open_records()
+            return
+        if self.snapshot_mode == self.SNAPSHOT_ONLY:
+            # Снимок будет создан при первом сохранении
+            return
         if not os.path.exists(self.filename):
             with open(self.filename, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False, indent=2)
 
     def get_all_transactions(self):
-        """Читает все транзакции из файла"""
-        try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+        """
+        Возвращает все транзакции
+
+        Данные читаются с диска один раз и далее берутся из кэша. В
+        режиме JSON возвращается копия списка - в том числе при загруженном
+        снимке, который закрывается при первом изменении; в режимах файла
+        записей - ленивая последовательность, декодирующая записи при
+        обращении.
+        """
+        with self.lock.read():
+            transactions = self._get_cached_transactions()
+            if self._records is None:
+                return list(transactions)
+            return transactions
+
+    def view(self):
+        """
+        Возвращает закэшированные транзакции без копирования
+
+        Для запросов, читающих много записей по индексу: вызывающий
+        удерживает lock.read() все время использования и не изменяет
+        последовательность.
+        """
+        with self.lock.read():
+            return self._get_cached_transactions()
+
+    def get_transaction(self, index):
+        """Возвращает транзакцию по индексу или None"""
+        with self.lock.read():
+            transactions = self._get_cached_transactions()
+            if 0 <= index < len(transactions):
+                return transactions[index]
+            return None
+
+    def get_sorted_order(self, sort_by):
+        """
+        Возвращает отсортированный список пар (ключ, индекс)
+
+        Порядок строится один раз, а затем изменения данных вставляют,
+        переставляют и убирают в нем отдельные пары, поэтому повторные
+        запросы не сортируют журнал заново. Пары упорядочены по ключу,
+        затем по индексу. Список изменяется на месте: вызывающий
+        удерживает lock.read() все время использования.
+
+        Args:
+            sort_by (str): Поле сортировки из SORT_KEYS
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Неизвестное поле сортировки: {sort_by}")
+        return self.ordered_view(sort_by)[1]
+
+    def ordered_view(self, sort_by=None):
+        """
+        Возвращает транзакции и порядок сортировки одной версии кэша
+
+        view() и get_sorted_order(), вызванные по отдельности, могут
+        вернуть данные разных версий, если между вызовами другой читатель
+        перезагрузил кэш. Здесь оба берутся под мьютексом перезагрузки, и
+        порядок строится по тем же транзакциям, которые возвращаются.
+        Вызывающий удерживает lock.read() все время использования.
+
+        Args:
+            sort_by (str, optional): Поле сортировки из SORT_KEYS
+
+        Returns:
+            tuple: (транзакции, список пар (ключ, индекс) или None без sort_by)
+        """
+        if sort_by is not None and sort_by not in SORT_KEYS:
+            raise ValueError(f"Неизвестное поле сортировки: {sort_by}")
+        with self.lock.read(), self._reload_mutex:
+            transactions = self._get_cached_transactions()
+            if sort_by is None:
+                return transactions, None
+            order = self._orders.get(sort_by)
+            if order is None:
+                order = SortedOrder.build(SORT_KEYS[sort_by], transactions)
+                self._orders[sort_by] = order
+            return transactions, order.pairs
 
     def add_transaction(self, transaction):
-        """Добавляет транзакцию в файл"""
-        transactions = self.get_all_transactions()
-        transactions.append(transaction)
-        self._save_transactions(transactions)
+        """Добавляет транзакцию в файл и возвращает ее индекс"""
+        with self._writing():
+            count = len(self._get_cached_transactions())
+            if self._records is not None:
+                index = self._records.append(transaction)
+            else:
+                transactions = self._get_mutable_transactions()
+                transactions.append(transaction)
+                self._save_transactions(transactions)
+                index = len(transactions) - 1
+            for order in self._orders.values():
+                order.insert(index, transaction, appended=index >= count)
+            return index
+
+    def add_transactions(self, new_transactions):
+        """
+        Добавляет транзакции пакетом с одной записью на диск
+
+        Returns:
+            list: Индексы добавленных транзакций в порядке new_transactions;
+                в разделах по датам они не обязательно идут подряд
+        """
+        with self._writing():
+            if self.storage_mode == self.MODE_PARTITIONED:
+                indices = self._records.extend(new_transactions)
+                self._orders_inserted(indices, new_transactions)
+                return indices
+            if self._records is not None:
+                start = self._records.extend(new_transactions) - len(new_transactions)
+            else:
+                transactions = self._get_mutable_transactions()
+                start = len(transactions)
+                transactions.extend(new_transactions)
+                self._save_transactions(transactions)
+            for order in self._orders.values():
+                order.extend(start, new_transactions)
+            return list(range(start, start + len(new_transactions)))
+
+    def get_index_ranges(self, date_from=None, date_to=None, transactions=None):
+        """
+        Диапазоны индексов (start, stop), в которых могут быть транзакции
+        с датой между date_from и date_to
+
+        В режиме разделов разделы вне диапазона дат не читаются; в
+        остальных режимах возвращается весь диапазон. transactions -
+        последовательность из ordered_view(), к версии которой относятся
+        диапазоны; по умолчанию текущий кэш.
+        """
+        with self.lock.read():
+            if transactions is None:
+                transactions = self._get_cached_transactions()
+            if self.storage_mode == self.MODE_PARTITIONED:
+                return transactions.index_ranges(date_from, date_to)
+            count = len(transactions)
+            return [(0, count)] if count else []
 
     def delete_transaction(self, index):
-        """Удаляет транзакцию по индексу"""
-        transactions = self.get_all_transactions()
-        if 0 <= index < len(transactions):
-            transactions.pop(index)
-            self._save_transactions(transactions)
+        """
+        Удаляет транзакцию по индексу и возвращает удаленную запись
+
+        Raises:
+            StorageConflictError: Данные изменены другим процессом после
+                последнего чтения, индекс мог указывать на другую запись
+        """
+        with self._writing(by_index=True):
+            if self._records is not None:
+                if not 0 <= index < len(self._records):
+                    return None
+                removed = self._records.delete(index)
+            else:
+                transactions = self._get_mutable_transactions()
+                if not 0 <= index < len(transactions):
+                    return None
+                removed = transactions.pop(index)
+                self._save_transactions(transactions)
+            for order in self._orders.values():
+                order.remove(index, removed)
+            return removed
+
+    def insert_transaction(self, index, transaction):
+        """
+        Вставляет транзакцию перед index и возвращает ее итоговый индекс
+
+        В режиме разделов запись попадает в раздел своей даты, поэтому
+        итоговый индекс может отличаться от index.
+
+        Raises:
+            StorageConflictError: Данные изменены другим процессом после
+                последнего чтения, индекс мог указывать на другую запись
+        """
+        with self._writing(by_index=True):
+            count = len(self._get_cached_transactions())
+            if self._records is not None:
+                index = self._records.insert(index, transaction)
+            else:
+                transactions = self._get_mutable_transactions()
+                index = min(max(index, 0), len(transactions))
+                transactions.insert(index, transaction)
+                self._save_transactions(transactions)
+            for order in self._orders.values():
+                order.insert(index, transaction, appended=index >= count)
+            return index
 
     def update_transaction(self, index, updated_data):
-        """Обновляет транзакцию по индексу"""
-        transactions = self.get_all_transactions()
-        if 0 <= index < len(transactions):
-            transactions[index] = updated_data
-            self._save_transactions(transactions)
-            logger.info(f"Транзакция #{index} обновлена в хранилище")
-        else:
-            raise IndexError(f"Индекс {index} вне диапазона")
+        """
+        Обновляет транзакцию по индексу и возвращает прежнюю запись
+
+        Raises:
+            StorageConflictError: Данные изменены другим процессом после
+                последнего чтения, индекс мог указывать на другую запись
+        """
+        with self._writing(by_index=True):
+            transactions = self._records if self._records is not None else self._get_mutable_transactions()
+            if 0 <= index < len(transactions):
+                if self._records is not None:
+                    previous = self._records.update(index, updated_data)
+                else:
+                    previous = transactions[index]
+                    transactions[index] = updated_data
+                    self._save_transactions(transactions)
+                for order in self._orders.values():
+                    order.update(index, previous, updated_data)
+                logger.info(f"Транзакция #{index} обновлена в хранилище")
+                return previous
+            else:
+                raise IndexError(f"Индекс {index} вне диапазона")
 
     def replace_all_transactions(self, new_transactions):
         """
@@ -64,7 +344,14 @@ class DataStorage:
             if not isinstance(new_transactions, list):
                 raise ValueError("new_transactions должен быть списком")
 
-            self._save_transactions(new_transactions)
+            with self._writing():
+                self._orders.clear()
+                if self._records is not None:
+                    self._records.replace_all(new_transactions)
+                else:
+                    self._release_snapshot()
+                    self._transactions = list(new_transactions)
+                    self._save_transactions(self._transactions)
             logger.info(f"Все транзакции заменены. Новое количество: {len(new_transactions)}")
             return True
 
@@ -80,13 +367,256 @@ class DataStorage:
             int: Количество транзакций
         """
         try:
-            transactions = self.get_all_transactions()
-            return len(transactions)
+            with self.lock.read():
+                return len(self._get_cached_transactions())
         except Exception as e:
             logger.error(f"Ошибка получения количества транзакций: {str(e)}")
             return 0
 
+    def _orders_inserted(self, indices, transactions):
+        """
+        Добавляет в порядки записи, вставленные по индексам indices
+
+        Индексы итоговые, поэтому пары вставляются по их возрастанию:
+        каждая вставка верна для порядка с уже вставленными предыдущими.
+        Большой пакет вставок дешевле отсортировать заново при запросе.
+        """
+        if len(indices) > SortedOrder.BATCH_SORT_THRESHOLD:
+            self._orders.clear()
+            return
+        for order in self._orders.values():
+            for index, transaction in sorted(zip(indices, transactions), key=lambda pair: pair[0]):
+                order.insert(index, transaction)
+
+    def reload_if_changed(self):
+        """
+        Проверяет, не изменил ли данные другой процесс
+
+        Кэш при изменении сбрасывается и перечитывается при следующем
+        обращении. Учитываются и изменения, замеченные ранее при чтении
+        или записи, о которых еще не сообщалось.
+
+        Returns:
+            bool: True, если данные изменены извне с прошлого вызова
+        """
+        with self.lock.write(), self._lock.shared():
+            self._check_external_change(force=True)
+            changed = self._external_change
+            self._external_change = False
+        return changed
+
+    def _change_token(self):
+        """Признак версии файлов данных текущего режима"""
+        if self.storage_mode == self.MODE_PARTITIONED:
+            return change_token(os.path.join(self.partitions_dirname, MANIFEST_FILE))
+        if self.storage_mode == self.MODE_RECORDS:
+            return change_token(self.records_filename, self.records_index_filename)
+        if self.snapshot_mode is not None:
+            return change_token(self.filename, self.snapshot_filename)
+        return change_token(self.filename)
+
+    def _check_external_change(self, force=False, release=True):
+        """
+        Сбрасывает кэш, если файлы изменил другой процесс
+
+        Без force проверка выполняется не чаще CHANGE_CHECK_INTERVAL,
+        поэтому частые чтения не обращаются к диску. Вызывается под
+        блокировкой файла. При чтении (release=False) прежние файлы не
+        закрываются: другие потоки могут еще читать их, и они
+        освобождаются вместе с последней ссылкой.
+
+        Returns:
+            bool: True, если данные изменены извне
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.CHANGE_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        token = self._change_token()
+        if token == self._token:
+            return False
+
+        logger.info(f"Файл данных {self.filename} изменен другим процессом, кэш сброшен")
+        self._orders.clear()
+        if self._records is not None:
+            if release:
+                self._records.close()
+            if self.storage_mode == self.MODE_PARTITIONED:
+                self._records = PartitionedStore(self.partitions_dirname)
+            else:
+                self._records = RecordFile(self.records_filename)
+        else:
+            if release:
+                self._release_snapshot()
+            self._transactions = None
+        self._token = token
+        self._external_change = True
+        return True
+
+    @contextmanager
+    def _writing(self, by_index=False):
+        """
+        Исключительная блокировка на время изменения
+
+        Перед изменением кэш сверяется с диском; после - запоминается
+        версия файлов, чтобы собственная запись не считалась внешней.
+        Если запись адресуется индексом (by_index), а данные изменены
+        извне, изменение не выполняется.
+        """
+        with self.lock.write(), self._lock.exclusive():
+            if self._check_external_change(force=True) and by_index:
+                raise StorageConflictError(
+                    f"Файл {self.filename} изменен другим процессом, обновите данные")
+            try:
+                yield
+            except BaseException:
+                # Изменение могло примениться частично - порядки строятся заново
+                self._orders.clear()
+                raise
+            finally:
+                self._token = self._change_token()
+
+    def close(self):
+        """Освобождает отображенные в память файлы"""
+        with self.lock.write():
+            self._release_snapshot()
+            if self._records is not None:
+                self._records.close()
+                self._records = None
+
+    def copy_data_file(self, target_path):
+        """
+        Копирует файл данных на уровне файловой системы
+
+        Файл JSON всегда заменяется переименованием, поэтому вместо копии
+        достаточно жесткой ссылки на текущую версию; если ссылка
+        невозможна (другой диск, FAT), файл копируется целиком.
+
+        Returns:
+            bool: False, если данные на диске не хранятся в виде JSON,
+                пригодного для импорта (файл записей или только снимок)
+        """
+        if (self.storage_mode != self.MODE_JSON or self.snapshot_mode == self.SNAPSHOT_ONLY
+                or not os.path.exists(self.filename)):
+            return False
+        with self.lock.read(), self._lock.shared():
+            try:
+                os.link(self.filename, target_path)
+            except OSError:
+                shutil.copyfile(self.filename, target_path)
+        return True
+
+    def _open_records(self):
+        """Открывает файл записей или разделы; при первом запуске переносит в них JSON"""
+        if self.storage_mode == self.MODE_PARTITIONED:
+            migrate = not PartitionedStore.exists(self.partitions_dirname)
+            self._records = PartitionedStore(self.partitions_dirname)
+            target = self.partitions_dirname
+        else:
+            migrate = not os.path.exists(self.records_filename)
+            self._records = RecordFile(self.records_filename)
+            target = self.records_filename
+        if migrate and os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r', encoding='utf-8') as f:
+                    transactions = json.load(f)
+                if isinstance(transactions, list) and transactions:
+                    self._records.replace_all(transactions)
+                    logger.info(f"Перенесено {len(transactions)} транзакций из {self.filename} "
+                                f"в {target}")
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Не удалось перенести данные из {self.filename}: {str(e)}")
+
+    def _get_cached_transactions(self):
+        """
+        Возвращает кэш транзакций, загружая его при первом обращении
+
+        Проверка внешних изменений и загрузка выполняются под мьютексом
+        и повторяются после его захвата: несколько читателей могут
+        одновременно увидеть истекший интервал, но кэш заменит только
+        первый, а остальные вернут уже загруженную им версию.
+        """
+        cached = self._records if self._records is not None else self._transactions
+        if cached is not None and time.monotonic() - self._checked_at < self.CHANGE_CHECK_INTERVAL:
+            return cached
+        with self._reload_mutex:
+            if self._records is not None:
+                if time.monotonic() - self._checked_at >= self.CHANGE_CHECK_INTERVAL:
+                    with self._lock.shared():
+                        self._check_external_change(release=False)
+                return self._records
+            if self._transactions is None or time.monotonic() - self._checked_at >= self.CHANGE_CHECK_INTERVAL:
+                with self._lock.shared():
+                    self._check_external_change(release=False)
+                    if self._transactions is None:
+                        self._transactions = self._load_transactions()
+            return self._transactions
+
+    def _get_mutable_transactions(self):
+        """Возвращает кэш в виде списка, декодируя снимок перед изменением"""
+        transactions = self._get_cached_transactions()
+        if not isinstance(transactions, list):
+            self._transactions = list(transactions)
+            transactions.close()
+        return self._transactions
+
+    def _release_snapshot(self):
+        """Закрывает отображенный снимок, если кэш на нем основан"""
+        if self._transactions is not None and not isinstance(self._transactions, list):
+            self._transactions.close()
+            self._transactions = None
+
+    def _load_transactions(self):
+        """Загружает транзакции из снимка, если он актуален, иначе из JSON"""
+        if self._snapshot_is_current():
+            try:
+                transactions = SnapshotTransactions.open(self.snapshot_filename)
+                logger.info(f"Загружен снимок {self.snapshot_filename}: {len(transactions)} транзакций")
+                return transactions
+            except (OSError, SnapshotError) as e:
+                logger.warning(f"Не удалось открыть снимок {self.snapshot_filename}: {str(e)}")
+
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return []
+
+    def _snapshot_is_current(self):
+        """Снимок используется, если он не старше JSON файла"""
+        if self.snapshot_mode is None or not os.path.exists(self.snapshot_filename):
+            return False
+        if self.snapshot_mode == self.SNAPSHOT_ONLY or not os.path.exists(self.filename):
+            return True
+        return os.path.getmtime(self.snapshot_filename) >= os.path.getmtime(self.filename)
+
     def _save_transactions(self, transactions):
         """Сохраняет транзакции в файл"""
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(transactions, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        try:
+            if self.snapshot_mode != self.SNAPSHOT_ONLY:
+                self._write_json(transactions)
+            if self.snapshot_mode is not None:
+                self._write_snapshot(transactions)
+        except Exception:
+            # Кэш мог разойтись с диском - перечитаем при следующем обращении
+            self._transactions = None
+            raise
+
+    def _write_json(self, transactions):
+        # Запись через временный файл: прежняя версия и ссылки на нее
+        # (копии перед импортом) остаются нетронутыми
+        temp_path = f"{self.filename}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(transactions, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.filename)
+
+    def _write_snapshot(self, transactions):
+        """Пишет снимок; записи, непредставимые в снимке, сохраняются в JSON"""
+        try:
+            write_snapshot(self.snapshot_filename, transactions)
+        except SnapshotError as e:
+            logger.warning(f"Снимок не записан, используется JSON: {str(e)}")
+            if os.path.exists(self.snapshot_filename):
+                os.remove(self.snapshot_filename)
+            if self.snapshot_mode == self.SNAPSHOT_ONLY:
+                self._write_json(transactions)
\ No newline at end of file
@@ -0,0 +1,121 @@
+﻿# storage/file_lock.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+
+
+class FileLockTimeout(Exception):
+    """Блокировку не удалось получить за отведенное время"""
+
+
+class FileLock:
+    """
+    Рекомендательная межпроцессная блокировка файла данных
+
+    Блокируется отдельный файл <путь>.lock, поэтому данные можно
+    заменять переименованием. На POSIX используется fcntl.flock с
+    разделяемым (чтение) и исключительным (запись) режимами; в Windows
+    msvcrt.locking поддерживает только исключительный режим, и
+    разделяемая блокировка там тоже исключительная.
+
+    Внутри процесса блокировка реентерабельна: вложенные захваты
+    только увеличивают счетчик, а запрос записи внутри чтения
+    повышает режим до исключительного.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path + LOCK_SUFFIX
+        self.timeout = timeout
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def shared(self):
+        """Блокировка на чтение"""
+        with self._thread_lock:
+            self._acquire(exclusive=False)
+            try:
+                yield
+            finally:
+                self._release()
+
+    @contextmanager
+    def exclusive(self):
+        """Блокировка на запись"""
+        with self._thread_lock:
+            self._acquire(exclusive=True)
+            try:
+                yield
+            finally:
+                self._release()
+
+    def _acquire(self, exclusive):
+        if self._depth and (self._exclusive or not exclusive):
+            self._depth += 1
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        self._lock(exclusive)
+        self._exclusive = exclusive or self._exclusive
+        self._depth += 1
+
+    def _release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+            os.close(self._fd)
+            self._fd = None
+            self._exclusive = False
+
+    def _lock(self, exclusive):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                    fcntl.flock(self._fd, mode | fcntl.LOCK_NB)
+                elif self._depth == 0:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise FileLockTimeout(f"Файл {self.path} заблокирован другим процессом")
+                time.sleep(self.POLL_INTERVAL)
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+
+def change_token(*paths):
+    """
+    Дешевый признак версии файлов: время изменения, размер и inode
+
+    Запись через переименование меняет inode, поэтому изменение видно
+    даже при совпадении времени и размера.
+    """
+    token = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            token.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except FileNotFoundError:
+            token.append(None)
+    return tuple(token)
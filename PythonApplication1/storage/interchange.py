@@ -0,0 +1,158 @@
+﻿# storage/interchange.py
+import csv
+import json
+
+CSV_EXTENSION = ".csv"
+JSONL_EXTENSION = ".jsonl"
+
+# Поля транзакции в порядке столбцов при экспорте
+FIELDS = ('date', 'amount', 'category', 'description')
+REQUIRED_FIELDS = ('date', 'amount', 'category')
+
+# Поле транзакции -> заголовок столбца CSV
+DEFAULT_COLUMNS = {field: field for field in FIELDS}
+
+_DELIMITERS = ",;\t|"
+
+
+def interchange_format(path):
+    """Определяет формат обмена по расширению файла (сжатие .gz/.xz допускается)"""
+    lowered = path.lower()
+    for suffix in ("", ".gz", ".xz"):
+        if lowered.endswith(CSV_EXTENSION + suffix):
+            return "csv"
+        if lowered.endswith(JSONL_EXTENSION + suffix):
+            return "jsonl"
+    return None
+
+
+def parse_amount(text):
+    """
+    Преобразует сумму из выписки в число
+
+    Допускаются пробелы между разрядами и десятичная запятая
+    ("1 234,50"). Нераспознанное значение возвращается как есть и
+    отбрасывается проверкой структуры.
+    """
+    if not isinstance(text, str):
+        return text
+    cleaned = text.strip().replace(' ', '').replace('\u00a0', '')
+    try:
+        return int(cleaned)
+    except ValueError:
+        pass
+    try:
+        return float(cleaned.replace(',', '.'))
+    except ValueError:
+        return text
+
+
+def read_csv_header(f, delimiter=None):
+    """Читает заголовок CSV; возвращает (список столбцов, разделитель)"""
+    line = f.readline()
+    if delimiter is None:
+        delimiter = detect_delimiter(line)
+    header = next(csv.reader([line], delimiter=delimiter), [])
+    if header:
+        header[0] = header[0].lstrip('\ufeff')
+    return [column.strip() for column in header], delimiter
+
+
+def detect_delimiter(header_line):
+    """Выбирает разделитель, встречающийся в строке заголовка чаще других"""
+    counts = {delimiter: header_line.count(delimiter) for delimiter in _DELIMITERS}
+    delimiter = max(counts, key=counts.get)
+    return delimiter if counts[delimiter] else ','
+
+
+def read_csv_rows(f, column_mapping=None, delimiter=None):
+    """
+    Потоково читает транзакции из CSV
+
+    Args:
+        f: Текстовый файл, открытый с newline=''
+        column_mapping (dict, optional): Поле транзакции -> заголовок
+            столбца; по умолчанию DEFAULT_COLUMNS
+        delimiter (str, optional): Разделитель; None - по заголовку
+
+    Yields:
+        dict: Транзакция; сумма приведена к числу, если это возможно
+
+    Raises:
+        ValueError: В заголовке нет обязательного столбца
+    """
+    mapping = dict(DEFAULT_COLUMNS)
+    if column_mapping:
+        mapping.update(column_mapping)
+
+    header, delimiter = read_csv_header(f, delimiter)
+    positions = {}
+    for field in FIELDS:
+        column = mapping.get(field)
+        if column in header:
+            positions[field] = header.index(column)
+        elif field in REQUIRED_FIELDS:
+            raise ValueError(f"В CSV нет столбца '{column}' для поля '{field}'")
+
+    for row in csv.reader(f, delimiter=delimiter):
+        if not row:
+            continue
+        transaction = {}
+        for field, position in positions.items():
+            if position < len(row):
+                transaction[field] = row[position]
+        if 'amount' in transaction:
+            transaction['amount'] = parse_amount(transaction['amount'])
+        yield transaction
+
+
+def write_csv_rows(f, transactions, column_mapping=None, delimiter=','):
+    """
+    Потоково пишет транзакции в CSV с заголовком
+
+    Returns:
+        int: Количество записанных транзакций
+    """
+    mapping = dict(DEFAULT_COLUMNS)
+    if column_mapping:
+        mapping.update(column_mapping)
+
+    writer = csv.writer(f, delimiter=delimiter)
+    writer.writerow([mapping[field] for field in FIELDS])
+    count = 0
+    for transaction in transactions:
+        writer.writerow([transaction.get(field, '') for field in FIELDS])
+        count += 1
+    return count
+
+
+def read_jsonl_rows(f):
+    """
+    Потоково читает транзакции из JSON Lines
+
+    Пустые строки пропускаются; строка с некорректным JSON возвращается
+    как текст и отбрасывается проверкой структуры.
+    """
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def write_jsonl_rows(f, transactions, default=None):
+    """
+    Потоково пишет транзакции в JSON Lines, по одной на строку
+
+    Returns:
+        int: Количество записанных транзакций
+    """
+    count = 0
+    for transaction in transactions:
+        f.write(json.dumps(transaction, ensure_ascii=False, default=default))
+        f.write('\n')
+        count += 1
+    return count
@@ -0,0 +1,340 @@
+﻿# storage/partitioned_store.py
+import json
+import os
+import logging
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_SUFFIX = ".partitions"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+GRANULARITY_MONTH = "month"
+GRANULARITY_YEAR = "year"
+
+# Раздел для записей, дата которых не распознана
+UNDATED_KEY = "undated"
+
+
+class PartitionError(Exception):
+    """Ошибка чтения или записи секционированного хранилища"""
+
+
+def partition_key(transaction, granularity=GRANULARITY_MONTH):
+    """Ключ раздела по дате транзакции: "2024-01" (месяц), "2024" (год) или UNDATED_KEY"""
+    date = transaction.get('date') if isinstance(transaction, dict) else None
+    if not isinstance(date, str) or len(date) < 4 or not date[:4].isdigit():
+        return UNDATED_KEY
+    if granularity == GRANULARITY_YEAR:
+        return date[:4]
+    if len(date) < 7 or date[4] != '-' or not date[5:7].isdigit():
+        return UNDATED_KEY
+    return date[:7]
+
+
+class PartitionedStore(Sequence):
+    """
+    Транзакции, разбитые по месяцам или годам на отдельные JSON файлы
+
+    Манифест хранит для каждого раздела имя файла, число записей и
+    границы дат. Глобальный порядок - разделы по возрастанию ключа,
+    внутри раздела - порядок добавления; индекс записи вычисляется по
+    числу записей в разделах без их чтения. Изменение переписывает
+    только свой раздел и манифест. Разделы читаются при первом
+    обращении; в памяти держатся max_loaded последних использованных,
+    остальные остаются на диске.
+
+    Запись, дата которой изменилась, остается в прежнем разделе (ее
+    индекс не меняется) - границы дат раздела при этом расширяются,
+    поэтому выборки по датам остаются точными.
+    """
+
+    def __init__(self, directory, granularity=GRANULARITY_MONTH, max_loaded=12):
+        if granularity not in (GRANULARITY_MONTH, GRANULARITY_YEAR):
+            raise ValueError(f"Неизвестная гранулярность разделов: {granularity}")
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.granularity = granularity
+        self.max_loaded = max_loaded
+        self._partitions = []
+        self._keys = []
+        self._offsets = []
+        self._count = 0
+        self._loaded = OrderedDict()
+        self._open()
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+    # ----- манифест -----
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self.manifest_path):
+            self._write_manifest()
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.granularity = manifest.get('granularity', self.granularity)
+            self._partitions = manifest['partitions']
+        except (OSError, ValueError, KeyError) as e:
+            raise PartitionError(f"Манифест {self.manifest_path} поврежден: {str(e)}")
+        self._reindex()
+
+    def _reindex(self):
+        """Пересчитывает ключи и начальные индексы разделов"""
+        self._partitions.sort(key=lambda partition: partition['key'])
+        self._keys = [partition['key'] for partition in self._partitions]
+        self._offsets = []
+        total = 0
+        for partition in self._partitions:
+            self._offsets.append(total)
+            total += partition['count']
+        self._count = total
+
+    def _write_manifest(self):
+        self._write_json(self.manifest_path, {
+            "version": MANIFEST_VERSION,
+            "granularity": self.granularity,
+            "partitions": self._partitions,
+        })
+
+    @staticmethod
+    def _write_json(path, data):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    # ----- разделы -----
+
+    def _load(self, position):
+        """Возвращает записи раздела, читая файл при первом обращении"""
+        key = self._keys[position]
+        rows = self._loaded.get(key)
+        if rows is not None:
+            self._loaded.move_to_end(key)
+            return rows
+        path = os.path.join(self.directory, self._partitions[position]['file'])
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            raise PartitionError(f"Раздел {path} не прочитан: {str(e)}")
+        self._remember(key, rows)
+        return rows
+
+    def _remember(self, key, rows):
+        self._loaded[key] = rows
+        self._loaded.move_to_end(key)
+        while self.max_loaded is not None and len(self._loaded) > self.max_loaded:
+            # Разделы пишутся сразу, поэтому вытесняемые копии всегда чистые
+            self._loaded.popitem(last=False)
+
+    def _position_for_key(self, key):
+        """Позиция раздела с ключом key; создает пустой раздел, если его нет"""
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return position
+        self._partitions.insert(position, {
+            "key": key, "file": f"{key}.json", "count": 0, "min_date": None, "max_date": None,
+        })
+        self._reindex()
+        self._remember(key, [])
+        return position
+
+    def _save_partition(self, position, rows):
+        """Переписывает файл раздела и обновляет его описание (без манифеста)"""
+        partition = self._partitions[position]
+        path = os.path.join(self.directory, partition['file'])
+        if not rows:
+            if os.path.exists(path):
+                os.remove(path)
+            self._loaded.pop(partition['key'], None)
+            del self._partitions[position]
+            return
+        self._write_json(path, rows)
+        dates = [row['date'] for row in rows
+                 if isinstance(row, dict) and isinstance(row.get('date'), str)]
+        partition['count'] = len(rows)
+        partition['min_date'] = min(dates) if dates else None
+        partition['max_date'] = max(dates) if dates else None
+
+    def _locate(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("индекс записи вне диапазона")
+        position = bisect_right(self._offsets, index) - 1
+        return position, index - self._offsets[position]
+
+    # ----- чтение -----
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        position, local = self._locate(index)
+        return self._load(position)[local]
+
+    def __iter__(self):
+        for position in range(len(self._partitions)):
+            yield from list(self._load(position))
+
+    def index_ranges(self, date_from=None, date_to=None):
+        """
+        Диапазоны индексов (start, stop) разделов, пересекающихся с датами
+
+        Разделы вне диапазона не читаются; записи без даты в выборку
+        по датам не попадают.
+        """
+        if date_from is None and date_to is None:
+            return [(0, self._count)] if self._count else []
+        ranges = []
+        for partition, start in zip(self._partitions, self._offsets):
+            if partition['min_date'] is None:
+                continue
+            if date_from is not None and partition['max_date'] < date_from:
+                continue
+            if date_to is not None and partition['min_date'][:len(date_to)] > date_to:
+                continue
+            stop = start + partition['count']
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+    def partitions(self):
+        """Описания разделов из манифеста (ключ, файл, число записей, границы дат)"""
+        return [dict(partition) for partition in self._partitions]
+
+    # ----- изменение -----
+
+    def append(self, transaction):
+        """Добавляет запись в раздел ее даты и возвращает глобальный индекс"""
+        key = partition_key(transaction, self.granularity)
+        position = self._position_for_key(key)
+        rows = self._load(position)
+        rows.append(transaction)
+        self._save_partition(position, rows)
+        self._write_manifest()
+        self._reindex()
+        return self._offsets[bisect_left(self._keys, key)] + len(rows) - 1
+
+    def extend(self, transactions):
+        """
+        Добавляет записи пакетом: каждый затронутый раздел пишется один раз
+
+        Returns:
+            list: Глобальные индексы добавленных записей в порядке transactions
+        """
+        grouped = OrderedDict()
+        for transaction in transactions:
+            grouped.setdefault(partition_key(transaction, self.granularity), []).append(transaction)
+
+        local_starts = {}
+        for key, group in grouped.items():
+            position = self._position_for_key(key)
+            rows = self._load(position)
+            local_starts[key] = len(rows)
+            rows.extend(group)
+            self._save_partition(position, rows)
+        self._write_manifest()
+        self._reindex()
+
+        offsets = dict(zip(self._keys, self._offsets))
+        indices = []
+        next_local = dict(local_starts)
+        for transaction in transactions:
+            key = partition_key(transaction, self.granularity)
+            indices.append(offsets[key] + next_local[key])
+            next_local[key] += 1
+        return indices
+
+    def insert(self, index, transaction):
+        """
+        Вставляет запись перед глобальным индексом index
+
+        Используется при отмене удаления: запись возвращается в раздел
+        своей даты, если index попадает в него, иначе - в раздел, где
+        стояла (дата записи могла измениться после добавления). Индекс
+        вне диапазона означает добавление в раздел даты.
+
+        Returns:
+            int: Итоговый глобальный индекс записи
+        """
+        key = partition_key(transaction, self.granularity)
+        position = bisect_left(self._keys, key)
+        exists = position < len(self._keys) and self._keys[position] == key
+        if exists and 0 <= index - self._offsets[position] <= self._partitions[position]['count']:
+            local = index - self._offsets[position]
+        elif not exists and index == (self._offsets[position] if position < len(self._keys)
+                                      else self._count):
+            position, local = self._position_for_key(key), 0
+        elif 0 <= index < self._count:
+            position, local = self._locate(index)
+        else:
+            position = self._position_for_key(key)
+            local = self._partitions[position]['count']
+
+        rows = self._load(position)
+        rows.insert(local, transaction)
+        self._save_partition(position, rows)
+        self._write_manifest()
+        self._reindex()
+        return self._offsets[position] + local
+
+    def update(self, index, transaction):
+        """Заменяет запись на месте и возвращает прежнюю"""
+        position, local = self._locate(index)
+        rows = self._load(position)
+        previous = rows[local]
+        rows[local] = transaction
+        self._save_partition(position, rows)
+        self._write_manifest()
+        return previous
+
+    def delete(self, index):
+        """Удаляет запись и возвращает ее"""
+        position, local = self._locate(index)
+        rows = self._load(position)
+        removed = rows.pop(local)
+        self._save_partition(position, rows)
+        self._write_manifest()
+        self._reindex()
+        return removed
+
+    def replace_all(self, transactions):
+        """Переразбивает все записи по разделам; лишние файлы разделов удаляются"""
+        grouped = {}
+        for transaction in transactions:
+            grouped.setdefault(partition_key(transaction, self.granularity), []).append(transaction)
+
+        old_files = {partition['file'] for partition in self._partitions}
+        self._partitions = [{
+            "key": key, "file": f"{key}.json", "count": 0, "min_date": None, "max_date": None,
+        } for key in sorted(grouped)]
+        self._reindex()
+        self._loaded.clear()
+        for position, key in enumerate(self._keys):
+            self._save_partition(position, grouped[key])
+            self._remember(key, grouped[key])
+        self._write_manifest()
+        self._reindex()
+
+        for name in old_files - {partition['file'] for partition in self._partitions}:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        """Освобождает загруженные разделы"""
+        self._loaded.clear()
@@ -0,0 +1,351 @@
+﻿# storage/record_file.py
+import json
+import mmap
+import os
+import struct
+import logging
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+RECORD_EXTENSION = ".fmrec"
+INDEX_EXTENSION = ".fmidx"
+
+DATA_MAGIC = b"FMREC001"
+INDEX_MAGIC = b"FMIDX001"
+FORMAT_VERSION = 1
+
+# magic, версия
+DATA_HEADER = struct.Struct("<8sH6x")
+# magic, версия, число записей, байты устаревших записей
+INDEX_HEADER = struct.Struct("<8sH6xQQ")
+OFFSET = struct.Struct("<Q")
+# сумма, флаги, длины категории, даты и описания в байтах
+RECORD_HEADER = struct.Struct("<dBHHI")
+
+RECORD_INT_AMOUNT = 0x01
+RECORD_HAS_DESCRIPTION = 0x02
+# Запись хранится как JSON целиком (нестандартные поля или типы)
+RECORD_JSON = 0x04
+
+_FIELDS = frozenset(('amount', 'category', 'date', 'description'))
+_MAX_SHORT_FIELD = 0xFFFF
+_MAX_EXACT_INT = 2 ** 53
+# Сжатие запускается, когда устаревшие записи занимают больше половины файла
+_COMPACT_MIN_DEAD_BYTES = 1024 * 1024
+
+
+class RecordFileError(Exception):
+    """Ошибка формата файла записей"""
+
+
+def _has_compact_layout(transaction):
+    """Можно ли записать транзакцию компактно, без JSON"""
+    if not isinstance(transaction, dict) or not transaction.keys() <= _FIELDS:
+        return False
+    amount = transaction.get('amount')
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return False
+    if isinstance(amount, int) and abs(amount) > _MAX_EXACT_INT:
+        return False
+    return (isinstance(transaction.get('category'), str)
+            and isinstance(transaction.get('date'), str)
+            and isinstance(transaction.get('description', ''), str))
+
+
+def encode_record(transaction):
+    """Кодирует транзакцию в бинарную запись"""
+    if _has_compact_layout(transaction):
+        category_bytes = transaction['category'].encode("utf-8")
+        date_bytes = transaction['date'].encode("utf-8")
+        if len(category_bytes) <= _MAX_SHORT_FIELD and len(date_bytes) <= _MAX_SHORT_FIELD:
+            amount = transaction['amount']
+            flags = RECORD_INT_AMOUNT if isinstance(amount, int) else 0
+            if 'description' in transaction:
+                flags |= RECORD_HAS_DESCRIPTION
+            description_bytes = transaction.get('description', '').encode("utf-8")
+            return (RECORD_HEADER.pack(float(amount), flags, len(category_bytes), len(date_bytes),
+                                       len(description_bytes))
+                    + category_bytes + date_bytes + description_bytes)
+
+    payload = json.dumps(transaction, ensure_ascii=False).encode("utf-8")
+    return RECORD_HEADER.pack(0.0, RECORD_JSON, 0, 0, len(payload)) + payload
+
+
+def decode_record(buffer, offset):
+    """Декодирует запись, начинающуюся с указанного смещения"""
+    amount, flags, category_len, date_len, description_len = RECORD_HEADER.unpack_from(buffer, offset)
+    position = offset + RECORD_HEADER.size
+    if flags & RECORD_JSON:
+        return json.loads(buffer[position:position + description_len].decode("utf-8"))
+
+    category_end = position + category_len
+    date_end = category_end + date_len
+    transaction = {
+        'amount': int(amount) if flags & RECORD_INT_AMOUNT else amount,
+        'category': buffer[position:category_end].decode("utf-8"),
+        'date': buffer[category_end:date_end].decode("utf-8"),
+    }
+    if flags & RECORD_HAS_DESCRIPTION:
+        transaction['description'] = buffer[date_end:date_end + description_len].decode("utf-8")
+    return transaction
+
+
+def record_size(buffer, offset):
+    """Размер записи в байтах вместе с заголовком"""
+    _amount, _flags, category_len, date_len, description_len = RECORD_HEADER.unpack_from(buffer, offset)
+    return RECORD_HEADER.size + category_len + date_len + description_len
+
+
+class RecordFile(Sequence):
+    """
+    Файл записей переменной длины с индексом смещений
+
+    Записи лежат в файле данных, индекс хранит смещение каждой записи
+    фиксированной ширины. Оба файла отображаются в память, запись
+    декодируется только при обращении к ней. Добавление дописывает
+    запись в конец, изменение записывает новую версию и переставляет
+    смещение в индексе; место устаревших версий освобождает compact().
+    """
+
+    def __init__(self, data_path, index_path=None):
+        self.data_path = data_path
+        self.index_path = index_path or os.path.splitext(data_path)[0] + INDEX_EXTENSION
+        self._data_map = None
+        self._index_map = None
+        self._data_file = None
+        self._index_file = None
+        self._open()
+
+    # ----- открытие и отображение файлов -----
+
+    def _open(self):
+        data_exists = os.path.exists(self.data_path)
+        index_exists = os.path.exists(self.index_path)
+        if data_exists != index_exists:
+            raise RecordFileError(
+                f"Файлы {self.data_path} и {self.index_path} должны существовать вместе")
+        if not data_exists:
+            self._write_empty(self.data_path, self.index_path)
+
+        self._data_file = open(self.data_path, "r+b")
+        self._index_file = open(self.index_path, "r+b")
+        try:
+            magic, version = DATA_HEADER.unpack(self._data_file.read(DATA_HEADER.size))
+            if magic != DATA_MAGIC or version != FORMAT_VERSION:
+                raise RecordFileError(f"Файл {self.data_path} не является файлом записей")
+            magic, version, self._count, self._dead_bytes = INDEX_HEADER.unpack(
+                self._index_file.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or version != FORMAT_VERSION:
+                raise RecordFileError(f"Файл {self.index_path} не является индексом записей")
+            self._data_size = self._data_file.seek(0, os.SEEK_END)
+            index_size = self._index_file.seek(0, os.SEEK_END)
+            if index_size < INDEX_HEADER.size + self._count * OFFSET.size:
+                raise RecordFileError(f"Индекс {self.index_path} поврежден")
+        except (struct.error, RecordFileError) as e:
+            self.close()
+            raise RecordFileError(str(e)) from e
+
+    @staticmethod
+    def _write_empty(data_path, index_path):
+        with open(data_path, "wb") as f:
+            f.write(DATA_HEADER.pack(DATA_MAGIC, FORMAT_VERSION))
+        with open(index_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, 0, 0))
+
+    def _maps(self):
+        if self._data_map is None:
+            self._data_file.flush()
+            self._data_map = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._index_map is None:
+            self._index_file.flush()
+            self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data_map, self._index_map
+
+    def _unmap(self):
+        for name in ("_data_map", "_index_map"):
+            mapped = getattr(self, name)
+            if mapped is not None:
+                mapped.close()
+                setattr(self, name, None)
+
+    def close(self):
+        """Закрывает отображения и файлы"""
+        self._unmap()
+        for name in ("_data_file", "_index_file"):
+            handle = getattr(self, name)
+            if handle is not None:
+                handle.close()
+                setattr(self, name, None)
+
+    # ----- чтение -----
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("индекс записи вне диапазона")
+        return self._read(index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._read(i)
+
+    def _offset(self, index):
+        _, index_map = self._maps()
+        return OFFSET.unpack_from(index_map, INDEX_HEADER.size + index * OFFSET.size)[0]
+
+    def _read(self, index):
+        data_map, _ = self._maps()
+        return decode_record(data_map, self._offset(index))
+
+    # ----- изменение -----
+
+    def append(self, transaction):
+        """Дописывает запись и возвращает ее индекс"""
+        return self.extend([transaction]) - 1
+
+    def extend(self, transactions):
+        """Дописывает записи пакетом; возвращает новое количество записей"""
+        offsets = bytearray()
+        self._data_file.seek(self._data_size)
+        for transaction in transactions:
+            encoded = encode_record(transaction)
+            offsets += OFFSET.pack(self._data_size)
+            self._data_file.write(encoded)
+            self._data_size += len(encoded)
+        self._data_file.flush()
+
+        self._index_file.seek(INDEX_HEADER.size + self._count * OFFSET.size)
+        self._index_file.write(offsets)
+        self._count += len(offsets) // OFFSET.size
+        self._write_index_header()
+        self._unmap()
+        return self._count
+
+    def insert(self, index, transaction):
+        """
+        Вставляет запись перед index, сдвигая хвост индекса
+
+        Запись дописывается в конец файла данных; индекс за пределами
+        диапазона означает добавление в конец. Возвращает индекс записи.
+        """
+        index = min(max(index, 0), self._count)
+        encoded = encode_record(transaction)
+        self._data_file.seek(self._data_size)
+        self._data_file.write(encoded)
+        self._data_file.flush()
+
+        tail_start = INDEX_HEADER.size + index * OFFSET.size
+        tail_end = INDEX_HEADER.size + self._count * OFFSET.size
+        _, index_map = self._maps()
+        tail = index_map[tail_start:tail_end]
+        self._unmap()
+
+        self._index_file.seek(tail_start)
+        self._index_file.write(OFFSET.pack(self._data_size) + tail)
+        self._data_size += len(encoded)
+        self._count += 1
+        self._write_index_header()
+        return index
+
+    def update(self, index, transaction):
+        """Записывает новую версию записи и возвращает прежнюю"""
+        previous = self[index]
+        data_map, _ = self._maps()
+        old_size = record_size(data_map, self._offset(index))
+
+        encoded = encode_record(transaction)
+        self._data_file.seek(self._data_size)
+        self._data_file.write(encoded)
+        self._data_file.flush()
+
+        self._index_file.seek(INDEX_HEADER.size + index * OFFSET.size)
+        self._index_file.write(OFFSET.pack(self._data_size))
+        self._data_size += len(encoded)
+        self._dead_bytes += old_size
+        self._write_index_header()
+        self._unmap()
+        self._maybe_compact()
+        return previous
+
+    def delete(self, index):
+        """Удаляет запись, сдвигая хвост индекса; возвращает удаленную запись"""
+        removed = self[index]
+        data_map, index_map = self._maps()
+        self._dead_bytes += record_size(data_map, self._offset(index))
+
+        tail_start = INDEX_HEADER.size + (index + 1) * OFFSET.size
+        tail_end = INDEX_HEADER.size + self._count * OFFSET.size
+        tail = index_map[tail_start:tail_end]
+        self._unmap()
+
+        self._index_file.seek(tail_start - OFFSET.size)
+        self._index_file.write(tail)
+        self._count -= 1
+        self._index_file.truncate(INDEX_HEADER.size + self._count * OFFSET.size)
+        self._write_index_header()
+        self._maybe_compact()
+        return removed
+
+    def replace_all(self, transactions):
+        """Полностью заменяет содержимое файла записей"""
+        self.close()
+        temp_data, temp_index = f"{self.data_path}.tmp", f"{self.index_path}.tmp"
+        self._write_empty(temp_data, temp_index)
+        with open(temp_data, "ab") as data_file, open(temp_index, "r+b") as index_file:
+            position = data_file.tell()
+            index_file.seek(INDEX_HEADER.size)
+            count = 0
+            for transaction in transactions:
+                encoded = encode_record(transaction)
+                index_file.write(OFFSET.pack(position))
+                data_file.write(encoded)
+                position += len(encoded)
+                count += 1
+            index_file.seek(0)
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, count, 0))
+        os.replace(temp_data, self.data_path)
+        os.replace(temp_index, self.index_path)
+        self._open()
+
+    def compact(self):
+        """Переписывает файл данных без устаревших версий записей"""
+        if self._dead_bytes == 0:
+            return
+        data_map, _ = self._maps()
+        live = (data_map[offset:offset + record_size(data_map, offset)]
+                for offset in (self._offset(i) for i in range(self._count)))
+
+        temp_data, temp_index = f"{self.data_path}.tmp", f"{self.index_path}.tmp"
+        self._write_empty(temp_data, temp_index)
+        with open(temp_data, "ab") as data_file, open(temp_index, "r+b") as index_file:
+            position = data_file.tell()
+            index_file.seek(INDEX_HEADER.size)
+            for encoded in live:
+                index_file.write(OFFSET.pack(position))
+                data_file.write(encoded)
+                position += len(encoded)
+            index_file.seek(0)
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, self._count, 0))
+
+        dead_bytes = self._dead_bytes
+        self.close()
+        os.replace(temp_data, self.data_path)
+        os.replace(temp_index, self.index_path)
+        self._open()
+        logger.info(f"Файл записей {self.data_path} сжат, освобождено {dead_bytes} байт")
+
+    def _maybe_compact(self):
+        if self._dead_bytes >= _COMPACT_MIN_DEAD_BYTES and self._dead_bytes * 2 > self._data_size:
+            self.compact()
+
+    def _write_index_header(self):
+        self._index_file.seek(0)
+        self._index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, self._count, self._dead_bytes))
+        self._index_file.flush()
@@ -0,0 +1,98 @@
+﻿# storage/rw_lock.py
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Блокировка чтения/записи для потоков одного процесса
+
+    Читать могут несколько потоков одновременно, запись исключительная.
+    Ожидающий писатель не пропускает новых читателей, поэтому поток
+    чтений не откладывает запись бесконечно; а читатели, дождавшиеся
+    конца записи, проходят раньше следующего писателя, поэтому и
+    непрерывные изменения не останавливают чтение.
+
+    Блокировка реентерабельна: поток, уже читающий, повторно получает
+    чтение без ожидания, а пишущий поток может и читать, и писать
+    вложенно. Повысить чтение до записи нельзя - два таких потока
+    ждали бы друг друга.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_readers = 0
+        # Сколько читателей, ждавших окончания записи, пропускается
+        # раньше следующего писателя
+        self._read_grant = 0
+        self._waiting_writers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        """Разделяемая блокировка на время чтения"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Исключительная блокировка на время изменения"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            depth = getattr(self._local, 'depth', 0)
+            if not depth and self._writer != me:
+                self._waiting_readers += 1
+                try:
+                    while self._writer is not None or (self._waiting_writers and not self._read_grant):
+                        self._condition.wait()
+                finally:
+                    self._waiting_readers -= 1
+                if self._read_grant:
+                    self._read_grant -= 1
+            self._readers += 1
+            self._local.depth = depth + 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            self._local.depth -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, 'depth', 0):
+                raise RuntimeError("Нельзя получить запись, удерживая чтение")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers or self._read_grant:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._read_grant = self._waiting_readers
+                self._condition.notify_all()
@@ -0,0 +1,117 @@
+﻿# storage/sorted_order.py
+from bisect import bisect_left, insort
+
+
+class SortedOrder:
+    """
+    Порядок записей по ключу, поддерживаемый при изменениях
+
+    Хранит отсортированный список пар (ключ, индекс записи). Равные
+    ключи упорядочены по индексу, поэтому записи с одной датой идут в
+    порядке добавления и не переставляются при чужих изменениях.
+    Добавление, изменение и удаление находят место пары двоичным
+    поиском; индексы сдвигаются, только если запись вставлена или
+    удалена не в конце. Полная сортировка выполняется один раз при
+    построении.
+    """
+
+    # Пакет больше этого размера добавляется одной досортировкой
+    BATCH_SORT_THRESHOLD = 16
+
+    def __init__(self, key, pairs=None):
+        self.key = key
+        self.pairs = pairs if pairs is not None else []
+
+    @classmethod
+    def build(cls, key, transactions):
+        """Строит порядок по всем записям"""
+        return cls(key, sorted((key(transaction), index)
+                               for index, transaction in enumerate(transactions)))
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, position):
+        return self.pairs[position]
+
+    def position(self, index, transaction):
+        """Позиция записи в порядке или None, если ее нет"""
+        pair = (self.key(transaction), index)
+        position = bisect_left(self.pairs, pair)
+        if position < len(self.pairs) and self.pairs[position] == pair:
+            return position
+        return None
+
+    def insertion_point(self, index, transaction):
+        """
+        Позиция, которую займет запись после insert(index, transaction)
+
+        Сдвиг индексов не меняет взаимный порядок пар, поэтому позицию
+        можно узнать до изменения (модели Qt сообщают о вставке заранее).
+        """
+        return bisect_left(self.pairs, (self.key(transaction), index))
+
+    def insert(self, index, transaction, appended=False):
+        """
+        Добавляет запись с индексом index и возвращает ее позицию
+
+        Индексы остальных записей от index и дальше сдвигаются на один;
+        appended=True - запись добавлена в конец, сдвигать нечего.
+        """
+        position = self.insertion_point(index, transaction)
+        if not appended:
+            self.shift(index, 1)
+        self.pairs.insert(position, (self.key(transaction), index))
+        return position
+
+    def extend(self, start, transactions):
+        """Добавляет записи, дописанные в конец с индекса start"""
+        pairs = [(self.key(transaction), index) for index, transaction in enumerate(transactions, start)]
+        if len(pairs) > self.BATCH_SORT_THRESHOLD:
+            # Сортировка распознает уже упорядоченную часть и только сливает хвост
+            self.pairs.extend(pairs)
+            self.pairs.sort()
+        else:
+            for pair in pairs:
+                insort(self.pairs, pair)
+
+    def remove(self, index, transaction):
+        """
+        Убирает запись и возвращает ее бывшую позицию
+
+        Индексы записей после index сдвигаются на один назад.
+
+        Raises:
+            ValueError: Записи нет в порядке
+        """
+        position = self.position(index, transaction)
+        if position is None:
+            raise ValueError(f"Запись #{index} не найдена в порядке сортировки")
+        del self.pairs[position]
+        self.shift(index + 1, -1)
+        return position
+
+    def update(self, index, previous, transaction):
+        """
+        Переставляет измененную запись
+
+        Returns:
+            tuple: (прежняя позиция, новая позиция)
+        """
+        old_position = self.position(index, previous)
+        if old_position is None:
+            raise ValueError(f"Запись #{index} не найдена в порядке сортировки")
+        pair = (self.key(transaction), index)
+        if self.pairs[old_position] == pair:
+            return old_position, old_position
+        del self.pairs[old_position]
+        new_position = bisect_left(self.pairs, pair)
+        self.pairs.insert(new_position, pair)
+        return old_position, new_position
+
+    def shift(self, start, delta):
+        """Сдвигает на delta индексы записей, начиная с start"""
+        pairs = self.pairs
+        for position, (key, index) in enumerate(pairs):
+            if index >= start:
+                pairs[position] = (key, index + delta)
@@ -54,7 +54,7 @@ class StyleManager(QObject):
                 background-color: #e0e0e0;
                 color: #a0a0a0;
             }
-            QListWidget {
+            QListView {
                 background-color: white;
                 border: 2px solid #d2b48c;
                 border-radius: 10px;
@@ -62,16 +62,16 @@ class StyleManager(QObject):
                 font-size: 11pt;
                 alternate-background-color: #fafafa;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 10px 8px;
                 border-bottom: 1px solid #e8e8e8;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #d2b48c;
                 color: white;
                 border-radius: 8px;
             }
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background-color: #f0f0f0;
                 border-radius: 8px;
             }
@@ -0,0 +1,6 @@
+﻿# tests/conftest.py
+import os
+import sys
+
+# Модули проекта импортируются от каталога проекта, как при запуске main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
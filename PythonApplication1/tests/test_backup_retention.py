@@ -0,0 +1,36 @@
+﻿# tests/test_backup_retention.py
+"""Ротация копий не удаляет копию, из которой отмена восстанавливает импорт"""
+import json
+import os
+
+from storage.data_storage import DataStorage
+from logic.backup_store import BackupRetentionPolicy
+from logic.transaction_manager import TransactionManager
+
+
+def test_retention_keeps_backup_referenced_by_undo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = DataStorage(str(tmp_path / "transactions.json"), storage_mode=DataStorage.MODE_RECORDS)
+    manager = TransactionManager(storage)
+    manager.backup_store.retention = BackupRetentionPolicy(keep_last=2, keep_daily=1,
+                                                           keep_weekly=1, keep_monthly=1)
+    # Каждая копия полная: ротации не мешают цепочки инкрементальных копий
+    manager.backup_store.full_every = 1
+    try:
+        manager.add_transaction(5, "До импорта", "2024-01-01")
+        source = tmp_path / "import.json"
+        source.write_text(json.dumps([{"amount": 1, "category": "Импорт", "date": "2024-02-02"}]),
+                          encoding='utf-8')
+        success, message = manager.import_from_json(str(source), mode=manager.IMPORT_REPLACE)
+        assert success, message
+        pinned = manager.undo_log.backup_paths()
+        assert len(pinned) == 1
+
+        for _ in range(5):
+            assert manager.create_incremental_backup()
+        assert all(os.path.exists(path) for path in pinned)
+
+        manager.undo()
+        assert [(t['amount'], t['category']) for t in manager.get_all_transactions()] == [(5, "До импорта")]
+    finally:
+        storage.close()
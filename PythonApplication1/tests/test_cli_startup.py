@@ -0,0 +1,67 @@
+﻿# tests/test_cli_startup.py
+"""
+Холодный запуск командной строки
+
+`cli.py balance` запускается в отдельных процессах: ни один модуль Qt или
+графического интерфейса не должен импортироваться, вывод - корректный
+JSON, а медианное время сверх запуска пустого интерпретатора - не больше
+бюджета.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN_PREFIXES = ("PySide6", "PyQt", "shiboken", "gui.", "styles.")
+RUNS = 7
+# Допустимое время сверх запуска пустого интерпретатора
+BUDGET_MS = 150.0
+
+
+def timed_run(command, cwd):
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True, encoding='utf-8')
+    return time.perf_counter() - started, completed
+
+
+def imported_modules(importtime_output):
+    """Имена модулей из вывода python -X importtime"""
+    modules = []
+    for line in importtime_output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                modules.append(name)
+    return modules
+
+
+@pytest.fixture
+def cli(tmp_path):
+    """Команда cli.py над журналом из одной транзакции на 100 руб."""
+    command = [sys.executable, os.path.join(PROJECT_DIR, "cli.py"), "--data", str(tmp_path / "transactions.json")]
+    _, completed = timed_run(command + ["add", "--amount", "100", "--category", "Проверка"], tmp_path)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    return command
+
+
+def test_balance_imports_no_gui_modules(cli, tmp_path):
+    _, completed = timed_run([sys.executable, "-X", "importtime"] + cli[1:] + ["balance"], tmp_path)
+    assert completed.returncode == 0, completed.stderr
+    forbidden = sorted({name for name in imported_modules(completed.stderr)
+                        if name.startswith(FORBIDDEN_PREFIXES)})
+    assert not forbidden, f"Импортированы модули интерфейса: {', '.join(forbidden)}"
+
+    result = json.loads(completed.stdout)
+    assert result.get("ok") and result.get("balance") == 100, completed.stdout
+
+
+def test_balance_startup_within_budget(cli, tmp_path):
+    bare = [timed_run([sys.executable, "-c", "pass"], tmp_path)[0] for _ in range(RUNS)]
+    runs = [timed_run(cli + ["balance"], tmp_path)[0] for _ in range(RUNS)]
+    overhead_ms = (statistics.median(runs) - statistics.median(bare)) * 1000
+    assert overhead_ms <= BUDGET_MS, f"Запуск дольше бюджета: {overhead_ms:.1f} мс > {BUDGET_MS:.0f} мс"
@@ -0,0 +1,247 @@
+﻿# tests/test_concurrency.py
+"""
+Потокобезопасность TransactionManager под одновременной нагрузкой
+
+Писатели добавляют пары транзакций +x/-x, правят описания и удаляют
+пары; импортеры сливают CSV файлы из таких же пар; читатели в это время
+считают баланс, делают снимки, постранично читают, запрашивают страницы
+и экспортируют данные. Каждая согласованная выборка должна иметь нулевой
+баланс, итоговое число записей - совпадать с учетом писателей, а каждое
+добавление - прийти подписчикам своим пакетом: добавление внутри пакета
+импорта значит, что импорт шел без блокировки записи.
+"""
+import csv
+import os
+import random
+import threading
+import time
+
+import pytest
+
+from storage.data_storage import DataStorage
+from storage.interchange import write_csv_rows
+from logic.transaction_manager import TransactionManager
+
+SECONDS = 2.0
+WRITERS = 3
+IMPORTERS = 2
+READERS = 1
+
+
+class StressRun:
+    def __init__(self, manager, seconds):
+        self.manager = manager
+        self.deadline = time.monotonic() + seconds
+        self.errors = []
+        self.counters = {"pairs_added": 0, "pairs_deleted": 0, "pairs_imported": 0, "updates": 0,
+                         "imports": 0, "balances": 0, "snapshots": 0, "pages": 0, "exports": 0}
+        self._counter_lock = threading.Lock()
+        # Пакеты событий, полученные подписчиком: (операция, число событий)
+        self.batches = []
+        manager.subscribe(self.on_batch)
+
+    def running(self):
+        return time.monotonic() < self.deadline and not self.errors
+
+    def count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def check(self, condition, message):
+        if not condition:
+            self.errors.append(message)
+
+    def on_batch(self, batch):
+        self.batches.append((batch.operation, len(batch)))
+
+    def run(self, directory):
+        """Запускает все потоки и ждет их завершения"""
+        def spawn(target, *target_args):
+            def guarded():
+                try:
+                    target(*target_args)
+                except Exception as e:
+                    self.errors.append(f"{type(e).__name__}: {e}")
+            return threading.Thread(target=guarded)
+
+        threads = [spawn(self.writer, seed) for seed in range(WRITERS)]
+        threads += [spawn(self.importer, directory, seed) for seed in range(IMPORTERS)]
+        for _ in range(READERS):
+            threads += [spawn(self.balance_reader), spawn(self.snapshot_reader),
+                        spawn(self.page_reader), spawn(self.export_reader, directory)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # ----- писатели -----
+
+    def writer(self, seed):
+        rng = random.Random(seed)
+        manager = self.manager
+        while self.running():
+            action = rng.random()
+            with manager.lock.write():
+                count = manager.data_storage.get_transactions_count()
+                if action < 0.5 or count < 2:
+                    amount = rng.randint(1, 1000)
+                    date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                    manager.add_transaction(amount, "Доход", date, f"w{seed}")
+                    manager.add_transaction(-amount, "Расход", date, f"w{seed}")
+                    self.count("pairs_added")
+                elif action < 0.8:
+                    index = rng.randrange(count)
+                    transaction = dict(manager.get_transaction_by_index(index))
+                    transaction['description'] = f"изменено w{seed}"
+                    manager.update_transaction(index, transaction)
+                    self.count("updates")
+                else:
+                    index = rng.randrange(count)
+                    amount = manager.get_transaction_by_index(index)['amount']
+                    manager.delete_transaction(index)
+                    partner = next(i for i, t in enumerate(manager.get_all_transactions())
+                                   if t['amount'] == -amount)
+                    manager.delete_transaction(partner)
+                    self.count("pairs_deleted")
+
+    def importer(self, directory, seed):
+        """Сливает CSV файлы из новых пар +x/-x, пока писатели работают"""
+        rng = random.Random(100 + seed)
+        path = os.path.join(directory, f"import_{seed}.csv")
+        serial = 0
+        while self.running():
+            rows = []
+            for _ in range(rng.randint(1, 40)):
+                serial += 1
+                amount = rng.randint(1, 1000)
+                date = f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                description = f"импорт i{seed}-{serial}"
+                rows.append({"amount": amount, "category": "Импорт", "date": date, "description": description})
+                rows.append({"amount": -amount, "category": "Импорт", "date": date, "description": description})
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                write_csv_rows(f, rows)
+            success, message = self.manager.import_from_csv(path, mode=self.manager.IMPORT_MERGE)
+            if not success:
+                self.errors.append(f"Импорт не выполнен: {message}")
+                return
+            self.count("imports")
+            self.count("pairs_imported", len(rows) // 2)
+
+    # ----- читатели -----
+
+    def balance_reader(self):
+        while self.running():
+            balance = self.manager.calculate_balance()
+            self.check(balance == 0, f"Несогласованный баланс: {balance}")
+            self.count("balances")
+
+    def snapshot_reader(self):
+        while self.running():
+            rows = self.manager.snapshot()
+            total = sum(t['amount'] for t in rows)
+            self.check(total == 0, f"Несогласованный снимок: {total} на {len(rows)} записях")
+            self.count("snapshots")
+
+    def page_reader(self):
+        while self.running():
+            with self.manager.lock.read():
+                total = sum(t['amount'] for t in self.manager.iter_transactions(page_size=50))
+            self.check(total == 0, f"Несогласованный постраничный обход: {total}")
+            page = self.manager.query_transactions(limit=20, sort_by='date', descending=True)
+            self.check(len(page.items) == len(page.indices), "Страница повреждена")
+            self.count("pages")
+
+    def export_reader(self, directory):
+        path = os.path.join(directory, f"export_{threading.get_ident()}.csv")
+        while self.running():
+            if not self.manager.export_to_csv(path):
+                self.errors.append("Экспорт не выполнен")
+                return
+            with open(path, newline='', encoding='utf-8') as f:
+                total = sum(int(float(row['amount'])) for row in csv.DictReader(f))
+            self.check(total == 0, f"Несогласованный экспорт: {total}")
+            self.count("exports")
+
+
+@pytest.mark.parametrize("mode", [DataStorage.MODE_JSON, DataStorage.MODE_RECORDS,
+                                  DataStorage.MODE_PARTITIONED])
+def test_concurrent_adds_imports_and_queries(tmp_path, monkeypatch, mode):
+    monkeypatch.chdir(tmp_path)
+    storage = DataStorage(str(tmp_path / "transactions.json"), storage_mode=mode)
+    manager = TransactionManager(storage)
+    run = StressRun(manager, SECONDS)
+    try:
+        run.run(str(tmp_path))
+        assert not run.errors, run.errors[:10]
+        assert run.counters["imports"] > 0 and run.counters["pairs_added"] > 0, run.counters
+
+        # Каждое добавление - свой пакет из одного события, каждый импорт - один пакет сброса
+        adds = [size for operation, size in run.batches if operation == "add"]
+        imports = [size for operation, size in run.batches if operation == "import"]
+        assert adds == [1] * (2 * run.counters["pairs_added"])
+        assert imports == [1] * run.counters["imports"]
+
+        expected = 2 * (run.counters["pairs_added"] + run.counters["pairs_imported"]
+                        - run.counters["pairs_deleted"])
+        assert manager.data_storage.get_transactions_count() == expected
+        assert manager.calculate_balance() == 0
+    finally:
+        storage.close()
+
+    reopened = DataStorage(storage.filename, storage_mode=mode)
+    try:
+        assert reopened.get_transactions_count() == expected
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("mode", [DataStorage.MODE_JSON, DataStorage.MODE_RECORDS])
+def test_readers_reloading_external_changes_see_one_version(tmp_path, mode):
+    """
+    Читатели, заметившие изменение файла другим процессом, перезагружают
+    кэш под общей блокировкой чтения. Каждая страница должна целиком
+    относиться к одной версии данных: все записи версии v имеют описание
+    "v" и их ровно v + 1.
+    """
+    path = str(tmp_path / "transactions.json")
+    storage = DataStorage(path, storage_mode=mode)
+    storage.CHANGE_CHECK_INTERVAL = 0
+    other = DataStorage(path, storage_mode=mode)
+    manager = TransactionManager(storage)
+    deadline = time.monotonic() + SECONDS
+    errors = []
+
+    def version_rows(version):
+        return [{"amount": (i * 7919) % (version + 1), "category": f"c{i % 5}",
+                 "date": f"2024-01-{i % 28 + 1:02d}", "description": str(version)}
+                for i in range(version + 1)]
+
+    def external_writer():
+        version = 0
+        while time.monotonic() < deadline and not errors:
+            version = version % 300 + 1
+            other.replace_all_transactions(version_rows(version))
+
+    def reader(sort_by):
+        while time.monotonic() < deadline and not errors:
+            try:
+                page = manager.query_transactions(limit=50, sort_by=sort_by)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return
+            versions = {t['description'] for t in page.items}
+            if len(versions) > 1:
+                errors.append(f"Страница из разных версий: {sorted(versions)}")
+            elif versions and page.total is not None and page.total != int(versions.pop()) + 1:
+                errors.append(f"total {page.total} не относится к версии страницы")
+
+    threads = [threading.Thread(target=external_writer)]
+    threads += [threading.Thread(target=reader, args=(sort_by,))
+                for sort_by in (None, 'amount', 'date', 'category') * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    other.close()
+    storage.close()
+    assert not errors, errors[:10]
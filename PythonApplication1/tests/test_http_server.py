@@ -0,0 +1,59 @@
+﻿# tests/test_http_server.py
+"""HTTP сервис журнала: проверка сумм пакетного добавления"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from storage.data_storage import DataStorage
+from logic.transaction_manager import TransactionManager
+from server.http_server import LedgerServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    storage = DataStorage(str(tmp_path / "transactions.json"))
+    server = LedgerServer(TransactionManager(storage), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    storage.close()
+
+
+def request(server, path, body=None):
+    data = None if body is None else body.encode('utf-8')
+    try:
+        with urllib.request.urlopen(urllib.request.Request(server.url + path, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("amount", ["true", "false", "NaN", "Infinity", "-Infinity"])
+def test_add_rejects_non_numeric_amounts(server, amount):
+    body = ('{"transactions": [{"amount": %s, "category": "Проверка", "date": "2024-01-01"}]}' % amount)
+    status, payload = request(server, "/transactions", body)
+    assert status == 422, payload
+    assert "error" in payload
+
+    status, payload = request(server, "/balance")
+    assert status == 200
+    assert payload == {"balance": 0, "count": 0}
+
+
+def test_add_accepts_finite_amounts(server):
+    body = json.dumps({"transactions": [
+        {"amount": 10, "category": "Проверка", "date": "2024-01-01"},
+        {"amount": -2.5, "category": "Проверка", "date": "2024-01-02"},
+    ]})
+    status, payload = request(server, "/transactions", body)
+    assert status == 201, payload
+    assert payload["added"] == 2
+
+    status, payload = request(server, "/balance")
+    assert status == 200
+    assert payload == {"balance": 7.5, "count": 2}
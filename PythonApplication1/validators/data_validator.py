@@ -1,9 +1,245 @@
 ﻿# validators/data_validator.py
 import logging
-from datetime import datetime
+import math
+from datetime import date as date_type, datetime
 
 logger = logging.getLogger(__name__)
 
+ISO_DATE_FORMAT = "%Y-%m-%d"
+
+_MISSING = object()
+
+
+def is_valid_date(text, date_format=ISO_DATE_FORMAT):
+    """
+    Проверяет строку даты
+
+    Для формата YYYY-MM-DD в типичном случае (10 символов с дефисами)
+    используется date.fromisoformat, который намного быстрее strptime;
+    остальные строки проверяются через strptime, как и раньше.
+    """
+    if date_format == ISO_DATE_FORMAT and len(text) == 10 and text[4] == '-' and text[7] == '-':
+        try:
+            date_type.fromisoformat(text)
+            return True
+        except ValueError:
+            return False
+    try:
+        datetime.strptime(text, date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def _convert(value, convert):
+    try:
+        return convert(value)
+    except (ValueError, TypeError):
+        return _MISSING
+
+
+class FieldRule:
+    """
+    Декларативное правило для одного поля записи
+
+    Проверки выполняются по порядку до первой ошибки: обязательность,
+    тип, преобразование, конечное число, ноль, модуль, длина, формат даты.
+    finite_number отклоняет bool, NaN и бесконечности, которые проходят
+    проверку types=(int, float).
+    """
+
+    def __init__(self, name, required=True, types=None, convert=None, finite_number=False, non_blank=False,
+                 non_zero=False, max_abs=None, max_length=None, date_format=None, messages=None):
+        self.name = name
+        self.required = required
+        self.types = types
+        self.convert = convert
+        self.finite_number = finite_number
+        self.non_blank = non_blank
+        self.non_zero = non_zero
+        self.max_abs = max_abs
+        self.max_length = max_length
+        self.date_format = date_format
+        self.messages = {
+            "required": f"Отсутствует поле '{name}'",
+            "type": f"Некорректный тип поля '{name}'",
+            "zero": f"Поле '{name}' не может быть равно нулю",
+            "too_large": f"Слишком большое значение поля '{name}'",
+            "too_long": f"Поле '{name}' слишком длинное",
+            "date": f"Некорректный формат даты в поле '{name}'",
+        }
+        if messages:
+            self.messages.update(messages)
+
+    def conditions(self, namespace):
+        """
+        Условия ошибок в виде исходного кода для TransactionSchema
+
+        Значения (типы, функции, сообщения) кладутся в namespace под
+        уникальными именами. Первое условие - пустое значение.
+
+        Returns:
+            list: [(условие, имя сообщения или None), ...]
+        """
+        def constant(value):
+            key = f"_c{len(namespace)}"
+            namespace[key] = value
+            return key
+
+        def message(kind):
+            return constant(self.messages[kind])
+
+        empty = "value is _MISSING or value is None or value == ''"
+        if self.non_blank:
+            empty += " or (isinstance(value, str) and not value.strip())"
+        conditions = [(empty, message("required") if self.required else None)]
+
+        if self.types is not None:
+            conditions.append((f"not isinstance(value, {constant(self.types)})", message("type")))
+        if self.convert is not None:
+            conditions.append((f"(value := _convert(value, {constant(self.convert)})) is _MISSING",
+                               message("type")))
+        if self.finite_number:
+            conditions.append(("isinstance(value, bool) or not _isfinite(value)", message("type")))
+        if self.non_zero:
+            conditions.append(("value == 0", message("zero")))
+        if self.max_abs is not None:
+            conditions.append((f"abs(value) > {self.max_abs!r}", message("too_large")))
+        if self.max_length is not None:
+            length = "len(value.strip())" if self.non_blank else "len(value)"
+            conditions.append((f"{length} > {self.max_length!r}", message("too_long")))
+        if self.date_format is not None:
+            conditions.append((f"isinstance(value, str) and not is_valid_date(value, {self.date_format!r})",
+                               message("date")))
+        return conditions
+
+
+class TransactionSchema:
+    """
+    Схема записи: набор правил, скомпилированный в функции проверки
+
+    По правилам генерируется исходный код одной функции без циклов и
+    вложенных вызовов (как в collections.namedtuple), поэтому проверка
+    не медленнее написанной вручную. Единый механизм для сохраненных и
+    импортируемых записей и данных из формы ввода.
+    """
+
+    NOT_A_RECORD = "Запись не является объектом"
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._first_error = self._compile(collect=False)
+        self._errors = self._compile(collect=True)
+
+    def _compile(self, collect):
+        namespace = {
+            "_MISSING": _MISSING,
+            "_convert": _convert,
+            "_isfinite": math.isfinite,
+            "is_valid_date": is_valid_date,
+            "NOT_A_RECORD": self.NOT_A_RECORD,
+        }
+        if collect:
+            lines = ["def check(row):",
+                     "    if not isinstance(row, dict):",
+                     "        return [NOT_A_RECORD]",
+                     "    errors = []"]
+        else:
+            lines = ["def check(row):",
+                     "    if not isinstance(row, dict):",
+                     "        return NOT_A_RECORD"]
+
+        for rule in self.rules:
+            lines.append(f"    value = row.get({rule.name!r}, _MISSING)")
+            for position, (condition, message) in enumerate(rule.conditions(namespace)):
+                keyword = "if" if position == 0 else "elif"
+                lines.append(f"    {keyword} {condition}:")
+                if message is None:
+                    lines.append("        pass")
+                elif collect:
+                    lines.append(f"        errors.append({message})")
+                else:
+                    lines.append(f"        return {message}")
+        lines.append("    return errors" if collect else "    return None")
+
+        exec("\n".join(lines), namespace)
+        return namespace["check"]
+
+    def errors(self, row):
+        """Возвращает список ошибок по всем полям записи"""
+        return self._errors(row)
+
+    def first_error(self, row):
+        """Возвращает первую ошибку записи или None"""
+        return self._first_error(row)
+
+    def is_valid(self, row):
+        """Проверяет запись"""
+        return self._first_error(row) is None
+
+    def validate_many(self, rows, start=0, normalize=None):
+        """
+        Проверяет записи пакетом
+
+        Args:
+            rows: Итерируемые записи
+            start (int): Номер первой записи (для сообщений об ошибках)
+            normalize: Функция нормализации корректной записи
+
+        Returns:
+            tuple: (список корректных записей, [(номер, запись, ошибка), ...] некорректных)
+        """
+        first_error = self._first_error
+        valid = []
+        errors = []
+        for index, row in enumerate(rows, start):
+            error = first_error(row)
+            if error is None:
+                valid.append(row if normalize is None else normalize(row))
+            else:
+                errors.append((index, row, error))
+        return valid, errors
+
+    def invalid_rows(self, rows, start=0):
+        """Возвращает [(номер, запись, ошибка), ...] только для некорректных записей"""
+        first_error = self._first_error
+        errors = []
+        for index, row in enumerate(rows, start):
+            error = first_error(row)
+            if error is not None:
+                errors.append((index, row, error))
+        return errors
+
+
+# Структура сохраненной транзакции
+TRANSACTION_SCHEMA = TransactionSchema([
+    FieldRule('amount', types=(int, float)),
+    FieldRule('category', types=(str,), non_blank=True),
+    FieldRule('date', types=(str,), non_blank=True),
+])
+
+# Данные из формы ввода: сумма может быть строкой, дата и описание необязательны
+FORM_SCHEMA = TransactionSchema([
+    FieldRule('amount', convert=float, non_zero=True, max_abs=1000000000, messages={
+        "required": "Сумма является обязательным полем",
+        "type": "Сумма должна быть числом",
+        "zero": "Сумма не может быть равна нулю",
+        "too_large": "Слишком большая сумма",
+    }),
+    FieldRule('category', types=(str,), non_blank=True, max_length=100, messages={
+        "required": "Категория является обязательным полем",
+        "type": "Категория является обязательным полем",
+        "too_long": "Категория слишком длинная (макс. 100 символов)",
+    }),
+    FieldRule('description', required=False, max_length=500, messages={
+        "too_long": "Описание слишком длинное (макс. 500 символов)",
+    }),
+    FieldRule('date', required=False, date_format=ISO_DATE_FORMAT, messages={
+        "date": "Некорректный формат даты",
+    }),
+])
+
+
 class DataValidator:
     """Класс для валидации финансовых данных"""
     
@@ -22,38 +258,12 @@ class DataValidator:
             tuple: (is_valid, error_message)
         """
         try:
-            validation_errors = []
-            
-            # Валидация суммы
-            if amount is None or amount == "":
-                validation_errors.append("Сумма является обязательным полем")
-            else:
-                try:
-                    amount_float = float(amount)
-                    if amount_float == 0:
-                        validation_errors.append("Сумма не может быть равна нулю")
-                    elif abs(amount_float) > 1000000000:
-                        validation_errors.append("Слишком большая сумма")
-                except (ValueError, TypeError):
-                    validation_errors.append("Сумма должна быть числом")
-            
-            # Валидация категории
-            if not category or not category.strip():
-                validation_errors.append("Категория является обязательным полем")
-            elif len(category.strip()) > 100:
-                validation_errors.append("Категория слишком длинная (макс. 100 символов)")
-            
-            # Валидация описания
-            if description and len(description) > 500:
-                validation_errors.append("Описание слишком длинное (макс. 500 символов)")
-            
-            # Валидация даты
-            if date:
-                try:
-                    if isinstance(date, str):
-                        datetime.strptime(date, "%Y-%m-%d")
-                except ValueError:
-                    validation_errors.append("Некорректный формат даты")
+            validation_errors = FORM_SCHEMA.errors({
+                'amount': amount,
+                'category': category,
+                'date': date,
+                'description': description,
+            })
             
             if validation_errors:
                 return False, "Обнаружены ошибки:\n• " + "\n• ".join(validation_errors)
@@ -99,25 +309,14 @@ class DataValidator:
         Returns:
             bool: True если структура валидна
         """
-        try:
-            if not isinstance(transaction, dict):
-                return False
-            
-            required_fields = ['amount', 'category', 'date']
-            for field in required_fields:
-                if field not in transaction:
-                    return False
-            
-            if not isinstance(transaction['amount'], (int, float)):
-                return False
-            
-            if not isinstance(transaction['category'], str) or not transaction['category'].strip():
-                return False
-            
-            if not isinstance(transaction['date'], str) or not transaction['date'].strip():
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
\ No newline at end of file
+        return TRANSACTION_SCHEMA.is_valid(transaction)
+    
+    @staticmethod
+    def validate_many(transactions, start=0):
+        """
+        Пакетная проверка структуры транзакций
+        
+        Returns:
+            tuple: (корректные транзакции, [(номер, запись, ошибка), ...])
+        """
+        return TRANSACTION_SCHEMA.validate_many(transactions, start)